@@ -26,6 +26,7 @@ config.set_main_option("sqlalchemy.url", database_url)
 # add your model's MetaData object here
 # for 'autogenerate' support
 from src.users import models
+from src.products_catalog import models as products_catalog_models
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
@@ -0,0 +1,40 @@
+"""company search indexes
+
+Revision ID: 3f2c9d1a7b4e
+Revises: ab461b0c718c
+Create Date: 2026-10-18 10:12:04.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2c9d1a7b4e'
+down_revision: Union[str, Sequence[str], None] = 'ab461b0c718c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Los índices trigram sólo existen en Postgres; otros motores siguen con LIKE
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_companies_name_trgm', 'companies', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_companies_email_trgm', 'companies', ['email'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_companies_email_trgm', table_name='companies', postgresql_using='gin')
+    op.drop_index('ix_companies_name_trgm', table_name='companies', postgresql_using='gin')
@@ -0,0 +1,52 @@
+"""role permissions mask
+
+Revision ID: 9b7e4c2d1f60
+Revises: 3f2c9d1a7b4e
+Create Date: 2026-10-18 10:47:31.502117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b7e4c2d1f60'
+down_revision: Union[str, Sequence[str], None] = '3f2c9d1a7b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Orden de Permission en el momento de la migración (bit = posición)
+PERMISSIONS = [
+    'view_dashboard',
+    'view_products', 'create_products', 'edit_products', 'delete_products',
+    'view_orders', 'create_orders', 'edit_orders', 'delete_orders',
+    'view_users', 'create_users', 'edit_users', 'delete_users',
+    'view_finances', 'edit_finances',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('roles', sa.Column('permissions_mask', sa.BigInteger(), server_default='0', nullable=False))
+
+    # Rellenar la máscara a partir de la lista JSON existente
+    roles = sa.table('roles', sa.column('id', sa.Uuid()), sa.column('permissions', sa.JSON()),
+                     sa.column('permissions_mask', sa.BigInteger()))
+    connection = op.get_bind()
+    for role_id, permissions in connection.execute(sa.select(roles.c.id, roles.c.permissions)):
+        mask = 0
+        for permission in permissions or []:
+            if permission in PERMISSIONS:
+                mask |= 1 << PERMISSIONS.index(permission)
+        if mask:
+            connection.execute(roles.update().where(roles.c.id == role_id).values(permissions_mask=mask))
+
+    op.create_index('ix_roles_company_id_permissions_mask', 'roles', ['company_id', 'permissions_mask'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_roles_company_id_permissions_mask', table_name='roles')
+    op.drop_column('roles', 'permissions_mask')
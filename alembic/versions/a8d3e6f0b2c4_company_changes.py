@@ -0,0 +1,47 @@
+"""company changes
+
+Revision ID: a8d3e6f0b2c4
+Revises: f1c5d8e2a7b3
+Create Date: 2026-10-18 21:02:17.508214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d3e6f0b2c4'
+down_revision: Union[str, Sequence[str], None] = 'f1c5d8e2a7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('company_changes',
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('company_id', sa.Uuid(), nullable=False),
+    sa.Column('operation', sa.Enum('UPSERT', 'DELETE', name='changeoperation'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_company_changes_company_id'), 'company_changes', ['company_id'], unique=False)
+    # Un cambio por compañía existente: el feed desde el cursor 0 es una copia completa
+    op.execute(
+        "INSERT INTO company_changes (company_id, operation, created_at, updated_at) "
+        "SELECT id, 'UPSERT', COALESCE(updated_at, CURRENT_TIMESTAMP), COALESCE(updated_at, CURRENT_TIMESTAMP) "
+        "FROM companies ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_company_changes_company_id'), table_name='company_changes')
+    op.drop_table('company_changes')
+    sa.Enum(name='changeoperation').drop(op.get_bind(), checkfirst=True)
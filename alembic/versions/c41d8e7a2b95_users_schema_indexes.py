@@ -0,0 +1,40 @@
+"""users schema indexes
+
+Revision ID: c41d8e7a2b95
+Revises: 9b7e4c2d1f60
+Create Date: 2026-10-18 11:20:45.730944
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d8e7a2b95'
+down_revision: Union[str, Sequence[str], None] = '9b7e4c2d1f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # roles.company_id ya está cubierto por ix_roles_company_id_permissions_mask (9b7e4c2d1f60)
+    op.create_index(op.f('ix_users_company_id'), 'users', ['company_id'], unique=False)
+    op.create_index('ix_user_role_assignments_user_id_company_id', 'user_role_assignments',
+                    ['user_id', 'company_id'], unique=False)
+    op.create_index('ix_user_role_assignments_company_id_role_id', 'user_role_assignments',
+                    ['company_id', 'role_id'], unique=False)
+    with op.batch_alter_table('user_role_assignments') as batch_op:
+        batch_op.create_unique_constraint('uq_user_role_assignments_user_role_company',
+                                          ['user_id', 'role_id', 'company_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user_role_assignments') as batch_op:
+        batch_op.drop_constraint('uq_user_role_assignments_user_role_company', type_='unique')
+    op.drop_index('ix_user_role_assignments_company_id_role_id', table_name='user_role_assignments')
+    op.drop_index('ix_user_role_assignments_user_id_company_id', table_name='user_role_assignments')
+    op.drop_index(op.f('ix_users_company_id'), table_name='users')
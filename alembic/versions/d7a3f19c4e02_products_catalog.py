@@ -0,0 +1,74 @@
+"""products catalog
+
+Revision ID: d7a3f19c4e02
+Revises: c41d8e7a2b95
+Create Date: 2026-10-18 13:05:12.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3f19c4e02'
+down_revision: Union[str, Sequence[str], None] = 'c41d8e7a2b95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('categories',
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('company_id', sa.Uuid(), nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+    sa.Column('parent_id', sa.Uuid(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['parent_id'], ['categories.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'name', name='uq_categories_company_name')
+    )
+    op.create_index(op.f('ix_categories_company_id'), 'categories', ['company_id'], unique=False)
+    op.create_table('products',
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('company_id', sa.Uuid(), nullable=False),
+    sa.Column('category_id', sa.Uuid(), nullable=True),
+    sa.Column('sku', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('price', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('attributes', sa.JSON(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'sku', name='uq_products_company_sku')
+    )
+    op.create_index(op.f('ix_products_company_id'), 'products', ['company_id'], unique=False)
+    op.create_index(op.f('ix_products_category_id'), 'products', ['category_id'], unique=False)
+    # Refresco incremental del índice de búsqueda en memoria
+    op.create_index('ix_products_updated_at_id', 'products', ['updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_updated_at_id', table_name='products')
+    op.drop_index(op.f('ix_products_category_id'), table_name='products')
+    op.drop_index(op.f('ix_products_company_id'), table_name='products')
+    op.drop_table('products')
+    op.drop_index(op.f('ix_categories_company_id'), table_name='categories')
+    op.drop_table('categories')
@@ -0,0 +1,63 @@
+"""inventory reservations
+
+Revision ID: e4b8a2c6d913
+Revises: d7a3f19c4e02
+Create Date: 2026-10-18 16:42:37.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8a2c6d913'
+down_revision: Union[str, Sequence[str], None] = 'd7a3f19c4e02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reservations',
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('company_id', sa.Uuid(), nullable=False),
+    sa.Column('status', sa.Enum('HELD', 'CONFIRMED', 'RELEASED', 'EXPIRED', name='reservationstatus'), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_reservations_company_id'), 'reservations', ['company_id'], unique=False)
+    # Cola de caducidad de reservas retenidas
+    op.create_index('ix_reservations_status_expires_at', 'reservations', ['status', 'expires_at'], unique=False)
+    op.create_table('reservation_items',
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('reservation_id', sa.Uuid(), nullable=False),
+    sa.Column('product_id', sa.Uuid(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['reservation_id'], ['reservations.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('reservation_id', 'product_id', name='uq_reservation_items_reservation_product')
+    )
+    op.create_index(op.f('ix_reservation_items_product_id'), 'reservation_items', ['product_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_reservation_items_product_id'), table_name='reservation_items')
+    op.drop_table('reservation_items')
+    op.drop_index('ix_reservations_status_expires_at', table_name='reservations')
+    op.drop_index(op.f('ix_reservations_company_id'), table_name='reservations')
+    op.drop_table('reservations')
+    sa.Enum(name='reservationstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,184 @@
+"""Coste de la autenticación: verificación de tokens y ráfagas de login.
+
+En proceso (httpx + ASGITransport) contra la base indicada, donde crea las tablas
+con metadata.create_all y registra un usuario de prueba:
+
+    python benchmarks/auth.py --database-url sqlite+aiosqlite:///auth.db --output benchmarks/results/auth.json
+
+Las URLs sqlite+aiosqlite de este y los demás benchmarks necesitan aiosqlite: grupo
+`benchmarks` de pyproject.toml (`uv sync --group benchmarks`) o requirements-benchmarks.txt.
+
+Mide tres cosas:
+- verify: microsegundos de TokenVerifier.verify con el token en caché y sin ella.
+- overhead: latencia de dos rutas idénticas que el script añade a la app, una
+  con get_current_user y otra sin ella; la diferencia es lo que añade la
+  autenticación a cada petición.
+- login_burst: latencia de la ruta sin autenticación mientras `--login-concurrency` clientes
+  hacen login sin parar, con el hash en el pool de hilos (offloaded) y en el
+  propio event loop (inline) para comparar.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+os.environ.setdefault("AUTH_SECRET_KEY", "benchmark-secret")
+
+import fastapi as fa
+import httpx
+import sqlmodel as sm
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.database import use_async_engine
+from users.auth import Principal, get_current_user, get_password_hasher, get_token_verifier
+from users.enums import UserRole
+from users.main import create_app
+
+EMAIL = "bench-auth@example.com"
+PASSWORD = "benchmark-password"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def summary(samples):
+    return {"p50_ms": round(percentile(samples, 50), 3), "p95_ms": round(percentile(samples, 95), 3),
+            "p99_ms": round(percentile(samples, 99), 3), "mean_ms": round(statistics.fmean(samples), 3)}
+
+
+def bench_verify(number):
+    verifier = get_token_verifier()
+    token, _ = verifier.signer.issue(uuid.uuid4(), None, UserRole.CUSTOMER)
+    verifier.verify(token)
+    start = time.perf_counter()
+    for _ in range(number):
+        verifier.verify(token)
+    cached = (time.perf_counter() - start) / number
+
+    start = time.perf_counter()
+    for _ in range(number):
+        verifier.signer.decode(token)
+    uncached = (time.perf_counter() - start) / number
+    return {"cached_us": round(cached * 1e6, 2), "uncached_us": round(uncached * 1e6, 2)}
+
+
+async def timed_get(client, url, headers=None):
+    start = time.perf_counter()
+    response = await client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return (time.perf_counter() - start) * 1000
+
+
+def add_probe_routes(app):
+    """Misma ruta con y sin autenticación"""
+    @app.get("/bench/plain")
+    async def plain():
+        return {"ok": True}
+
+    @app.get("/bench/authenticated")
+    async def authenticated(principal: Principal = fa.Depends(get_current_user)):
+        return {"ok": True}
+
+
+async def bench_overhead(client, headers, requests):
+    for _ in range(50):
+        await timed_get(client, "/bench/plain")
+        await timed_get(client, "/bench/authenticated", headers)
+    plain, authenticated = [], []
+    # Alternadas para que el ruido afecte por igual a las dos
+    for _ in range(requests):
+        plain.append(await timed_get(client, "/bench/plain"))
+        authenticated.append(await timed_get(client, "/bench/authenticated", headers))
+    result = {"plain": summary(plain), "authenticated": summary(authenticated)}
+    result["added_p50_ms"] = round(result["authenticated"]["p50_ms"] - result["plain"]["p50_ms"], 3)
+    result["added_mean_ms"] = round(result["authenticated"]["mean_ms"] - result["plain"]["mean_ms"], 3)
+    return result
+
+
+async def bench_burst(client, concurrency, seconds):
+    """Latencia de una ruta ligera mientras otros clientes hacen login"""
+    stop = time.perf_counter() + seconds
+    logins = 0
+
+    async def login_loop():
+        nonlocal logins
+        while time.perf_counter() < stop:
+            response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            assert response.status_code == 200, response.text
+            logins += 1
+
+    async def probe():
+        # Se mide desde que la petición debería salir: incluye lo que el loop tarde en atenderla
+        samples = []
+        while time.perf_counter() < stop:
+            due = time.perf_counter() + 0.005
+            await asyncio.sleep(0.005)
+            response = await client.get("/bench/plain")
+            assert response.status_code == 200, response.text
+            samples.append((time.perf_counter() - due) * 1000)
+        return samples
+
+    tasks = [asyncio.create_task(login_loop()) for _ in range(concurrency)]
+    samples = await probe()
+    await asyncio.gather(*tasks)
+    return {"logins_per_second": round(logins / seconds, 1), "probe": summary(samples), "probes": len(samples)}
+
+
+async def main_async(args):
+    engine = create_async_engine(args.database_url)
+    use_async_engine(engine)
+    # Antes de create_all: create_app importa los modelos de todos los routers
+    app = create_app()
+    add_probe_routes(app)
+    async with engine.begin() as conn:
+        await conn.run_sync(sm.SQLModel.metadata.create_all)
+
+    result = {"verify": bench_verify(args.number)}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/auth/register", json={"email": EMAIL, "username": "bench", "password": PASSWORD})
+            token = (await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})).json()
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+            result["overhead"] = await bench_overhead(client, headers, args.requests)
+
+            hasher = get_password_hasher()
+            workers = hasher.workers
+            result["login_burst"] = {}
+            result["login_burst"]["idle"] = await bench_burst(client, 0, args.burst_seconds)
+            for mode in ("offloaded", "inline"):
+                hasher.workers = workers if mode == "offloaded" else 0
+                result["login_burst"][mode] = await bench_burst(client, args.login_concurrency, args.burst_seconds)
+            hasher.workers = workers
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///auth.db")
+    parser.add_argument("--number", type=int, default=100000, help="verify() calls per variant")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per route in the overhead phase")
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--burst-seconds", type=float, default=5)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Benchmark del índice de búsqueda con facetas del catálogo (products_catalog.search).
+
+Genera productos sintéticos en memoria (sin base de datos: mide el índice, no
+la lectura de filas), los indexa en lotes como hace CatalogIndex.refresh y mide
+la latencia de consultas con filtros, facetas, texto y orden, además del coste
+de aplicar cambios sueltos con los órdenes ya construidos. Con --verify cada
+consulta se contrasta con un recorrido lineal de los productos.
+
+    python benchmarks/catalog_search.py --products 1000000 --output benchmarks/results/catalog.json
+    python benchmarks/catalog_search.py --products 100000 --companies 10 --verify
+"""
+import argparse
+import itertools
+import json
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from common.models.ids import uuid7
+from products_catalog.search import SORTS, CatalogIndex, FacetedIndex, tokenize
+
+COLORS = ["red", "blue", "green", "black", "white", "grey", "yellow", "pink", "orange", "purple", "brown", "navy"]
+SIZES = ["xs", "s", "m", "l", "xl", "xxl"]
+
+
+def vocabulary(rng, size):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return sorted({"".join(rng.choices(letters, k=rng.randint(3, 9))) for _ in range(size)})
+
+
+def generate(products, companies, categories, seed):
+    """Filas con la forma de las de products (como las devuelve CatalogIndex._changes_query)"""
+    rng = random.Random(seed)
+    words = vocabulary(rng, 5000)
+    # Zipf aproximado: unas pocas palabras aparecen en muchos nombres
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    company_ids = [uuid7() for _ in range(companies)]
+    category_ids = {company: [uuid7() for _ in range(categories)] for company in company_ids}
+    brands = [f"brand{index}" for index in range(200)]
+    now = datetime.now()
+    rows = []
+    for index in range(products):
+        company = company_ids[index % companies]
+        created = now - timedelta(minutes=rng.randrange(525600))
+        rows.append({
+            "id": uuid7(),
+            "company_id": company,
+            "category_id": rng.choice(category_ids[company]),
+            "sku": f"SKU-{index:08d}",
+            "name": " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(2, 5))),
+            "price": Decimal(round(rng.lognormvariate(3.5, 1.1), 2)).quantize(Decimal("0.01")),
+            "stock": 0 if rng.random() < 0.15 else rng.randint(1, 500),
+            "attributes": {"color": rng.choice(COLORS), "size": rng.choice(SIZES), "brand": rng.choice(brands)},
+            "is_active": True,
+            "deleted_at": None,
+            "created_at": created,
+            "updated_at": created,
+        })
+    return rows, words, category_ids
+
+
+def queries(rng, words, category_ids):
+    categories = list(category_ids)
+    common_word = words[0]
+    return {
+        "all_newest": {},
+        "category": {"categories": [rng.choice(categories)]},
+        "category_in_stock_price_asc": {"categories": rng.sample(categories, 3), "in_stock": True, "sort": "price_asc"},
+        "attributes": {"attributes": {"color": ["red", "blue"], "size": ["m"]}, "sort": "price_desc"},
+        "price_range": {"min_price": 20, "max_price": 60, "sort": "name"},
+        "text_common": {"text": common_word},
+        "text_prefix": {"text": words[len(words) // 2][:3]},
+        "text_and_facets": {"text": common_word, "attributes": {"color": ["red"]}, "in_stock": True,
+                            "sort": "price_asc"},
+        "deep_page": {"offset": 5000, "limit": 20, "sort": "price_asc"},
+    }
+
+
+def naive(rows, company_id, params):
+    """Mismo resultado recorriendo todas las filas (para --verify)"""
+    text = tokenize(params.get("text"))
+    categories = params.get("categories")
+    attributes = params.get("attributes") or {}
+    matches = []
+    for row in rows:
+        if row["company_id"] != company_id:
+            continue
+        tokens = set(tokenize(row["name"]))
+        sku = params.get("text", "").strip().lower() == row["sku"].lower()
+        if text and not sku and not (all(token in tokens for token in text[:-1])
+                         and any(token.startswith(text[-1]) if len(text[-1]) > 1 else token == text[-1]
+                                 for token in tokens)):
+            continue
+        if categories and row["category_id"] not in categories:
+            continue
+        if params.get("in_stock") is not None and (row["stock"] > 0) != params["in_stock"]:
+            continue
+        if any(row["attributes"].get(name) not in values for name, values in attributes.items()):
+            continue
+        price = float(row["price"])
+        if params.get("min_price") is not None and price < params["min_price"]:
+            continue
+        if params.get("max_price") is not None and price > params["max_price"]:
+            continue
+        matches.append(row)
+    return matches
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": round(percentile(samples, 50), 3), "p95_ms": round(percentile(samples, 95), 3),
+            "max_ms": round(max(samples), 3)}
+
+
+def rss_mb():
+    # ru_maxrss está en KiB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--companies", type=int, default=1)
+    parser.add_argument("--categories", type=int, default=50, help="Categories per company")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=200, help="Single-product changes applied after the build")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verify", action="store_true", help="Check every query against a linear scan")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    rows, words, category_ids = generate(args.products, args.companies, args.categories, args.seed)
+    generate_seconds = time.perf_counter() - start
+    rss_rows = rss_mb()
+
+    index = CatalogIndex(batch_size=args.batch_size)
+    start = time.perf_counter()
+    for offset in range(0, len(rows), args.batch_size):
+        index.apply(rows[offset:offset + args.batch_size])
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(args.seed)
+    company_id = rows[0]["company_id"]
+    company = index.company(company_id)
+    result = {
+        "products": args.products,
+        "companies": args.companies,
+        "company_products": len(company),
+        "generate_seconds": round(generate_seconds, 2),
+        "build_seconds": round(build_seconds, 2),
+        "build_products_per_second": round(args.products / build_seconds),
+        "rss_rows_mb": round(rss_rows - rss_before, 1),
+        "rss_index_mb": round(rss_mb() - rss_rows, 1),
+        "index": company.stats(),
+        "queries": {},
+    }
+
+    # Primera consulta de cada orden: incluye construirlo
+    for sort in SORTS:
+        start = time.perf_counter()
+        company.search(sort=sort, limit=20)
+        result.setdefault("first_sort_ms", {})[sort] = round((time.perf_counter() - start) * 1000, 1)
+
+    for name, params in queries(rng, words, category_ids[company_id]).items():
+        # Sin la caché de resultados (filtros nuevos) y con ella (p. ej. otra página u orden)
+        company.result_cache_size = 0
+        found = company.search(**params)
+        entry = {"uncached": timed(lambda: company.search(**params), args.repeat)}
+        company.result_cache_size = FacetedIndex.result_cache_size
+        company.search(**params)
+        entry["cached"] = timed(lambda: company.search(**params), args.repeat)
+        entry["total"] = found["total"]
+        if args.verify:
+            expected = naive(rows, company_id, params)
+            assert len(expected) == found["total"], (name, len(expected), found["total"])
+            order, descending = SORTS[params.get("sort", "newest")]
+            value = {"price": lambda row: float(row["price"]), "name": lambda row: row["name"].lower(),
+                     "created": lambda row: row["created_at"].timestamp()}[order]
+            values = [value(doc._asdict()) for doc in found["data"]]
+            assert values == sorted(values, reverse=descending), name
+            expected_values = sorted((value(row) for row in expected), reverse=descending)
+            offset = params.get("offset", 0)
+            assert values == expected_values[offset:offset + len(values)], name
+        result["queries"][name] = entry
+
+    # Cambios sueltos (lo normal entre refrescos) con los órdenes ya construidos
+    company.result_cache_size = 0
+    changed = rng.sample(rows[::args.companies], min(args.updates, len(company)))
+    start = time.perf_counter()
+    for row in changed:
+        row = {**row, "price": Decimal("9.99"), "stock": 0, "updated_at": datetime.now()}
+        index.apply([row])
+    result["single_update_ms"] = round((time.perf_counter() - start) * 1000 / max(1, len(changed)), 3)
+    assert company.search(in_stock=False, max_price=9.99)["total"] >= len(changed)
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Sincronización de compañías: releer la tabla paginada frente al feed de cambios.
+
+En proceso (httpx + ASGITransport) contra la base indicada, donde crea las tablas
+con metadata.create_all e importa `--companies` compañías por /users/companies/bulk.
+Un consumidor hace una copia inicial y después, en cada ronda, se modifican
+`--changes` compañías (y se borra alguna) y el consumidor se sincroniza de dos formas:
+
+- full: recorre GET /users/companies con cursor de página (`page_size` 100).
+- feed: GET /users/companies/changes desde el último cursor guardado.
+
+Se comparan peticiones, filas y bytes recibidos y tiempo por sincronización.
+
+    python benchmarks/change_feed.py --companies 20000 --changes 50 --output benchmarks/results/change_feed.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+os.environ.setdefault("INVENTORY_EXPIRY_INTERVAL_SECONDS", "0")
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+import httpx
+import sqlmodel as sm
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.database import use_async_engine
+from users.main import create_app
+
+
+async def full_sync(client):
+    """Copia completa: todas las páginas de /users/companies"""
+    stats = {"requests": 0, "rows": 0, "bytes": 0}
+    params = {"page_size": 100, "total_mode": "none"}
+    while True:
+        response = await client.get("/users/companies", params=params)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        stats["requests"] += 1
+        stats["rows"] += len(body["data"])
+        stats["bytes"] += len(response.content)
+        if not body["next_cursor"]:
+            return stats
+        params["cursor"] = body["next_cursor"]
+
+
+async def feed_sync(client, since, limit):
+    """Sólo los cambios desde `since`; devuelve las estadísticas y el cursor nuevo"""
+    stats = {"requests": 0, "rows": 0, "bytes": 0}
+    while True:
+        response = await client.get("/users/companies/changes", params={"since": since, "limit": limit})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        stats["requests"] += 1
+        stats["rows"] += len(body["data"])
+        stats["bytes"] += len(response.content)
+        since = body["next_cursor"]
+        if not body["has_more"]:
+            return stats, since
+
+
+async def timed(coroutine):
+    start = time.perf_counter()
+    result = await coroutine
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def seed(client, companies):
+    lines = "\n".join(json.dumps({"name": f"company-{i}", "email": f"company-{i}@example.com", "description": None})
+                      for i in range(companies))
+    response = await client.post("/users/companies/bulk", content=lines, params={"batch_size": 1000})
+    assert response.status_code == 200 and response.json()["upserted"] == companies, response.text
+
+
+async def mutate(client, ids, round_number, changes):
+    """Modifica `changes` compañías y borra una (la última de la lista)"""
+    for company_id in ids[round_number * changes:(round_number + 1) * changes]:
+        response = await client.patch(f"/users/companies/{company_id}", json={"description": f"round {round_number}"})
+        assert response.status_code == 200, response.text
+    response = await client.delete(f"/users/companies/{ids.pop()}")
+    assert response.status_code == 204, response.text
+
+
+def summary(samples, stats):
+    return {**stats, "mean_ms": round(statistics.fmean(samples), 2), "max_ms": round(max(samples), 2)}
+
+
+async def main_async(args):
+    engine = create_async_engine(args.database_url or f"sqlite+aiosqlite:///{tempfile.mktemp(suffix='.db')}")
+    use_async_engine(engine)
+    # Antes de create_all: create_app importa los modelos de todos los routers
+    app = create_app()
+    async with engine.begin() as conn:
+        await conn.run_sync(sm.SQLModel.metadata.create_all)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await seed(client, args.companies)
+            # Copia inicial por el feed: el consumidor guarda el cursor
+            (initial, cursor), initial_ms = await timed(feed_sync(client, 0, args.limit))
+            async with engine.connect() as conn:
+                ids = [str(id) for id in (await conn.execute(sm.text("SELECT id FROM companies"))).scalars()]
+
+            full_ms, feed_ms = [], []
+            full_stats = feed_stats = None
+            for round_number in range(args.rounds):
+                await mutate(client, ids, round_number, args.changes)
+                full_stats, elapsed = await timed(full_sync(client))
+                full_ms.append(elapsed)
+                (feed_stats, cursor), elapsed = await timed(feed_sync(client, cursor, args.limit))
+                feed_ms.append(elapsed)
+    await engine.dispose()
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "database_url")},
+        "initial_snapshot": {**initial, "ms": round(initial_ms, 2)},
+        "per_sync": {"full": summary(full_ms, full_stats), "feed": summary(feed_ms, feed_stats)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite database")
+    parser.add_argument("--companies", type=int, default=20000)
+    parser.add_argument("--changes", type=int, default=50, help="Companies updated per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=500, help="Changes per feed request")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
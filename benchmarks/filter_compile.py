@@ -0,0 +1,90 @@
+"""Micro-benchmark: coste de convertir un diccionario de filtros en condiciones SQL.
+
+Compara el parseo por cadenas que hacía BaseService._apply_filters en cada
+petición con el plan precompilado por modelo (common.filters.compile_filter_plan).
+
+    python benchmarks/filter_compile.py --number 20000
+"""
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sqlmodel import and_, select
+
+from common.filters import build_conditions, compile_filter_plan
+from users.models import Company
+
+FILTERS = {
+    "name__contains": "store",
+    "email__contains": "example",
+    "is_active": True,
+    "created_at__gte": datetime(2025, 1, 1),
+    "created_at__lt": datetime(2026, 1, 1),
+}
+
+
+def legacy_conditions(model_class, filters):
+    """Réplica del parseo anterior (cadena a cadena y getattr por clave)"""
+    conditions = []
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if '__contains' in key:
+            field = getattr(model_class, key.replace('__contains', ''), None)
+            if field:
+                conditions.append(field.contains(value))
+        elif '__gt' in key:
+            field = getattr(model_class, key.replace('__gt', ''), None)
+            if field:
+                conditions.append(field > value)
+        elif '__lt' in key:
+            field = getattr(model_class, key.replace('__lt', ''), None)
+            if field:
+                conditions.append(field < value)
+        elif '__in' in key:
+            field = getattr(model_class, key.replace('__in', ''), None)
+            if field and isinstance(value, list):
+                conditions.append(field.in_(value))
+        else:
+            field = getattr(model_class, key, None)
+            if field:
+                conditions.append(field == value)
+    return conditions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    compile_filter_plan.cache_clear()
+    build_time = timeit.timeit(lambda: compile_filter_plan(Company), number=1)
+
+    def per_call_us(fn):
+        return round(timeit.timeit(fn, number=args.number) / args.number * 1e6, 3)
+
+    result = {
+        "filters": len(FILTERS),
+        "plan_build_once_us": round(build_time * 1e6, 3),
+        "legacy_conditions_us": per_call_us(lambda: legacy_conditions(Company, FILTERS)),
+        "compiled_conditions_us": per_call_us(lambda: build_conditions(Company, FILTERS)),
+        # Una página necesita las condiciones en la consulta de datos y en la de conteo
+        "legacy_page_queries_us": per_call_us(lambda: (
+            select(Company).where(and_(*legacy_conditions(Company, FILTERS))),
+            select(Company.id).where(and_(*legacy_conditions(Company, FILTERS))),
+        )),
+        "compiled_page_queries_us": per_call_us(lambda: (
+            lambda conditions: (select(Company).where(and_(*conditions)),
+                                select(Company.id).where(and_(*conditions)))
+        )(build_conditions(Company, FILTERS))),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Tiempo de importación de los módulos de arranque (lo que paga cada worker al levantar).
+
+Cada módulo se importa en un intérprete nuevo (sin caché de módulos del proceso)
+y sin variables de entorno de la base de datos: importar no debe necesitar
+configuración ni conectar. Se guarda la mediana de `--repeat` ejecuciones y los
+módulos más lentos según `python -X importtime`.
+
+    python benchmarks/import_time.py --repeat 5 --output benchmarks/results/import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+MODULES = ("core.config", "core.database", "users.routes", "users.main")
+
+# Mide sólo el import; la app se crea aparte para ver lo que cuesta create_app()
+SCRIPT = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+if {module!r} == "users.main":
+    {module}.create_app()
+print(imported - start, time.perf_counter() - imported)
+"""
+
+
+def clean_env():
+    # Sin DB_* ni .env del directorio actual: importar debe funcionar igual
+    return {key: value for key, value in os.environ.items() if not key.startswith("DB_")}
+
+
+def run(module):
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(src=str(SRC), module=module)],
+        capture_output=True, text=True, check=True, env=clean_env(), cwd=SRC,
+    ).stdout.split()
+    return float(output[0]), float(output[1])
+
+
+def top_imports(module, limit):
+    """Módulos con más tiempo acumulado según -X importtime (µs)"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {str(SRC)!r}); import {module}"],
+        capture_output=True, text=True, check=True, env=clean_env(), cwd=SRC,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_us": cumulative} for cumulative, name in rows[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    result = {"python": sys.version.split()[0], "repeat": args.repeat, "modules": {}}
+    for module in MODULES:
+        runs = [run(module) for _ in range(args.repeat)]
+        entry = {"import_ms": round(statistics.median(r[0] for r in runs) * 1000, 2)}
+        if module == "users.main":
+            entry["create_app_ms"] = round(statistics.median(r[1] for r in runs) * 1000, 2)
+        result["modules"][module] = entry
+    result["top_imports"] = top_imports("users.main", args.top)
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
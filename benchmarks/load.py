@@ -0,0 +1,289 @@
+"""Prueba de carga: throughput y latencia (p50/p95/p99) de cada ruta de compañías.
+
+Contra un servidor levantado (p. ej. `uvicorn --factory users.main:create_app --workers 1`):
+
+    python benchmarks/load.py --base-url http://127.0.0.1:8000 --concurrency 64 \\
+        --requests 5000 --label async --output benchmarks/results/async.json
+
+En proceso (httpx + ASGITransport, sin red ni uvicorn), contra la base de .env o
+contra una URL asíncrona sembrada antes con seed.py:
+
+    python benchmarks/seed.py --database-url sqlite:///bench.db --companies 10000 --reset
+    python benchmarks/load.py --in-process --database-url sqlite+aiosqlite:///bench.db \\
+        --routes list,detail,search --label base --output benchmarks/results/base.json
+
+Cada ruta se mide en una fase propia con `--requests` peticiones. Las rutas de
+escritura sólo modifican compañías creadas por el propio script. Para comparar
+antes/después se guarda cada ejecución con una etiqueta y se pasa la anterior
+con `--compare`.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import httpx
+
+SEARCH_TERMS = ["acme", "andes", "atlas", "nova", "sierra", "valle", "store", "labs", "tech", "example"]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        "requests": len(latencies) + sum(errors.values()),
+        "errors": sum(errors.values()),
+        "error_statuses": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round((len(latencies) + sum(errors.values())) / elapsed, 2) if elapsed else None,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else None,
+    }
+
+
+class LoadState:
+    """Ids conocidos y compañías propias del script (las únicas que se modifican)"""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.owned = []
+        self.run_id = uuid.uuid4().hex[:8]
+        self.counter = itertools.count()
+
+    def new_company(self):
+        n = next(self.counter)
+        return {
+            "name": f"load {self.run_id} {n}",
+            "email": f"load-{self.run_id}-{n}@example.com",
+            "description": "load test",
+        }
+
+
+async def create_owned(client, state, n):
+    """Crea (fuera de la medición) las compañías que necesitan las fases de escritura"""
+    while len(state.owned) < n:
+        response = await client.post("/users/companies", json=state.new_company())
+        response.raise_for_status()
+        state.owned.append(response.json()["id"])
+
+
+# Una petición por ruta de users/routes.py
+async def _list(client, state, args):
+    return await client.get("/users/companies", params={"page_size": args.page_size})
+
+
+async def _detail(client, state, args):
+    return await client.get(f"/users/companies/{random.choice(state.ids)}")
+
+
+async def _search(client, state, args):
+    return await client.get("/users/companies/search", params={"q": random.choice(SEARCH_TERMS)})
+
+
+async def _export(client, state, args):
+    # Filtrado para acotar el tamaño de cada respuesta
+    params = {"name__contains": random.choice(SEARCH_TERMS), "format": "ndjson"}
+    async with client.stream("GET", "/users/companies/export", params=params) as response:
+        async for _ in response.aiter_bytes():
+            pass
+    return response
+
+
+async def _create(client, state, args):
+    response = await client.post("/users/companies", json=state.new_company())
+    if response.status_code < 400:
+        state.owned.append(response.json()["id"])
+    return response
+
+
+async def _update(client, state, args):
+    data = {**state.new_company(), "description": "load test (put)"}
+    return await client.put(f"/users/companies/{random.choice(state.owned)}", json=data)
+
+
+async def _patch(client, state, args):
+    return await client.patch(f"/users/companies/{random.choice(state.owned)}", json={"description": "load test (patch)"})
+
+
+async def _bulk(client, state, args):
+    body = "".join(json.dumps(state.new_company()) + "\n" for _ in range(args.bulk_rows))
+    return await client.post("/users/companies/bulk", params={"format": "ndjson"}, content=body)
+
+
+async def _delete(client, state, args):
+    return await client.delete(f"/users/companies/{state.owned.pop()}")
+
+
+ROUTES = {
+    "list": _list,
+    "detail": _detail,
+    "search": _search,
+    "export": _export,
+    "create": _create,
+    "update": _update,
+    "patch": _patch,
+    "bulk": _bulk,
+    "delete": _delete,
+}
+
+
+async def run_phase(client, state, args, name):
+    request = ROUTES[name]
+    latencies, errors = [], {}
+    remaining = iter(range(args.requests))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = (await request(client, state, args)).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if isinstance(status, int) and status < 400:
+                latencies.append(round(elapsed_ms, 3))
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run(client, args):
+    listing = (await client.get("/users/companies", params={"page_size": 100})).json()
+    state = LoadState([company["id"] for company in listing.get("data", [])])
+
+    routes = {}
+    for name in args.routes:
+        if name == "detail" and not state.ids:
+            print("skipping detail: no companies (run seed.py first)", file=sys.stderr)
+            continue
+        if name in ("update", "patch"):
+            await create_owned(client, state, 1)
+        if name == "delete":
+            await create_owned(client, state, args.requests)
+        routes[name] = await run_phase(client, state, args, name)
+
+    await cleanup(client, state)
+    return routes
+
+
+async def cleanup(client, state):
+    """Borra las compañías que dejaron las fases de escritura (incluidas las del bulk)"""
+    params = {"name__contains": f"load {state.run_id} ", "format": "ndjson"}
+    export = await client.get("/users/companies/export", params=params)
+    for line in export.text.splitlines():
+        await client.delete(f"/users/companies/{json.loads(line)['id']}")
+
+
+def in_process_app(database_url=None):
+    """Una app de users.main, opcionalmente apuntando a otra base de datos (sin réplicas)"""
+    from core.database import use_async_engine
+    from users.main import create_app
+
+    if database_url:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        use_async_engine(create_async_engine(database_url))
+
+    return create_app()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline):
+    """Cociente actual/base por ruta (<1 en latencia y >1 en throughput es mejor)"""
+    comparison = {}
+    for name, current in result["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous:
+            continue
+        comparison[name] = {
+            metric: round(current[metric] / previous[metric], 3) if current[metric] and previous[metric] else None
+            for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return comparison
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.in_process:
+        transport = httpx.ASGITransport(app=in_process_app(args.database_url))
+        client = httpx.AsyncClient(transport=transport, base_url="http://load", timeout=30)
+    else:
+        client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30)
+    async with client:
+        return await run(client, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--in-process", action="store_true", help="Call the ASGI app directly instead of --base-url")
+    parser.add_argument("--database-url", default=None, help="Async database URL for --in-process")
+    parser.add_argument("--routes", default=",".join(ROUTES), help=f"Comma-separated subset of: {', '.join(ROUTES)}")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per route")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--bulk-rows", type=int, default=100, help="Rows per bulk import request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--compare", type=Path, default=None, help="Previous result JSON to compare against")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    args.routes = [name.strip() for name in args.routes.split(",") if name.strip()]
+    unknown = set(args.routes) - set(ROUTES)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    random.seed(args.seed)
+    routes = asyncio.run(main_async(args))
+    result = {
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "target": "in-process" if args.in_process else args.base_url,
+        "concurrency": args.concurrency,
+        "requests_per_route": args.requests,
+        "routes": routes,
+    }
+    if args.compare:
+        result["compared_to"] = str(args.compare)
+        result["ratios"] = compare(result, json.loads(args.compare.read_text()))
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Prueba de sobrecarga local: con y sin control de admisión (core.admission).
+
+Emula una base de datos con capacidad limitada: SQLite con una función `work(ms)`
+que ocupa una de `--db-capacity` plazas durante `ms` milisegundos, así la latencia
+de las consultas crece con la concurrencia como en un Postgres saturado. La app
+recibe una ruta de prueba (clase "read") que ejecuta `SELECT work(ms)`.
+
+Los clientes se autentican con un token de usuario de su compañía (la cuota por
+tenant sale del token). Primero unos pocos clientes de una compañía "quiet"
+(calentamiento: la latencia de referencia se aprende sin carga) y después
+`--clients` clientes de una compañía "noisy" que reintentan sin respetar Retry-After. Se mide por compañía cuántas
+respuestas llegan a tiempo (`--slo`), cuántas se rechazan (429/503) y la latencia.
+
+    python benchmarks/overload.py --clients 200 --seconds 10 --output benchmarks/results/overload.json
+
+Con ADMISSION_TENANT_LIMIT=0 se ve qué pasa sin cuota por compañía: la cola de la
+clase se llena de peticiones de la ruidosa y la tranquila recibe sobre todo 503.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+os.environ.setdefault("AUTH_SECRET_KEY", "benchmark-secret")
+
+import fastapi as fa
+import httpx
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.config import get_settings
+from core.database import get_read_session, use_async_engine
+from users.auth import get_token_verifier
+from users.enums import UserRole
+from users.main import create_app
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))], 1)
+
+
+def emulated_engine(path, capacity, pool_size):
+    slots = threading.BoundedSemaphore(capacity)
+
+    def work(ms):
+        with slots:
+            time.sleep(ms / 1000)
+        return 1
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=pool_size, max_overflow=0,
+                                 pool_timeout=5, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _register(dbapi_connection, connection_record):
+        dbapi_connection.create_function("work", 1, work)
+
+    return engine
+
+
+def build_app(admission, args):
+    os.environ["ADMISSION_ENABLED"] = "true" if admission else "false"
+    os.environ.setdefault("INVENTORY_EXPIRY_INTERVAL_SECONDS", "0")
+    get_settings.cache_clear()
+    path = tempfile.mktemp(suffix=".db")
+    use_async_engine(emulated_engine(path, args.db_capacity, args.pool_size))
+    app = create_app()
+
+    @app.get("/bench/report")
+    async def report(db: AsyncSession = fa.Depends(get_read_session)):
+        try:
+            return {"value": (await db.exec(sa.text("SELECT work(:ms)"), params={"ms": args.query_ms})).scalar()}
+        except Exception as e:
+            raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+    return app
+
+
+class Tally:
+    def __init__(self):
+        self.latencies = []
+        self.on_time = 0
+        self.statuses = {}
+
+    def summary(self, seconds, slo_ms):
+        ok = self.statuses.get(200, 0)
+        return {
+            "requests": sum(self.statuses.values()),
+            "ok": ok,
+            "on_time": self.on_time,
+            "goodput_rps": round(self.on_time / seconds, 1),
+            "late": ok - self.on_time,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "ok_p50_ms": percentile(self.latencies, 50),
+            "ok_p99_ms": percentile(self.latencies, 99),
+            "ok_mean_ms": round(statistics.fmean(self.latencies), 1) if self.latencies else None,
+            "slo_ms": slo_ms,
+        }
+
+
+async def run_clients(client, company_id, clients, stop, tally, slo, backoff):
+    token, _ = get_token_verifier().signer.issue(uuid.uuid4(), company_id, UserRole.COMPANY_EMPLOYEE)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def one():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            response = await client.get("/bench/report", headers=headers)
+            elapsed = time.perf_counter() - start
+            tally.statuses[response.status_code] = tally.statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                tally.latencies.append(elapsed * 1000)
+                tally.on_time += elapsed <= slo
+            else:
+                await asyncio.sleep(backoff)
+
+    await asyncio.gather(*(one() for _ in range(clients)))
+
+
+async def run_mode(admission, args):
+    app = build_app(admission, args)
+    quiet, noisy = Tally(), Tally()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            quiet_id, noisy_id = uuid.uuid4(), uuid.uuid4()
+            # Calentamiento: sólo la compañía tranquila
+            warmup = Tally()
+            await run_clients(client, quiet_id, args.quiet_clients, time.perf_counter() + args.warmup, warmup,
+                              args.slo / 1000, args.backoff)
+            stop = time.perf_counter() + args.seconds
+            await asyncio.gather(
+                run_clients(client, quiet_id, args.quiet_clients, stop, quiet, args.slo / 1000, args.backoff),
+                run_clients(client, noisy_id, args.clients, stop, noisy, args.slo / 1000, args.backoff),
+            )
+            stats = (await client.get("/internal/admission-stats")).json()
+    return {
+        "quiet": quiet.summary(args.seconds, args.slo),
+        "noisy": noisy.summary(args.seconds, args.slo),
+        "goodput_rps": round((quiet.on_time + noisy.on_time) / args.seconds, 1),
+        "admission": stats,
+    }
+
+
+async def main_async(args):
+    result = {"config": {key: value for key, value in vars(args).items() if key != "output"}, "modes": {}}
+    for mode in ("without_admission", "with_admission"):
+        result["modes"][mode] = await run_mode(mode == "with_admission", args)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent clients of the noisy company")
+    parser.add_argument("--quiet-clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--db-capacity", type=int, default=4, help="Queries the emulated database runs at once")
+    parser.add_argument("--query-ms", type=float, default=20)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--slo", type=float, default=500, help="A response slower than this (ms) is late")
+    parser.add_argument("--backoff", type=float, default=0.1, help="Client pause after a 429/503 (s)")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
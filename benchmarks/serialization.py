@@ -0,0 +1,85 @@
+"""Benchmark de serialización de una página de compañías.
+
+Compara el camino anterior (model_dump -> CompanyResponse(**...) -> validación
+y serialización de FastAPI contra el response_model -> json.dumps) con
+common.serialization.dump_json, que escribe los bytes en una sola pasada desde
+los dicts cacheados o las instancias ORM.
+
+    python benchmarks/serialization.py --rows 100 --iterations 2000
+"""
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from pydantic import TypeAdapter
+
+from common.models.ids import uuid7
+from common.pagination import PaginatedResponse, TotalMode
+from common.serialization import dump_json
+from users.models import Company
+from users.schemas import CompanyResponse
+
+
+def make_page(rows):
+    now = datetime.now()
+    companies = [
+        Company(id=uuid7(), name=f"Company {i}", email=f"company{i}@example.com",
+                description=f"Description {i}" if i % 3 else None, is_active=bool(i % 7),
+                created_at=now - timedelta(days=i), updated_at=now)
+        for i in range(rows)
+    ]
+    page = {"total": 10 * rows, "total_mode": TotalMode.EXACT, "page": 1, "page_size": rows, "total_pages": 10,
+            "has_next": True, "has_prev": False, "next_cursor": "abc", "prev_cursor": None}
+    return companies, page
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    companies, page = make_page(args.rows)
+    cached = [company.model_dump() for company in companies]
+    response_model = PaginatedResponse[CompanyResponse]
+    field = TypeAdapter(response_model)
+
+    def previous():
+        # Servicio + lo que hace FastAPI con el response_model (validate + serialize + JSONResponse)
+        data = [CompanyResponse(**company.model_dump()) for company in companies]
+        value = field.validate_python({**page, "data": data}, from_attributes=True)
+        return json.dumps(field.dump_python(value, mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+
+    cases = {
+        "previous_orm": previous,
+        "fast_orm": lambda: dump_json(response_model, {**page, "data": companies}),
+        "fast_cached_dicts": lambda: dump_json(response_model, {**page, "data": cached}),
+    }
+
+    assert json.loads(previous()) == json.loads(cases["fast_orm"]()) == json.loads(cases["fast_cached_dicts"]())
+
+    result = {"rows": args.rows, "iterations": args.iterations, "cases": {}}
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=args.iterations, repeat=3))
+        result["cases"][name] = {
+            "us_per_page": round(seconds / args.iterations * 1e6, 2),
+            "bytes": len(case()),
+        }
+    base = result["cases"]["previous_orm"]["us_per_page"]
+    for case in result["cases"].values():
+        case["speedup"] = round(base / case["us_per_page"], 2)
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
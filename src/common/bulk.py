@@ -0,0 +1,130 @@
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from pydantic_core import to_json, to_jsonable_python
+
+# (número de línea, registro, error)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+# Tamaño máximo (caracteres) de una línea o de un registro CSV multilínea. Sin tope,
+# una entrada sin saltos de línea o con comillas sin cerrar crecería en memoria sin límite
+MAX_RECORD_SIZE = 1024 * 1024
+
+
+def _too_large(max_record_size: int) -> str:
+    return f"Record exceeds {max_record_size} characters"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes],
+                     max_line_size: int = MAX_RECORD_SIZE) -> AsyncIterator[Optional[str]]:
+    """Divide un flujo de bytes UTF-8 en líneas sin cargarlo entero en memoria.
+    
+    Una línea de más de `max_line_size` caracteres se descarta (hasta su salto de
+    línea) y se devuelve como None.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    discarding = False
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if discarding:
+                # Final de la línea demasiado larga
+                discarding = False
+                yield None
+            else:
+                yield None if len(line) > max_line_size else line.rstrip("\r")
+        if len(buffer) > max_line_size:
+            discarding, buffer = True, ""
+
+    buffer += decoder.decode(b"", final=True)
+    if discarding or len(buffer) > max_line_size:
+        yield None
+    elif buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes],
+                      max_record_size: int = MAX_RECORD_SIZE) -> AsyncIterator[Record]:
+    line_number = 0
+    async for line in iter_lines(chunks, max_record_size):
+        line_number += 1
+        if line is None:
+            yield line_number, None, _too_large(max_record_size)
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, record, None
+
+
+async def iter_csv(chunks: AsyncIterator[bytes],
+                   max_record_size: int = MAX_RECORD_SIZE) -> AsyncIterator[Record]:
+    """Lee CSV con cabecera; admite campos entrecomillados con saltos de línea.
+    
+    Los campos vacíos se leen como None (encode_csv escribe None como campo vacío).
+    """
+    header = None
+    pending, start = "", 0
+    line_number = 0
+    async for line in iter_lines(chunks, max_record_size):
+        line_number += 1
+        if not pending:
+            start = line_number
+            if line is not None and not line.strip():
+                continue
+        if line is None or len(pending) + len(line) > max_record_size:
+            # Registro demasiado largo (o comillas sin cerrar): se descarta lo acumulado
+            pending = ""
+            yield start, None, _too_large(max_record_size)
+            continue
+        pending = f"{pending}\n{line}" if pending else line
+        # Comillas sin cerrar: el registro continúa en la línea siguiente
+        if pending.count('"') % 2:
+            continue
+
+        values = next(csv.reader([pending]))
+        pending = ""
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield start, {name: value if value != "" else None for name, value in zip(header, values)}, None
+
+    if pending:
+        yield start, None, "Unterminated quoted field"
+
+
+def iter_records(chunks: AsyncIterator[bytes], format: str,
+                 max_record_size: int = MAX_RECORD_SIZE) -> AsyncIterator[Record]:
+    if format == "csv":
+        return iter_csv(chunks, max_record_size)
+    if format == "ndjson":
+        return iter_ndjson(chunks, max_record_size)
+    raise ValueError(f'Unsupported format: {format}')
+
+
+def encode_ndjson(rows: Sequence[Dict[str, Any]]) -> bytes:
+    return b"".join(to_json(dict(row)) + b"\n" for row in rows)
+
+
+def encode_csv(rows: Sequence[Dict[str, Any]], columns: List[str], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(["" if row[column] is None else to_jsonable_python(row[column]) for column in columns])
+    return buffer.getvalue().encode()
@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import json
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from pydantic_core import to_jsonable_python
+
+# Marca de ausencia en caché (None es un valor cacheable)
+MISSING = object()
+
+
+class TTLCache:
+    """Caché LRU en memoria con expiración por tiempo (thread-safe)"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend(ABC):
+    """Almacenamiento de QueryCache: valores con TTL y generaciones por namespace"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def get_generation(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    async def bump_generation(self, namespace: str) -> int:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Backend en proceso (LRU + TTL)"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Las generaciones no pasan por el LRU: perder una reviviría entradas viejas
+        self._generations: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Any:
+        return self._cache.get(key, MISSING)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def get_generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def bump_generation(self, namespace: str) -> int:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        return self._generations[namespace]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "size": len(self._cache),
+            "max_size": self._cache.maxsize,
+            "evictions": self._cache.evictions,
+            "expirations": self._cache.expirations,
+        }
+
+
+class RedisCacheBackend(CacheBackend):
+    """Backend compartido entre workers (requiere el paquete `redis`)"""
+
+    def __init__(self, url: str, prefix: str = "allstore:cache:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError('CACHE_URL requires the "redis" package to be installed')
+
+        self._client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any:
+        raw = await self._client.get(self.prefix + key)
+        return MISSING if raw is None else pickle.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._client.set(self.prefix + key, pickle.dumps(value), px=max(1, int(ttl * 1000)))
+
+    async def get_generation(self, namespace: str) -> int:
+        raw = await self._client.get(f"{self.prefix}gen:{namespace}")
+        return int(raw or 0)
+
+    async def bump_generation(self, namespace: str) -> int:
+        return await self._client.incr(f"{self.prefix}gen:{namespace}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+
+class QueryCache:
+    """Caché de resultados de consultas.
+    
+    Las claves incluyen la generación del namespace (normalmente la tabla), así
+    que invalidar consiste en incrementarla. Los misses concurrentes de una misma
+    clave comparten una única carga (sin cache stampede).
+    
+    Las claves incluyen también el origen de los datos (primario o réplica). Durante
+    `replica_lag` segundos desde que se ve una generación nueva, lo leído de una
+    réplica no se guarda: podría ser anterior a la escritura que invalidó.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 60.0, replica_lag: float = 0.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.replica_lag = replica_lag
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.bypassed = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # namespace -> (generación, instante en que este proceso la vio por primera vez)
+        self._generation_seen: Dict[str, Tuple[int, float]] = {}
+
+    @staticmethod
+    def make_key(namespace: str, generation: int, parts: Any, source: str = "primary") -> str:
+        raw = json.dumps(to_jsonable_python(parts), sort_keys=True, separators=(",", ":"))
+        return f"{namespace}:{generation}:{source}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    def _generation_age(self, namespace: str, generation: int) -> float:
+        """Segundos desde que este proceso vio `generation` (otro worker pudo invalidar)"""
+        now = time.monotonic()
+        seen = self._generation_seen.get(namespace)
+        if seen is None or seen[0] != generation:
+            # La generación inicial de un proceso recién arrancado no viene de una escritura reciente
+            seen_at = float("-inf") if seen is None and generation == 0 else now
+            seen = self._generation_seen[namespace] = (generation, seen_at)
+        return now - seen[1]
+
+    async def get_or_load(self, namespace: str, parts: Any,
+                          loader: Callable[[], Awaitable[Any]], source: str = "primary") -> Any:
+        generation = await self.backend.get_generation(namespace)
+        if source != "primary" and self._generation_age(namespace, generation) < self.replica_lag:
+            self.bypassed += 1
+            return await loader()
+        key = self.make_key(namespace, generation, parts, source)
+
+        value = await self.backend.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            await self.backend.set(key, value, self.ttl)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # Evita el aviso "exception was never retrieved" si no hay nadie esperando
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+
+    async def invalidate(self, namespace: str) -> None:
+        self.invalidations += 1
+        generation = await self.backend.bump_generation(namespace)
+        self._generation_seen[namespace] = (generation, time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "bypassed": self.bypassed,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "in_flight": len(self._inflight),
+            **self.backend.stats(),
+        }
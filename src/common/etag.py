@@ -0,0 +1,47 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag fuerte (entre comillas) a partir de `parts`"""
+    raw = "|".join(part.isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+
+def row_etag(id: Any, updated_at: Optional[datetime]) -> str:
+    """Versión de una fila: cambia con cada escritura porque cambia updated_at"""
+    return make_etag(id, updated_at)
+
+
+def _get(item: Any, field: str) -> Any:
+    return item.get(field) if isinstance(item, dict) else getattr(item, field)
+
+
+def page_etag(items: Iterable[Any], *meta: Any) -> str:
+    """Versión de una página: sus ids (en orden), el updated_at más reciente y `meta`
+
+    `meta` son los campos del sobre (total, has_next, cursores...): cambian con altas
+    o bajas fuera de la página aunque sus filas sigan iguales.
+    """
+    items = list(items)
+    versions = [_get(item, "updated_at") for item in items]
+    latest = max((version for version in versions if version is not None), default=None)
+    return make_etag(*(_get(item, "id") for item in items), latest, *meta)
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """Compara `etag` con una cabecera If-None-Match (weak) o If-Match (strong)"""
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,14 @@
+class NotFoundError(ValueError):
+    """No existe la fila afectada (HTTP 404)"""
+
+
+class ConflictError(ValueError):
+    """La escritura viola una restricción única o de integridad (HTTP 409)"""
+
+
+class PreconditionFailedError(ValueError):
+    """La versión del recurso no coincide con la de If-Match (HTTP 412)"""
+
+
+class AuthenticationError(ValueError):
+    """Credenciales o token no válidos (HTTP 401)"""
@@ -1,8 +1,71 @@
+from functools import lru_cache, partial
+from typing import Any, Callable, ClassVar, Dict, List
 from uuid import UUID
 from pydantic import BaseModel
 from datetime import datetime
 
+
+def _in(field, value):
+    if not isinstance(value, (list, tuple, set)):
+        raise ValueError('__in filters expect a list of values')
+    return field.in_(value)
+
+def _between(field, value):
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ValueError('__between filters expect two values')
+    return field.between(value[0], value[1])
+
+# Operadores disponibles en las claves de filtro (campo__operador)
+FILTER_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "eq": lambda field, value: field == value,
+    "ne": lambda field, value: field != value,
+    "gt": lambda field, value: field > value,
+    "gte": lambda field, value: field >= value,
+    "lt": lambda field, value: field < value,
+    "lte": lambda field, value: field <= value,
+    "in": _in,
+    "between": _between,
+    "isnull": lambda field, value: field.is_(None) if value else field.is_not(None),
+    # Sin distinción de mayúsculas (ILIKE en Postgres, con índice trigram)
+    "contains": lambda field, value: field.icontains(value, autoescape=True),
+    "startswith": lambda field, value: field.istartswith(value, autoescape=True),
+}
+
+
+@lru_cache(maxsize=None)
+def compile_filter_plan(model_class: type) -> Dict[str, Callable[[Any], Any]]:
+    """Registro de filtros del modelo, construido una sola vez por modelo.
+    
+    Cada clave válida (`campo` o `campo__operador`) apunta a una función que
+    recibe el valor y devuelve la condición sobre la columna.
+    """
+    plan = {}
+    for name in model_class.__table__.c.keys():
+        column = getattr(model_class, name)
+        plan[name] = partial(FILTER_OPERATORS["eq"], column)
+        for operator, factory in FILTER_OPERATORS.items():
+            plan[f"{name}__{operator}"] = partial(factory, column)
+    return plan
+
+
+def build_conditions(model_class: type, filters: Dict[str, Any]) -> List[Any]:
+    """Convierte un diccionario de filtros en condiciones; rechaza claves desconocidas"""
+    plan = compile_filter_plan(model_class)
+    conditions = []
+    for key, value in filters.items():
+        if value is None:
+            continue
+        factory = plan.get(key)
+        if factory is None:
+            raise ValueError(f'Unknown filter: {key}')
+        conditions.append(factory(value))
+    return conditions
+
+
 class BaseFilter(BaseModel):
+    # Campos que controlan la consulta pero no son filtros
+    control_fields: ClassVar[frozenset] = frozenset({"sort_by", "sort_order"})
+
     id: UUID | None = None
     created_at: datetime | None = None
     updated_at: datetime | None = None
@@ -10,4 +73,7 @@ class BaseFilter(BaseModel):
     # Métodos para construir filtros dinámicos
     def get_filter_dict(self):
         """Retorna un diccionario con los filtros no nulos"""
-        return {k: v for k, v in self.model_dump().items() if v is not None}
\ No newline at end of file
+        return {
+            k: v for k, v in self.model_dump(exclude=set(self.control_fields)).items()
+            if v is not None
+        }
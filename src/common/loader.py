@@ -0,0 +1,98 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, Set, TypeVar
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from .services import AsyncBaseService
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class BatchLoader(Generic[K, V]):
+    """Agrupa las llamadas concurrentes a load() en una sola carga (estilo DataLoader).
+
+    Las claves pedidas durante `wait` segundos (o hasta juntar max_batch_size)
+    se resuelven con una única llamada a `batch_fn`, que recibe la lista de
+    claves y devuelve un dict clave -> valor; las ausentes se resuelven a None.
+    Las claves repetidas comparten el mismo resultado.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]],
+                 max_batch_size: int = 100, wait: float = 0.002):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.wait = wait
+        self.loads = 0
+        self.coalesced = 0
+        self.batches = 0
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        self.loads += 1
+        future = self._pending.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.wait, self._dispatch)
+
+        # shield: cancelar una petición no cancela la carga que comparten las demás
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: Dict[K, asyncio.Future]) -> None:
+        self.batches += 1
+        try:
+            results = await self.batch_fn(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Evita el aviso "exception was never retrieved" si no queda nadie esperando
+                    future.exception()
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "avg_batch_size": round((self.loads - self.coalesced) / self.batches, 2) if self.batches else None,
+            "pending": len(self._pending),
+        }
+
+
+def by_id_loader(model_class: type, session_factory: async_sessionmaker,
+                 **options: Any) -> BatchLoader:
+    """BatchLoader de filas de `model_class` por id (como dicts), con sesión propia por lote.
+
+    Cada lote abre su propia sesión: la de una petición no puede usarse desde
+    otra tarea mientras su dueña sigue trabajando con ella.
+    """
+    async def batch(ids: List[Any]) -> Dict[Any, dict]:
+        async with session_factory() as session:
+            rows = await AsyncBaseService(session, model_class).get_many(ids)
+            return {row.id: row.model_dump() for row in rows}
+
+    return BatchLoader(batch, **options)
@@ -0,0 +1,40 @@
+import os
+import threading
+import time
+from uuid import UUID
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7() -> UUID:
+    """UUID versión 7 (RFC 9562): timestamp en ms en los 48 bits altos + aleatorio.
+    
+    Ordenados por tiempo, así las inserciones van al final del índice de la clave
+    primaria en vez de repartirse por todo el btree. Dentro de un mismo
+    milisegundo un contador de 12 bits mantiene el orden en el proceso.
+    """
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            # Arranca en la mitad baja para dejar margen al contador
+            _counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms += 1
+                _counter = 0
+        timestamp, counter = _last_ms, _counter
+
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (
+        (timestamp & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return UUID(int=value)
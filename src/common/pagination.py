@@ -1,28 +1,65 @@
+import base64
+import binascii
+import json
+from enum import Enum
 from pydantic import BaseModel, Field
 from pydantic.generics import GenericModel
-from typing import TypeVar, Generic, List
+from pydantic_core import to_jsonable_python
+from typing import TypeVar, Generic, List, Optional, Dict, Any
 from fastapi import Query
 
 T = TypeVar('T')
 
 
+class TotalMode(str, Enum):
+    EXACT = "exact"          # COUNT(*) OVER () en la misma consulta
+    ESTIMATED = "estimated"  # Estadísticas del planificador (Postgres)
+    CACHED = "cached"        # Conteo exacto cacheado por firma de filtros
+    NONE = "none"            # Sin total; has_next se calcula con limit + 1
+
+
 class PaginationParams(BaseModel):
     page: int = Field(default=1, ge=1, description="Page number")
     page_size: int = Field(default=10, ge=1, le=100, description="Page size")
-    
+    cursor: Optional[str] = Field(default=None, description="Opaque cursor for keyset pagination (overrides page)")
+    total_mode: TotalMode = Field(default=TotalMode.EXACT, description="How the total is computed")
+
     @property
     def skip(self):
         return (self.page - 1) * self.page_size
-    
+
     @property
     def limit(self):
         return self.page_size
 
 class PaginatedResponse(GenericModel, Generic[T]):
     data: List[T]
-    total: int
+    total: Optional[int]
+    total_mode: TotalMode = TotalMode.EXACT
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
     has_next: bool
-    has_prev: bool
\ No newline at end of file
+    has_prev: bool
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Codifica el cursor como base64 url-safe (opaco para el cliente)"""
+    raw = json.dumps(to_jsonable_python(payload), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decodifica un cursor generado por encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(payload, dict) or "id" not in payload:
+        raise ValueError('Invalid cursor')
+
+    return payload
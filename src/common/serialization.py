@@ -0,0 +1,88 @@
+from functools import lru_cache
+from types import UnionType
+from typing import Any, Dict, List, Optional, TypedDict, Union, get_args, get_origin
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import inspect
+from sqlalchemy.engine import Row, RowMapping
+
+
+class JSONBytesResponse(Response):
+    """Respuesta JSON cuyo contenido ya viene serializado (bytes)"""
+    media_type = "application/json"
+
+
+def _json_annotation(annotation: Any) -> Any:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return json_schema_of(annotation)
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        return List[_json_annotation(get_args(annotation)[0])]
+    if origin in (dict, Dict):
+        key, value = get_args(annotation)
+        return Dict[key, _json_annotation(value)]
+    if origin in (Union, UnionType):
+        return Union[tuple(_json_annotation(arg) for arg in get_args(annotation))]
+    return annotation
+
+
+@lru_cache(maxsize=None)
+def json_schema_of(model: type) -> type:
+    """TypedDict con los campos de `model`.
+
+    Serializar un dict contra un TypedDict no crea instancias ni valida: pydantic-core
+    escribe directamente los campos declarados (e ignora el resto, p. ej. created_by).
+    """
+    fields = {name: _json_annotation(field.annotation) for name, field in model.model_fields.items()}
+    return TypedDict(f"{model.__name__}JSON", fields)
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(_json_annotation(model))
+
+
+def _plain(value: Any) -> Any:
+    """Dicts tal cual; filas y modelos ORM como dict (sin copiar si ya están cargados)"""
+    if isinstance(value, dict):
+        if any(isinstance(item, list) for item in value.values()):
+            return {key: _plain(item) for key, item in value.items()}
+        return value
+    if isinstance(value, list):
+        return value if all(isinstance(item, dict) for item in value) else [_plain(item) for item in value]
+    if isinstance(value, Row):
+        return value._asdict()
+    if isinstance(value, RowMapping):
+        return dict(value)
+    if isinstance(value, BaseModel):
+        state = inspect(value, raiseerr=False)
+        if state is not None and state.unloaded.isdisjoint(state.mapper.column_attrs.keys()):
+            return vars(value)
+        return value.model_dump()
+    return value
+
+
+def dump_json(model: Any, value: Any) -> bytes:
+    """Serializa `value` (dicts, filas o modelos ORM) con la forma de `model` en una pasada.
+
+    `model` es el response_model de la ruta (p. ej. CompanyResponse,
+    list[CompanyResponse] o PaginatedResponse[CompanyResponse]).
+    """
+    return _adapter(model).dump_json(_plain(value))
+
+
+def json_response(model: Any, value: Any, status_code: int = 200,
+                  response: Optional[Response] = None) -> JSONBytesResponse:
+    """JSONBytesResponse para `value`.
+
+    Al devolver una Response, FastAPI descarta las cabeceras fijadas en el
+    parámetro `response` de la ruta y sus dependencias (ETag, cookie de
+    get_write_session): se copian aquí.
+    """
+    result = JSONBytesResponse(dump_json(model, value), status_code=status_code)
+    if response is not None:
+        result.raw_headers.extend(
+            (key, header) for key, header in response.raw_headers
+            if key not in (b"content-length", b"content-type")
+        )
+    return result
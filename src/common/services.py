@@ -1,66 +1,68 @@
+import json
 import math
-from typing import Type, TypeVar, Generic, Optional, List, Any, Dict
+from functools import lru_cache
+from typing import Type, TypeVar, Generic, Optional, List, Any, AsyncIterator, Awaitable, Callable, Dict, Sequence
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import case, delete, literal, text, tuple_, update
+from sqlalchemy.exc import CompileError, IntegrityError, StatementError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
 from sqlmodel import Session, select, func, and_, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import Select
-from .pagination import PaginationParams
-from .filters import BaseFilter
+from .cache import QueryCache, TTLCache
+from .exceptions import ConflictError, NotFoundError, PreconditionFailedError
+from .pagination import PaginationParams, TotalMode, encode_cursor, decode_cursor
+from .filters import BaseFilter, build_conditions
 
 
 T = TypeVar('T')
 
+# Totales cacheados para TotalMode.CACHED, compartidos por todos los servicios
+_total_cache = TTLCache(maxsize=1024)
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(model_class: type, field_name: str) -> TypeAdapter:
+    return TypeAdapter(model_class.model_fields[field_name].annotation)
+
+
+def _python_value(model_class: type, field_name: str, value: Any) -> Any:
+    """Convierte un valor JSON al tipo Python declarado en el modelo"""
+    return _field_adapter(model_class, field_name).validate_python(value)
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) de una consulta, con sus parámetros ligados (no literales)"""
+    inherit_cache = False
+
+    def __init__(self, query: Select):
+        self.query = query
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.query, **kw)
+
 class BaseService(Generic[T]):
+    # Segundos que se reutiliza un total en TotalMode.CACHED
+    count_cache_ttl: float = 30.0
+    # Columnas en las que busca search()
+    search_fields: tuple = ()
+
     def __init__(self, session: Session, model_class: Type[T]):
         self.session = session
         self.model_class = model_class
     
+    def _build_conditions(self, filters: Dict[str, Any]) -> List[Any]:
+        """Condiciones de los filtros, resueltas con el plan precompilado del modelo"""
+        return build_conditions(self.model_class, filters)
+
     def _apply_filters(self, query: Select, filters: Dict[str, Any]) -> Select:
         """Aplica filtros dinámicos a la consulta"""
-        conditions = []
-        
-        for key, value in filters.items():
-            if value is None:
-                continue
-                
-            # Manejo de operadores especiales
-            if '__contains' in key:
-                field_name = key.replace('__contains', '')
-                field = getattr(self.model_class, field_name, None)
-                if field:
-                    conditions.append(field.contains(value))
-            elif '__gt' in key:
-                field_name = key.replace('__gt', '')
-                field = getattr(self.model_class, field_name, None)
-                if field:
-                    conditions.append(field > value)
-            elif '__lt' in key:
-                field_name = key.replace('__lt', '')
-                field = getattr(self.model_class, field_name, None)
-                if field:
-                    conditions.append(field < value)
-            elif '__gte' in key:
-                field_name = key.replace('__gte', '')
-                field = getattr(self.model_class, field_name, None)
-                if field:
-                    conditions.append(field >= value)
-            elif '__lte' in key:
-                field_name = key.replace('__lte', '')
-                field = getattr(self.model_class, field_name, None)
-                if field:
-                    conditions.append(field <= value)
-            elif '__in' in key:
-                field_name = key.replace('__in', '')
-                field = getattr(self.model_class, field_name, None)
-                if field and isinstance(value, list):
-                    conditions.append(field.in_(value))
-            else:
-                # Filtro exacto
-                field = getattr(self.model_class, key, None)
-                if field:
-                    conditions.append(field == value)
-        
+        conditions = self._build_conditions(filters)
         if conditions:
             query = query.where(and_(*conditions))
-        
         return query
     
     def _apply_sorting(self, query: Select, sort_by: Optional[str] = None, 
@@ -75,52 +77,330 @@ class BaseService(Generic[T]):
                     query = query.order_by(field.asc())
         return query
     
-    def get_all_paginated(self, 
-                         filter_params: Optional[BaseFilter] = None,
-                         pagination: Optional[PaginationParams] = None,
-                         sort_by: Optional[str] = None,
-                         sort_order: str = "asc") -> Dict[str, Any]:
-        """Obtiene todos los registros con paginación y filtros"""
+    def _build_search_query(self, term: str, limit: int) -> Select:
+        """Búsqueda por subcadena en search_fields ordenada por relevancia.
+        
+        En Postgres la relevancia es la similitud trigram (pg_trgm); en otros
+        motores se puntúa coincidencia exacta > prefijo > subcadena.
+        """
+        if not self.search_fields:
+            raise ValueError('Search is not enabled for this resource')
+        
+        term = term.strip()
+        if not term:
+            raise ValueError('Search term cannot be empty')
+        
+        fields = [getattr(self.model_class, name) for name in self.search_fields]
+        query = select(self.model_class).where(
+            or_(*(field.icontains(term, autoescape=True) for field in fields))
+        )
+        
+        if self.session.get_bind().dialect.name == "postgresql":
+            similarities = [func.similarity(field, term) for field in fields]
+            rank = func.greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        else:
+            lowered = term.lower()
+            rank = sum(
+                case(
+                    (func.lower(field) == lowered, 3),
+                    (func.lower(field).startswith(lowered, autoescape=True), 2),
+                    else_=1,
+                )
+                for field in fields
+            )
+        
+        return query.order_by(rank.desc(), self.model_class.id).limit(limit)
+
+    def _get_sort_column(self, sort_by: Optional[str]):
+        """Devuelve la columna de ordenamiento (None si no es una columna del modelo)"""
+        if not sort_by or sort_by == "id":
+            return None
+        if sort_by not in self.model_class.__table__.c:
+            return None
+        return getattr(self.model_class, sort_by)
+
+    def _apply_keyset_sorting(self, query: Select, sort_by: Optional[str] = None,
+                              sort_order: str = "asc", reverse: bool = False) -> Select:
+        """Ordena por (sort_by, id) para que la paginación sea determinista.
+        
+        Los nulos van siempre al final del orden canónico; con reverse=True
+        se recorre el mismo orden al revés (usado para la página anterior).
+        """
+        descending = (sort_order or "asc").lower() == "desc"
+        if reverse:
+            descending = not descending
+
+        order_by = []
+        field = self._get_sort_column(sort_by)
+        if field is not None:
+            order = field.desc() if descending else field.asc()
+            if self.model_class.__table__.c[sort_by].nullable:
+                order = order.nulls_first() if reverse else order.nulls_last()
+            order_by.append(order)
+
+        id_field = self.model_class.id
+        order_by.append(id_field.desc() if descending else id_field.asc())
+
+        return query.order_by(*order_by)
+
+    def _keyset_condition(self, sort_by: Optional[str], sort_order: str,
+                          value: Any, last_id: Any, after: bool):
+        """Condición para obtener las filas posteriores (o anteriores) a (value, last_id)"""
+        descending = (sort_order or "asc").lower() == "desc"
+        forward = after != descending
+        id_field = self.model_class.id
+        id_cmp = id_field > last_id if forward else id_field < last_id
+
+        field = self._get_sort_column(sort_by)
+        if field is None:
+            return id_cmp
+
+        column = self.model_class.__table__.c[sort_by]
+        if not column.nullable:
+            row = tuple_(field, id_field)
+            bound = tuple_(literal(value, column.type), literal(last_id, id_field.type))
+            return row > bound if forward else row < bound
+
+        # Columna nullable: los nulos están al final del orden canónico
+        if value is None:
+            if after:
+                return and_(field.is_(None), id_cmp)
+            return or_(field.is_not(None), and_(field.is_(None), id_cmp))
+
+        field_cmp = field > value if forward else field < value
+        condition = or_(field_cmp, and_(field == value, id_cmp))
+        return or_(condition, field.is_(None)) if after else condition
+
+    def _make_cursor(self, item: Any, sort_by: Optional[str], sort_order: str, direction: str) -> str:
+        field = self._get_sort_column(sort_by)
+        return encode_cursor({
+            "s": sort_by if field is not None else None,
+            "o": (sort_order or "asc").lower(),
+            "v": getattr(item, sort_by) if field is not None else None,
+            "id": item.id,
+            "d": direction,
+        })
+
+    def _read_cursor(self, cursor: str, sort_by: Optional[str], sort_order: str) -> Dict[str, Any]:
+        """Decodifica el cursor y convierte sus valores a los tipos de las columnas"""
+        payload = decode_cursor(cursor)
+        field = self._get_sort_column(sort_by)
+        expected_sort = sort_by if field is not None else None
+
+        if payload.get("s") != expected_sort or payload.get("o") != (sort_order or "asc").lower():
+            raise ValueError('Cursor does not match the requested sorting')
+        if payload.get("d") not in ("next", "prev"):
+            raise ValueError('Invalid cursor')
+
+        try:
+            payload["id"] = _python_value(self.model_class, "id", payload["id"])
+            if field is not None and payload.get("v") is not None:
+                payload["v"] = _python_value(self.model_class, sort_by, payload["v"])
+        except ValidationError:
+            raise ValueError('Invalid cursor')
+
+        return payload
+
+    def _estimate_statement(self, conditions: List[Any]):
+        """Sentencia que estima el total con las estadísticas de Postgres (None en otros motores)"""
+        dialect = self.session.get_bind().dialect
+        if dialect.name != "postgresql":
+            return None
+
+        if not conditions:
+            return text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"
+            ).bindparams(table=self.model_class.__tablename__)
+
+        # Los valores de los filtros van como parámetros: en el texto del SQL se
+        # interpretarían (p. ej. " :palabra" como un bind) o habría que escaparlos
+        return _Explain(select(self.model_class.id).where(and_(*conditions)))
+
+    @staticmethod
+    def _parse_estimate(value: Any) -> Optional[int]:
+        """Extrae el número de filas de reltuples o de un plan EXPLAIN en JSON"""
+        if isinstance(value, str):
+            value = json.loads(value)
+        if isinstance(value, list):
+            try:
+                value = value[0]["Plan"]["Plan Rows"]
+            except (KeyError, IndexError, TypeError):
+                return None
+        # reltuples = -1 si la tabla nunca fue analizada
+        if value is None or value < 0:
+            return None
+        return int(value)
+
+    def _total_cache_key(self, filters: Dict[str, Any]) -> tuple:
+        return (self.model_class.__tablename__, repr(sorted(filters.items())))
+
+    def _plan_page(self,
+                   filter_params: Optional[BaseFilter],
+                   pagination: Optional[PaginationParams],
+                   sort_by: Optional[str],
+                   sort_order: str) -> Dict[str, Any]:
+        """Construye las consultas de una página (compartido por la variante síncrona y la asíncrona)"""
         
         # Valores por defecto
         if pagination is None:
             pagination = PaginationParams(page=1, page_size=10)
         
+        mode = pagination.total_mode
+        filters = filter_params.get_filter_dict() if filter_params else {}
+        cursor = self._read_cursor(pagination.cursor, sort_by, sort_order) if pagination.cursor else None
+        backwards = cursor is not None and cursor["d"] == "prev"
+        
+        # Las condiciones se construyen una vez y se comparten entre consultas
+        conditions = self._build_conditions(filters)
+        
         # Consulta para contar total
         count_query = select(func.count()).select_from(self.model_class)
+        if conditions:
+            count_query = count_query.where(and_(*conditions))
         
-        # Consulta para obtener datos
-        data_query = select(self.model_class)
+        # Consulta para obtener datos. En modo exacto el total viaja en la misma
+        # consulta: ventana COUNT(*) OVER () con offset, o subconsulta escalar con
+        # cursor (la condición keyset no debe afectar al total)
+        if mode is TotalMode.EXACT:
+            total_column = count_query.scalar_subquery() if cursor else func.count().over()
+            data_query = select(self.model_class, total_column)
+        else:
+            data_query = select(self.model_class)
+        if conditions:
+            data_query = data_query.where(and_(*conditions))
         
-        # Aplicar filtros si existen
-        if filter_params:
-            filters = filter_params.get_filter_dict()
-            count_query = self._apply_filters(count_query, filters)
-            data_query = self._apply_filters(data_query, filters)
+        if cursor:
+            data_query = data_query.where(
+                self._keyset_condition(sort_by, sort_order, cursor.get("v"), cursor["id"], after=not backwards)
+            )
+            data_query = self._apply_keyset_sorting(data_query, sort_by, sort_order, reverse=backwards)
+            data_query = data_query.limit(pagination.limit + 1)
+        else:
+            # Sólo el modo exacto conoce el total; el resto detecta la siguiente página con limit + 1
+            limit = pagination.limit if mode is TotalMode.EXACT else pagination.limit + 1
+            data_query = self._apply_keyset_sorting(data_query, sort_by, sort_order)
+            data_query = data_query.offset(pagination.skip).limit(limit)
         
-        # Aplicar ordenamiento
-        data_query = self._apply_sorting(data_query, sort_by, sort_order)
+        return {
+            "pagination": pagination,
+            "mode": mode,
+            "filters": filters,
+            "conditions": conditions,
+            "cursor": cursor,
+            "backwards": backwards,
+            "sort_by": sort_by,
+            "sort_order": sort_order,
+            "count_query": count_query,
+            "data_query": data_query,
+        }
+
+    def _split_rows(self, plan: Dict[str, Any], rows: List[Any]) -> tuple:
+        """Separa las entidades del total de ventana (None si hay que calcularlo aparte)"""
+        if plan["mode"] is not TotalMode.EXACT:
+            return list(rows), None
         
-        # Aplicar paginación
-        data_query = data_query.offset(pagination.skip).limit(pagination.limit)
+        items = [row[0] for row in rows]
+        if rows:
+            return items, rows[0][1]
+        if plan["cursor"] is None and plan["pagination"].skip == 0:
+            return items, 0
+        # Página fuera de rango: la ventana no devuelve filas
+        return items, None
+
+    def _build_page(self, plan: Dict[str, Any], items: List[Any], total: Optional[int]) -> Dict[str, Any]:
+        """Calcula los metadatos de paginación y los cursores"""
+        pagination = plan["pagination"]
+        sort_by, sort_order = plan["sort_by"], plan["sort_order"]
         
-        # Ejecutar consultas
-        total = self.session.exec(count_query).one()
-        items = self.session.exec(data_query).all()
+        total_pages = None
+        if total is not None:
+            total_pages = math.ceil(total / pagination.page_size) if pagination.page_size > 0 else 0
         
-        # Calcular metadatos de paginación
-        total_pages = math.ceil(total / pagination.page_size) if pagination.page_size > 0 else 0
+        if plan["cursor"]:
+            has_more = len(items) > pagination.limit
+            items = items[:pagination.limit]
+            if plan["backwards"]:
+                items.reverse()
+                has_next, has_prev = True, has_more
+            else:
+                has_next, has_prev = has_more, True
+        elif plan["mode"] is TotalMode.EXACT:
+            has_next = pagination.page < total_pages
+            has_prev = pagination.page > 1
+        else:
+            has_next = len(items) > pagination.limit
+            items = items[:pagination.limit]
+            has_prev = pagination.page > 1
         
         return {
             "data": items,
             "total": total,
+            "total_mode": plan["mode"],
             "page": pagination.page,
             "page_size": pagination.page_size,
             "total_pages": total_pages,
-            "has_next": pagination.page < total_pages,
-            "has_prev": pagination.page > 1
+            "has_next": has_next,
+            "has_prev": has_prev,
+            "next_cursor": self._make_cursor(items[-1], sort_by, sort_order, "next") if items and has_next else None,
+            "prev_cursor": self._make_cursor(items[0], sort_by, sort_order, "prev") if items and has_prev else None,
         }
+
+    def _estimate_total(self, conditions: List[Any], count_query: Select) -> int:
+        """Estima el total con las estadísticas de Postgres (conteo exacto en otros motores)"""
+        statement = self._estimate_statement(conditions)
+        if statement is not None:
+            try:
+                # Savepoint: si el EXPLAIN falla, la transacción sigue sirviendo para el conteo
+                with self.session.begin_nested():
+                    estimate = self._parse_estimate(self.session.exec(statement).scalar())
+            except (CompileError, StatementError):
+                # Sin estimación (consulta no explicable o error de la base): conteo exacto
+                estimate = None
+            if estimate is not None:
+                return estimate
+        return self.session.exec(count_query).one()
+
+    def _cached_total(self, filters: Dict[str, Any], count_query: Select) -> int:
+        """Conteo exacto cacheado durante count_cache_ttl segundos por firma de filtros"""
+        key = self._total_cache_key(filters)
+        total = _total_cache.get(key)
+        if total is None:
+            total = self.session.exec(count_query).one()
+            _total_cache.set(key, total, ttl=self.count_cache_ttl)
+        return total
+
+    def _resolve_total(self, plan: Dict[str, Any]) -> Optional[int]:
+        if plan["mode"] is TotalMode.ESTIMATED:
+            return self._estimate_total(plan["conditions"], plan["count_query"])
+        if plan["mode"] is TotalMode.CACHED:
+            return self._cached_total(plan["filters"], plan["count_query"])
+        if plan["mode"] is TotalMode.EXACT:
+            return self.session.exec(plan["count_query"]).one()
+        return None
+
+    def get_all_paginated(self, 
+                         filter_params: Optional[BaseFilter] = None,
+                         pagination: Optional[PaginationParams] = None,
+                         sort_by: Optional[str] = None,
+                         sort_order: str = "asc") -> Dict[str, Any]:
+        """Obtiene todos los registros con paginación y filtros
+        
+        Si pagination.cursor está definido se usa paginación por cursor (keyset),
+        cuyo coste no depende de la profundidad de la página. pagination.total_mode
+        decide cómo se calcula el total (ver TotalMode).
+        """
+        plan = self._plan_page(filter_params, pagination, sort_by, sort_order)
+        
+        items, total = self._split_rows(plan, self.session.exec(plan["data_query"]).all())
+        if total is None:
+            total = self._resolve_total(plan)
+        
+        return self._build_page(plan, items, total)
     
+    def search(self, term: str, limit: int = 20) -> List[T]:
+        """Busca `term` en search_fields y devuelve los resultados más relevantes"""
+        return self.session.exec(self._build_search_query(term, limit)).all()
+
     def get_by_filters(self, 
                       filter_params: BaseFilter,
                       sort_by: Optional[str] = None,
@@ -132,4 +412,258 @@ class BaseService(Generic[T]):
         query = self._apply_filters(query, filters)
         query = self._apply_sorting(query, sort_by, sort_order)
         
-        return self.session.exec(query).all()
\ No newline at end of file
+        return self.session.exec(query).all()
+
+
+class AsyncBaseService(BaseService[T]):
+    """Variante de BaseService sobre AsyncSession.
+    
+    Reutiliza la construcción de consultas (filtros, ordenamiento, paginación)
+    y sólo cambia la ejecución, que no bloquea el event loop.
+    """
+
+    # Caché de consultas opcional; las escrituras deben llamar a invalidate_cache()
+    cache: Optional[QueryCache] = None
+
+    def __init__(self, session: AsyncSession, model_class: Type[T]):
+        super().__init__(session, model_class)
+
+    @property
+    def cache_namespace(self) -> str:
+        return self.model_class.__tablename__
+
+    async def _cached(self, parts: Any, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Devuelve el resultado cacheado para `parts` o lo carga con `loader`.
+        
+        Las sesiones de un cliente que acaba de escribir (sticky al primario) no
+        usan la caché: una entrada llenada desde una réplica rompería read-your-writes.
+        """
+        info = self.session.info
+        if self.cache is None or info.get("sticky_primary"):
+            return await loader()
+        return await self.cache.get_or_load(self.cache_namespace, parts, loader,
+                                            source=info.get("source", "primary"))
+
+    async def invalidate_cache(self) -> None:
+        if self.cache is not None:
+            await self.cache.invalidate(self.cache_namespace)
+
+    async def _estimate_total(self, conditions: List[Any], count_query: Select) -> int:
+        statement = self._estimate_statement(conditions)
+        if statement is not None:
+            try:
+                async with self.session.begin_nested():
+                    estimate = self._parse_estimate((await self.session.exec(statement)).scalar())
+            except (CompileError, StatementError):
+                # Sin estimación (consulta no explicable o error de la base): conteo exacto
+                estimate = None
+            if estimate is not None:
+                return estimate
+        return (await self.session.exec(count_query)).one()
+
+    async def _cached_total(self, filters: Dict[str, Any], count_query: Select) -> int:
+        key = self._total_cache_key(filters)
+        total = _total_cache.get(key)
+        if total is None:
+            total = (await self.session.exec(count_query)).one()
+            _total_cache.set(key, total, ttl=self.count_cache_ttl)
+        return total
+
+    async def _resolve_total(self, plan: Dict[str, Any]) -> Optional[int]:
+        if plan["mode"] is TotalMode.ESTIMATED:
+            return await self._estimate_total(plan["conditions"], plan["count_query"])
+        if plan["mode"] is TotalMode.CACHED:
+            return await self._cached_total(plan["filters"], plan["count_query"])
+        if plan["mode"] is TotalMode.EXACT:
+            return (await self.session.exec(plan["count_query"])).one()
+        return None
+
+    async def get_all_paginated(self,
+                                filter_params: Optional[BaseFilter] = None,
+                                pagination: Optional[PaginationParams] = None,
+                                sort_by: Optional[str] = None,
+                                sort_order: str = "asc") -> Dict[str, Any]:
+        """Obtiene todos los registros con paginación y filtros (cacheado si hay caché)"""
+        plan = self._plan_page(filter_params, pagination, sort_by, sort_order)
+        if self.cache is None:
+            return await self._load_page(plan)
+        
+        parts = ("page", plan["filters"], plan["pagination"].model_dump(), sort_by, sort_order)
+        return await self._cached(parts, lambda: self._load_page(plan, serialize=True))
+
+    async def _load_page(self, plan: Dict[str, Any], serialize: bool = False) -> Dict[str, Any]:
+        rows = (await self.session.exec(plan["data_query"])).all()
+        items, total = self._split_rows(plan, rows)
+        if total is None:
+            total = await self._resolve_total(plan)
+        
+        page = self._build_page(plan, items, total)
+        if serialize:
+            # En caché se guardan dicts, no instancias ligadas a una sesión
+            page["data"] = [item.model_dump() for item in page["data"]]
+        return page
+
+    async def search(self, term: str, limit: int = 20) -> List[T]:
+        """Busca `term` en search_fields y devuelve los resultados más relevantes"""
+        return (await self.session.exec(self._build_search_query(term, limit))).all()
+
+    async def get_by_filters(self,
+                             filter_params: BaseFilter,
+                             sort_by: Optional[str] = None,
+                             sort_order: str = "asc") -> List[T]:
+        """Obtiene registros por filtros sin paginación"""
+        query = select(self.model_class)
+        
+        filters = filter_params.get_filter_dict()
+        query = self._apply_filters(query, filters)
+        query = self._apply_sorting(query, sort_by, sort_order)
+        
+        return (await self.session.exec(query)).all()
+
+    # CRUD
+    async def get_by_id(self, id: Any, for_update: bool = False) -> Optional[T]:
+        return await self.session.get(self.model_class, id, with_for_update=for_update or None)
+
+    async def get_many(self, ids: List[Any]) -> List[T]:
+        """Filas con esos ids en una sola consulta (IN); las inexistentes se omiten"""
+        if not ids:
+            return []
+        query = select(self.model_class).where(self.model_class.id.in_(ids))
+        return (await self.session.exec(query)).all()
+
+    async def get_version(self, id: Any) -> Optional[Any]:
+        """updated_at de la fila sin cargarla entera (None si no existe)"""
+        query = select(self.model_class.updated_at).where(self.model_class.id == id)
+        return (await self.session.exec(query)).first()
+
+    async def create(self, values: Dict[str, Any], commit: bool = True) -> T:
+        """Inserta la entidad; con commit=False sólo hace flush (el commit lo hace quien llama)"""
+        instance = self.model_class(**values)
+        self.session.add(instance)
+        if not commit:
+            await self.session.flush()
+            return instance
+        await self.session.commit()
+        await self.session.refresh(instance)
+        return instance
+
+    async def update(self, instance: T, values: Dict[str, Any]) -> T:
+        for key, value in values.items():
+            setattr(instance, key, value)
+        await self.session.commit()
+        await self.session.refresh(instance)
+        return instance
+
+    async def delete(self, instance: T) -> None:
+        await self.session.delete(instance)
+        await self.session.commit()
+
+    def _returning_columns(self, columns: Optional[List[str]]) -> list:
+        table = self.model_class.__table__
+        return [table.c[name] for name in columns] if columns else list(table.c)
+
+    async def _execute_write(self, statement, expected_version: Optional[Any],
+                             commit: bool = True) -> Dict[str, Any]:
+        try:
+            row = (await self.session.exec(statement)).mappings().first()
+        except IntegrityError as e:
+            await self.session.rollback()
+            raise ConflictError(f'{self.model_class.__name__} conflicts with an existing row') from e
+        
+        if row is None:
+            await self.session.rollback()
+            if expected_version is not None:
+                # Existía con esa versión (la comprobó quien llama): otra petición la cambió o borró
+                raise PreconditionFailedError(f'{self.model_class.__name__} was modified by another request')
+            raise NotFoundError(f'{self.model_class.__name__} not found')
+        
+        row = dict(row)
+        if commit:
+            await self.session.commit()
+        return row
+
+    async def update_returning(self, id: Any, values: Dict[str, Any],
+                               columns: Optional[List[str]] = None,
+                               expected_version: Optional[Any] = None,
+                               conditions: Sequence[Any] = (),
+                               commit: bool = True) -> Dict[str, Any]:
+        """UPDATE parcial en una sentencia con RETURNING (y commit), sin cargar la entidad.
+        
+        Con expected_version sólo se actualiza si updated_at sigue teniendo ese valor
+        (concurrencia optimista, sin bloqueos entre la lectura y la escritura).
+        `conditions` restringe además la fila (p. ej. a una compañía); si no se
+        cumplen, la fila cuenta como inexistente. Con commit=False la transacción
+        queda abierta para más escrituras (p. ej. el outbox de cambios).
+        Lanza NotFoundError, ConflictError o PreconditionFailedError.
+        """
+        table = self.model_class.__table__
+        statement = update(table).where(table.c.id == id, *conditions).values(**values)
+        if expected_version is not None:
+            statement = statement.where(table.c.updated_at == expected_version)
+        statement = statement.returning(*self._returning_columns(columns))
+        return await self._execute_write(statement, expected_version, commit)
+
+    async def delete_returning(self, id: Any, columns: Optional[List[str]] = None,
+                               expected_version: Optional[Any] = None,
+                               commit: bool = True) -> Dict[str, Any]:
+        """DELETE en una sentencia con RETURNING (y commit); mismas reglas que update_returning"""
+        table = self.model_class.__table__
+        statement = delete(table).where(table.c.id == id)
+        if expected_version is not None:
+            statement = statement.where(table.c.updated_at == expected_version)
+        statement = statement.returning(*self._returning_columns(columns or ["id"]))
+        return await self._execute_write(statement, expected_version, commit)
+
+    async def stream_rows(self,
+                          filter_params: Optional[BaseFilter] = None,
+                          sort_by: Optional[str] = None,
+                          sort_order: str = "asc",
+                          columns: Optional[List[str]] = None,
+                          batch_size: int = 1000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Recorre todos los registros filtrados en lotes usando un cursor del servidor.
+        
+        Devuelve filas (mappings) en vez de entidades: no pasan por el identity map,
+        así que la memoria no crece con el número de filas.
+        """
+        table = self.model_class.__table__
+        query = select(*(table.c[name] for name in columns) if columns else table.c)
+        if filter_params:
+            query = self._apply_filters(query, filter_params.get_filter_dict())
+        query = self._apply_sorting(query, sort_by, sort_order)
+        query = query.execution_options(stream_results=True, yield_per=batch_size)
+        
+        result = await self.session.stream(query)
+        async for partition in result.mappings().partitions(batch_size):
+            yield partition
+
+    async def upsert_many(self, rows: List[Dict[str, Any]], conflict_key: str,
+                          update_fields: Optional[List[str]] = None) -> int:
+        """INSERT multi-fila con ON CONFLICT sobre `conflict_key` (sin commit).
+        
+        Con update_fields actualiza esas columnas en los conflictos; sin ellos
+        los ignora. Devuelve el número de filas insertadas o actualizadas.
+        """
+        return len(await self.upsert_many_ids(rows, conflict_key, update_fields))
+
+    async def upsert_many_ids(self, rows: List[Dict[str, Any]], conflict_key: str,
+                              update_fields: Optional[List[str]] = None) -> List[Any]:
+        """Como upsert_many, pero devuelve los ids de las filas insertadas o actualizadas"""
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise ValueError(f'Upsert is not supported on {dialect}')
+        
+        statement = insert(self.model_class)
+        if update_fields:
+            values = {field: statement.excluded[field] for field in update_fields}
+            if "updated_at" in self.model_class.__table__.c:
+                values["updated_at"] = func.now()
+            statement = statement.on_conflict_do_update(index_elements=[conflict_key], set_=values)
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=[conflict_key])
+        
+        result = await self.session.exec(statement.returning(self.model_class.id), params=rows)
+        return list(result.scalars().all())
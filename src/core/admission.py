@@ -0,0 +1,323 @@
+import asyncio
+import json
+import math
+import re
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+from .metrics import MetricsRegistry, current_request
+
+# Clases de ruta: la primera regla que encaja (método o None = cualquiera, regex del path).
+# El middleware corre antes del router, así que se clasifica por la URL, no por la plantilla.
+ROUTE_CLASSES: Sequence[Tuple[Optional[frozenset], "re.Pattern[str]", str]] = (
+    (None, re.compile(r"^/(health-check|metrics|internal/|docs|redoc|openapi\.json)"), "exempt"),
+    (None, re.compile(r"/(export|bulk)$"), "export"),
+    (None, re.compile(r"^/auth/(login|register)$"), "auth"),
+    (frozenset({"GET", "HEAD"}), re.compile(r"^/users/companies(/search)?$|/products/search$"), "list"),
+    (frozenset({"GET", "HEAD", "OPTIONS"}), re.compile(r""), "read"),
+    (None, re.compile(r""), "write"),
+)
+
+def route_class(method: str, path: str) -> str:
+    for methods, pattern, name in ROUTE_CLASSES:
+        if (methods is None or method in methods) and pattern.search(path):
+            return name
+    return "write"
+
+
+def no_tenant(scope: dict) -> Optional[str]:
+    return None
+
+
+def bearer_token(scope: dict) -> Optional[str]:
+    """Token de la cabecera `Authorization: Bearer <token>` de la petición ASGI"""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            token = token.strip()
+            return token if scheme.lower() == "bearer" and token else None
+    return None
+
+
+class Rejected(Exception):
+    """Petición no admitida: 429 (cuota del tenant) o 503 (servicio saturado)"""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class ConcurrencyLimiter:
+    """Límite de peticiones simultáneas de una clase de ruta, con cola acotada.
+
+    Lo que no cabe espera en una cola FIFO de `queue_size` como mucho `queue_timeout`
+    segundos. Si por lo que tarda cada petición la espera estimada ya supera ese
+    plazo, se rechaza al llegar en vez de ocupar la cola para fallar igualmente.
+    `limit` se mueve entre `min_limit` y `max_limit` (ver AdmissionController).
+    """
+
+    def __init__(self, name: str, limit: int, min_limit: int = 1, queue_size: int = 64,
+                 queue_timeout: float = 2.0):
+        self.name = name
+        self.max_limit = limit
+        self.min_limit = min(min_limit, limit)
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+        # Media móvil de lo que tarda una petición admitida (segundos)
+        self.service_time = 0.0
+        # Desde el último ajuste: tuvo tráfico (puede bajar) / llegó a su límite (puede crecer)
+        self.active = False
+        self.saturated = False
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def expected_wait(self, position: int) -> float:
+        return self.service_time * position / max(self.limit, 1)
+
+    def _reject(self, reason: str) -> Rejected:
+        self.rejected += 1
+        return Rejected(503, reason, self.expected_wait(len(self._waiters) + 1))
+
+    async def acquire(self) -> None:
+        self.active = True
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        self.saturated = True
+        if len(self._waiters) >= self.queue_size:
+            raise self._reject("queue full")
+        if self.expected_wait(len(self._waiters) + 1) > self.queue_timeout:
+            raise self._reject("queue deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            # shield: al vencer el plazo el futuro sigue vivo y se puede ver si llegó el turno
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                self.admitted += 1
+                return
+            waiter.cancel()
+            raise self._reject("queue timeout")
+        except asyncio.CancelledError:
+            # El cliente se fue: si ya tenía plaza, se devuelve
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            else:
+                waiter.cancel()
+            raise
+        self.admitted += 1
+
+    def release(self, duration: Optional[float]) -> None:
+        self.in_flight -= 1
+        if duration is not None:
+            self.service_time = duration if not self.service_time else 0.9 * self.service_time + 0.1 * duration
+        self._wake()
+
+    def _wake(self) -> None:
+        # Las plazas libres pasan directamente a los primeros de la cola
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def set_limit(self, limit: int) -> None:
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit, "max_limit": self.max_limit, "in_flight": self.in_flight,
+            "queued_now": len(self._waiters), "admitted": self.admitted, "queued": self.queued,
+            "rejected": self.rejected, "service_time_ms": round(self.service_time * 1000, 3),
+        }
+
+
+class TenantLimiter:
+    """Peticiones simultáneas por compañía: un tenant no acapara todas las plazas.
+    
+    La compañía es la del cliente autenticado, no la de la URL (el recurso leído);
+    las peticiones sin tenant no tienen cuota propia.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._in_flight: Dict[str, int] = {}
+        self.rejected = 0
+
+    def acquire(self, tenant: Optional[str]) -> None:
+        if tenant is None or self.limit <= 0:
+            return
+        count = self._in_flight.get(tenant, 0)
+        if count >= self.limit:
+            self.rejected += 1
+            raise Rejected(429, "tenant concurrency limit", 1)
+        self._in_flight[tenant] = count + 1
+
+    def release(self, tenant: Optional[str]) -> None:
+        if tenant is None or self.limit <= 0:
+            return
+        count = self._in_flight[tenant] - 1
+        if count:
+            self._in_flight[tenant] = count
+        else:
+            del self._in_flight[tenant]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit": self.limit, "active_tenants": len(self._in_flight), "rejected": self.rejected}
+
+
+class AdmissionController:
+    """Límites por clase de ruta que se adaptan a la latencia observada en la base de datos.
+
+    Cada `adjust_interval` se compara la latencia media por consulta de la última
+    ventana con la de referencia (la mejor vista, que sube despacio si la base se
+    vuelve más lenta de forma sostenida). Si supera `tolerance` veces la referencia
+    la base está encolando: los límites de las clases con tráfico bajan en
+    proporción (como mucho a la mitad por ventana). Si no, las clases que llegaron
+    a su límite suben de uno en uno hasta el configurado.
+    """
+
+    def __init__(self, limits: Dict[str, int], tenant_limit: int = 0, min_limit: int = 1,
+                 queue_size: int = 64, queue_timeout: float = 2.0, tolerance: float = 2.0,
+                 adjust_interval: float = 1.0, classify: Callable[[str, str], str] = route_class,
+                 tenant: Callable[[dict], Optional[str]] = no_tenant):
+        self.limiters = {
+            name: ConcurrencyLimiter(name, limit, min_limit, queue_size, queue_timeout)
+            for name, limit in limits.items()
+        }
+        self.tenants = TenantLimiter(tenant_limit)
+        self.tolerance = tolerance
+        self.adjust_interval = adjust_interval
+        self.classify = classify
+        self.tenant = tenant
+        self.baseline: Optional[float] = None
+        self.recent: Optional[float] = None
+        self._window_time = 0.0
+        self._window_queries = 0
+        self._next_adjust = time.monotonic() + adjust_interval
+
+    @classmethod
+    def from_settings(cls, settings, tenant: Callable[[dict], Optional[str]] = no_tenant) -> "AdmissionController":
+        return cls(
+            settings.ADMISSION_CLASS_LIMITS,
+            tenant_limit=settings.ADMISSION_TENANT_LIMIT,
+            min_limit=settings.ADMISSION_MIN_LIMIT,
+            queue_size=settings.ADMISSION_QUEUE_SIZE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            tolerance=settings.ADMISSION_LATENCY_TOLERANCE,
+            adjust_interval=settings.ADMISSION_ADJUST_SECONDS,
+            tenant=tenant,
+        )
+
+    def observe_db(self, db_time: float, queries: int) -> None:
+        if queries:
+            self._window_time += db_time
+            self._window_queries += queries
+        if time.monotonic() >= self._next_adjust:
+            self.adjust()
+
+    def adjust(self) -> None:
+        self._next_adjust = time.monotonic() + self.adjust_interval
+        gradient = 1.0
+        if self._window_queries:
+            self.recent = self._window_time / self._window_queries
+            # La referencia sigue a la mejor latencia vista y sube un 1% por ventana
+            self.baseline = self.recent if self.baseline is None else min(self.recent, self.baseline * 1.01)
+            gradient = min(1.0, self.baseline * self.tolerance / self.recent)
+        self._window_time, self._window_queries = 0.0, 0
+
+        for limiter in self.limiters.values():
+            # Sólo se reducen las clases con tráfico: las demás no cargan la base
+            if gradient < 1.0 and limiter.active:
+                limiter.set_limit(math.floor(limiter.limit * max(0.5, gradient)))
+            elif gradient >= 1.0 and limiter.saturated:
+                limiter.set_limit(limiter.limit + 1)
+            limiter.active = limiter.saturated = False
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(value):
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "db_latency_baseline_ms": ms(self.baseline),
+            "db_latency_recent_ms": ms(self.recent),
+            "classes": {name: limiter.stats() for name, limiter in self.limiters.items()},
+            "tenants": self.tenants.stats(),
+        }
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI de control de admisión.
+
+    Va dentro de MetricsMiddleware: los rechazos cuentan en las métricas de
+    peticiones y la latencia de base de datos de cada petición admitida llega por
+    `current_request` para adaptar los límites.
+    """
+
+    def __init__(self, app, controller: AdmissionController, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.controller = controller
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller
+        name = controller.classify(scope["method"], scope["path"])
+        limiter = controller.limiters.get(name)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        tenant = controller.tenant(scope)
+        try:
+            controller.tenants.acquire(tenant)
+            try:
+                await limiter.acquire()
+            except Rejected:
+                controller.tenants.release(tenant)
+                raise
+        except Rejected as e:
+            if self.registry is not None:
+                self.registry.rejected_requests.inc(name, e.reason)
+            await self._reject(send, e)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
+            controller.tenants.release(tenant)
+            metrics = current_request.get()
+            if metrics is not None:
+                controller.observe_db(metrics.db_time, metrics.queries)
+
+    @staticmethod
+    async def _reject(send, rejected: Rejected) -> None:
+        body = json.dumps({"detail": f"Service overloaded ({rejected.reason}), retry later"}
+                          if rejected.status == 503 else {"detail": "Too many concurrent requests for this company"}
+                          ).encode()
+        await send({
+            "type": "http.response.start",
+            "status": rejected.status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejected.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
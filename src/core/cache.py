@@ -0,0 +1,18 @@
+from functools import lru_cache
+from common.cache import CacheBackend, MemoryCacheBackend, QueryCache, RedisCacheBackend
+from .config import get_settings
+
+
+def _create_backend() -> CacheBackend:
+    settings = get_settings()
+    if settings.CACHE_URL:
+        return RedisCacheBackend(settings.CACHE_URL)
+    return MemoryCacheBackend(maxsize=settings.CACHE_MAX_ENTRIES, ttl=settings.CACHE_TTL)
+
+
+@lru_cache(maxsize=None)
+def get_query_cache() -> QueryCache:
+    """Caché compartida por los servicios (se crea en el primer uso)"""
+    settings = get_settings()
+    # Tras una invalidación, las réplicas pueden ir retrasadas lo mismo que dura el sticky al primario
+    return QueryCache(_create_backend(), ttl=settings.CACHE_TTL, replica_lag=settings.DB_REPLICA_STICKY_SECONDS)
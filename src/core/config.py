@@ -1,22 +1,116 @@
-import os
-from dotenv import load_dotenv
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 
-load_dotenv(override=True)
 
 class Setting(BaseSettings):
-    # Database 
-    DB_HOST: str = os.getenv("DB_HOST")
-    DB_PORT: int = int(os.getenv("DB_PORT"))
-    DB_NAME: str = os.getenv("DB_NAME") 
-    DB_USER: str = os.getenv("DB_USER")
-    DB_PASSWORD: str = os.getenv("DB_PASSWORD")
-    SQL_ALCHEMY_URL: str = os.getenv("SQL_ALCHEMY_URL")
+    # Database
+    DB_HOST: str = "localhost"
+    DB_PORT: int = 5432
+    DB_NAME: str = ""
+    DB_USER: str = ""
+    DB_PASSWORD: str = ""
+    SQL_ALCHEMY_URL: str = ""
+    # Pool de conexiones (por proceso/worker)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Conexiones que se abren al arrancar (lifespan) para no pagarlas en las primeras peticiones
+    DB_POOL_WARMUP: int = 1
+    # Réplicas de lectura (URLs separadas por comas) y segundos que un cliente
+    # sigue leyendo del primario tras escribir (read-your-writes)
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_STICKY_SECONDS: float = 5
+    # Caché de consultas (CACHE_URL vacío = caché en memoria del proceso)
+    CACHE_URL: str = ""
+    CACHE_TTL: float = 60
+    CACHE_MAX_ENTRIES: int = 10000
+    # Caché de permisos efectivos por (usuario, compañía)
+    AUTHZ_CACHE_TTL: float = 30
+    AUTHZ_CACHE_MAX_ENTRIES: int = 50000
+    # Métricas: umbral del log de consultas lentas y cabecera Server-Timing
+    SLOW_QUERY_MS: float = 200
+    SERVER_TIMING: bool = False
+    # Índice de búsqueda del catálogo: cada cuánto se leen los cambios y margen de relectura
+    CATALOG_INDEX_REFRESH_SECONDS: float = 5
+    CATALOG_INDEX_REFRESH_OVERLAP_SECONDS: float = 5
+    # Reservas de inventario: duración por defecto y barrido de las caducadas
+    # (intervalo 0 = sin barrido en segundo plano)
+    INVENTORY_RESERVATION_TTL_SECONDS: float = 900
+    INVENTORY_EXPIRY_INTERVAL_SECONDS: float = 30
+    INVENTORY_EXPIRY_BATCH_SIZE: int = 500
+    # Autenticación: clave de firma de tokens (compartida por todos los workers),
+    # vida del token, caché de verificación y hilos para el hash de contraseñas
+    AUTH_SECRET_KEY: str = ""
+    AUTH_TOKEN_TTL_SECONDS: float = 3600
+    AUTH_VERIFY_CACHE_TTL: float = 60
+    AUTH_VERIFY_CACHE_MAX_ENTRIES: int = 50000
+    AUTH_REVOCATION_SYNC_SECONDS: float = 5
+    AUTH_HASH_WORKERS: int = 2
+    AUTH_SCRYPT_N: int = 16384
+    # Control de admisión: peticiones simultáneas por clase de ruta (máximo; se
+    # reduce si sube la latencia de la base de datos; una clase que no aparece no
+    # se limita), por compañía del cliente autenticado (claim cid del token; 0 = sin
+    # límite) y cola de espera acotada por tamaño y plazo
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LIMITS: str = "read=32,list=8,export=2,auth=8,write=16"
+    ADMISSION_MIN_LIMIT: int = 1
+    ADMISSION_TENANT_LIMIT: int = 16
+    ADMISSION_QUEUE_SIZE: int = 64
+    ADMISSION_QUEUE_TIMEOUT: float = 2
+    ADMISSION_LATENCY_TOLERANCE: float = 2
+    ADMISSION_ADJUST_SECONDS: float = 1
     # Debugging
-    DEBUG: bool = os.getenv("DEBUG", "true").lower() == "true"
-    
+    DEBUG: bool = True
+
+    @property
+    def POOL_OPTIONS(self) -> dict:
+        return {
+            "pool_size": self.DB_POOL_SIZE,
+            "max_overflow": self.DB_MAX_OVERFLOW,
+            "pool_timeout": self.DB_POOL_TIMEOUT,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+            "pool_pre_ping": self.DB_POOL_PRE_PING,
+        }
+
+    @property
+    def ADMISSION_CLASS_LIMITS(self) -> dict[str, int]:
+        limits = {}
+        for item in self.ADMISSION_LIMITS.split(","):
+            if item.strip():
+                name, _, limit = item.partition("=")
+                limits[name.strip()] = int(limit)
+        return limits
+
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql+psycopg2://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
-    
-settings = Setting()
\ No newline at end of file
+
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
+    @property
+    def ASYNC_REPLICA_URLS(self) -> list[str]:
+        from sqlalchemy.engine import make_url
+        urls = [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+        return [
+            make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+            for url in urls
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Setting:
+    """Configuración del proceso, leída en el primer uso (no al importar)"""
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+    return Setting()
+
+
+def __getattr__(name: str):
+    # Compatibilidad con `from core.config import settings` (se resuelve al usarlo, no al importar core.config)
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,19 +1,208 @@
+import asyncio
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from fastapi import Request, Response
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlmodel import create_engine, Session, SQLModel
-from .config import settings
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .config import get_settings
+from .metrics import instrument_engine, metrics_registry
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_snapshot
 
-    
-# Crear el motor de base de datos
-engine = create_engine(settings.DATABASE_URL)
+logger = logging.getLogger(__name__)
+
+# Cookie con el instante (epoch) hasta el que el cliente debe leer del primario
+PRIMARY_STICKY_COOKIE = "allstore_primary_until"
+
+# Claves de session.info: origen de los datos ("primary"/"replica") y si la sesión
+# es de un cliente que acaba de escribir (la caché de consultas las consulta)
+SESSION_SOURCE = "source"
+SESSION_STICKY_PRIMARY = "sticky_primary"
+
+# Motores y sessionmakers del proceso. Se crean en el primer uso, no al importar:
+# importar el módulo no necesita configuración ni drivers de base de datos
+_state: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _instrument(engine: Engine) -> None:
+    # Consultas por petición, tiempo en base de datos y log de consultas lentas
+    instrument_engine(engine, metrics_registry, get_settings().SLOW_QUERY_MS / 1000)
+
+
+def get_engine() -> Engine:
+    """Motor síncrono (psycopg2), usado por init_db y get_session"""
+    if "engine" not in _state:
+        with _lock:
+            if "engine" not in _state:
+                settings = get_settings()
+                engine = create_engine(
+                    settings.DATABASE_URL,
+                    poolclass=InstrumentedQueuePool,
+                    **settings.POOL_OPTIONS
+                )
+                _instrument(engine)
+                _state["engine"] = engine
+    return _state["engine"]
+
+
+def _create_async_state(async_engine: Optional[AsyncEngine] = None,
+                        replica_engines: Optional[Sequence[AsyncEngine]] = None) -> None:
+    settings = get_settings()
+    if async_engine is None:
+        # Motor asíncrono (asyncpg) usado por las rutas para no bloquear el event loop
+        async_engine = create_async_engine(
+            settings.ASYNC_DATABASE_URL,
+            poolclass=InstrumentedAsyncQueuePool,
+            **settings.POOL_OPTIONS
+        )
+        # Réplicas de lectura opcionales, repartidas en round-robin
+        replica_engines = [
+            create_async_engine(url, poolclass=InstrumentedAsyncQueuePool, **settings.POOL_OPTIONS)
+            for url in settings.ASYNC_REPLICA_URLS
+        ]
+    replica_engines = list(replica_engines or [])
+    for engine in (async_engine, *replica_engines):
+        _instrument(engine.sync_engine)
+
+    replica_factories = [
+        async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False,
+                           info={SESSION_SOURCE: "replica"})
+        for replica in replica_engines
+    ]
+    _state.update(
+        async_engine=async_engine,
+        async_session_factory=async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False,
+                                                 info={SESSION_SOURCE: "primary"}),
+        replica_engines=replica_engines,
+        replica_session_factories=replica_factories,
+        replica_cycle=itertools.cycle(replica_factories),
+    )
+
+
+def _async_state(key: str) -> Any:
+    if "async_engine" not in _state:
+        with _lock:
+            if "async_engine" not in _state:
+                _create_async_state()
+    return _state[key]
+
+
+def get_async_engine() -> AsyncEngine:
+    return _async_state("async_engine")
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    return _async_state("async_session_factory")
+
+
+def get_replica_engines() -> List[AsyncEngine]:
+    return _async_state("replica_engines")
+
+
+def use_async_engine(async_engine: AsyncEngine, replica_engines: Sequence[AsyncEngine] = ()) -> None:
+    """Sustituye el primario (y las réplicas) de la configuración, p. ej. por SQLite en benchmarks"""
+    with _lock:
+        _create_async_state(async_engine, replica_engines)
+
+
+async def warm_up(connections: int = 1) -> None:
+    """Abre `connections` conexiones por motor para que las primeras peticiones no paguen el connect"""
+    engines = [get_async_engine(), *get_replica_engines()]
+
+    async def connect(engine: AsyncEngine) -> None:
+        async with engine.connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+
+    for engine in engines:
+        count = max(0, min(connections, getattr(engine.pool, "size", lambda: connections)()))
+        results = await asyncio.gather(*(connect(engine) for _ in range(count)), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            # Sin base de datos el proceso arranca igual; las peticiones fallarán al conectar
+            logger.warning("pool warm-up failed for %s: %s", engine.url.render_as_string(), errors[0])
+
+
+async def dispose_engines() -> None:
+    """Cierra las conexiones de todos los motores creados (apagado del proceso)"""
+    if "async_engine" in _state:
+        for engine in (_state["async_engine"], *_state["replica_engines"]):
+            await engine.dispose()
+    if "engine" in _state:
+        _state["engine"].dispose()
 
 
 def init_db():
     # ⚠️ ELIMINA TODOS LOS DATOS EXISTENTES
-    # SQLModel.metadata.drop_all(engine)  
-    SQLModel.metadata.create_all(engine)
+    # SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(get_engine())
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         try:
             yield session
         finally:
-            session.close()
\ No newline at end of file
+            session.close()
+
+async def get_async_session():
+    async with get_async_session_factory()() as session:
+        yield session
+
+def _is_sticky_to_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_session_factory(request: Request | None = None) -> async_sessionmaker:
+    """Elige réplica (o el primario si no hay réplicas o el cliente acaba de escribir)"""
+    if not _async_state("replica_session_factories"):
+        return get_async_session_factory()
+    if request is not None and _is_sticky_to_primary(request):
+        return get_async_session_factory()
+    return next(_async_state("replica_cycle"))
+
+def session_factory_of(session: AsyncSession) -> async_sessionmaker:
+    """Sessionmaker (primario o réplica) del que sale `session`: más sesiones contra la misma base"""
+    for factory in (get_async_session_factory(), *_async_state("replica_session_factories")):
+        if factory.kw.get("bind") is session.bind:
+            return factory
+    raise ValueError('Session is not bound to a configured engine')
+
+async def get_read_session(request: Request):
+    """Sesión de sólo lectura: va a una réplica salvo justo después de una escritura"""
+    async with read_session_factory(request)() as session:
+        if _async_state("replica_session_factories") and _is_sticky_to_primary(request):
+            # Lee sus propias escrituras: no debe servirse de la caché (puede venir de una réplica)
+            session.info[SESSION_STICKY_PRIMARY] = True
+        yield session
+
+async def get_write_session(response: Response):
+    """Sesión en el primario; el cliente leerá del primario durante DB_REPLICA_STICKY_SECONDS"""
+    if _async_state("replica_session_factories"):
+        sticky_seconds = get_settings().DB_REPLICA_STICKY_SECONDS
+        response.set_cookie(
+            PRIMARY_STICKY_COOKIE,
+            str(time.time() + sticky_seconds),
+            max_age=math.ceil(sticky_seconds),
+            httponly=True,
+            samesite="lax",
+        )
+    async with get_async_session_factory()() as session:
+        yield session
+
+def pool_status() -> dict:
+    """Estado de los pools de conexiones de cada motor (sólo de los ya creados)"""
+    status = {}
+    if "engine" in _state:
+        status["primary"] = pool_snapshot(_state["engine"].pool)
+    if "async_engine" in _state:
+        status["primary_async"] = pool_snapshot(_state["async_engine"].pool)
+        for index, replica in enumerate(_state["replica_engines"]):
+            status[f"replica_{index}"] = pool_snapshot(replica.pool)
+    return status
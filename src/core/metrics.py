@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger("allstore.slow_query")
+
+# Segundos (latencias) y número de consultas por petición
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+class RequestMetrics:
+    """Acumulado de SQL de la petición en curso"""
+
+    __slots__ = ("scope", "queries", "db_time")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+
+    @property
+    def route(self) -> str:
+        # Plantilla de la ruta (/users/companies/{id}), no la URL: acota la cardinalidad.
+        # El router la deja en el scope al resolver la petición.
+        route = (self.scope or {}).get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+
+# Petición actual; las consultas fuera de una petición no se atribuyen a ninguna ruta
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas, en formato de exposición de Prometheus"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [conteos por bucket (+Inf al final), suma]
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+
+        for label_values, (counts, total) in sorted(series.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total!r}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Contador con etiquetas"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value!r}")
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Métricas por ruta: latencia total, tiempo en base de datos y número de consultas"""
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Request handling time.",
+            ("method", "route", "status"), DURATION_BUCKETS)
+        self.request_db_duration = Histogram(
+            "http_request_db_seconds", "Time spent in SQL statements per request.",
+            ("method", "route"), DURATION_BUCKETS)
+        self.request_queries = Histogram(
+            "http_request_db_queries", "SQL statements executed per request.",
+            ("method", "route"), QUERY_COUNT_BUCKETS)
+        self.slow_queries = Counter(
+            "db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.", ("route",))
+        self.rejected_requests = Counter(
+            "http_requests_rejected_total", "Requests shed by admission control.", ("route_class", "reason"))
+
+    def observe_request(self, method: str, route: str, status: int, duration: float,
+                        metrics: RequestMetrics) -> None:
+        self.request_duration.observe(duration, method, route, str(status))
+        self.request_db_duration.observe(metrics.db_time, method, route)
+        self.request_queries.observe(metrics.queries, method, route)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in (
+            self.request_duration, self.request_db_duration, self.request_queries, self.slow_queries,
+            self.rejected_requests,
+        )) + "\n"
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Sustituye los valores por su tipo (los parámetros pueden contener datos personales)"""
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: sólo la forma de la primera fila
+            return {"rows": len(parameters), "first": redact_parameters(parameters[0])}
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return None if parameters is None else f"<{type(parameters).__name__}>"
+
+
+def instrument_engine(engine: Engine, registry: MetricsRegistry, slow_query_seconds: float) -> None:
+    """Mide cada sentencia del motor (para motores asíncronos, pasar `engine.sync_engine`)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        metrics = current_request.get()
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.db_time += elapsed
+
+        if elapsed >= slow_query_seconds:
+            route = metrics.route if metrics is not None else None
+            registry.slow_queries.inc(route or "none")
+            slow_query_logger.warning(
+                "slow query (%.1f ms) route=%s statement=%s parameters=%s",
+                elapsed * 1000, route, " ".join(statement.split()), redact_parameters(parameters),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        # La sentencia falló: no habrá after_cursor_execute que consuma su marca
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: registra cada petición en `registry` y, opcionalmente, añade Server-Timing"""
+
+    def __init__(self, app, registry: MetricsRegistry, server_timing: bool = False):
+        self.app = app
+        self.registry = registry
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(scope)
+        token = current_request.set(metrics)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", self._timing(metrics, start))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            self.registry.observe_request(scope["method"], metrics.route, status, time.perf_counter() - start, metrics)
+
+    @staticmethod
+    def _timing(metrics: RequestMetrics, start: float) -> bytes:
+        total = (time.perf_counter() - start) * 1000
+        db = metrics.db_time * 1000
+        return (
+            f'db;dur={db:.1f};desc="{metrics.queries} queries", app;dur={total - db:.1f}, total;dur={total:.1f}'
+        ).encode()
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+def _percentile(samples, pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class PoolStats:
+    """Contadores de checkouts del pool (latencia de espera, timeouts)"""
+
+    def __init__(self, samples: int = 1024):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=samples)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_checkout(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self._waits.append(wait)
+
+    def record_timeout(self, wait: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = list(self._waits)
+            checkouts, timeouts = self.checkouts, self.timeouts
+            wait_total, wait_max = self.wait_total, self.wait_max
+
+        def ms(value):
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_avg_ms": ms(wait_total / checkouts) if checkouts else None,
+            "wait_max_ms": ms(wait_max),
+            "wait_p50_ms": ms(_percentile(waits, 50)),
+            "wait_p95_ms": ms(_percentile(waits, 95)),
+            "wait_p99_ms": ms(_percentile(waits, 99)),
+        }
+
+
+class _InstrumentedPoolMixin:
+    """Mide cuánto espera cada checkout y cuenta los timeouts del pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout(time.perf_counter() - start)
+            raise
+        self.stats.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() recrea el pool; conservamos los contadores
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_snapshot(pool: Pool) -> Dict[str, Any]:
+    """Estado actual del pool (conexiones en uso/ociosas) más sus contadores"""
+    snapshot: Dict[str, Any] = {"pool": pool.__class__.__name__}
+
+    if isinstance(pool, QueuePool):
+        snapshot.update({
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout_s": pool.timeout(),
+        })
+
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        snapshot.update(stats.snapshot())
+
+    return snapshot
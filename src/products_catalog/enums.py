@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class ReservationStatus(str, Enum):
+    HELD = "held"            # Stock descontado, pendiente de confirmar
+    CONFIRMED = "confirmed"  # Compra completada: el stock no vuelve
+    RELEASED = "released"    # Cancelada por el cliente: el stock vuelve
+    EXPIRED = "expired"      # Caducada (TTL): el stock vuelve
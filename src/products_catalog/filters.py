@@ -0,0 +1,30 @@
+from fastapi import HTTPException, Query
+from typing import Literal, Optional
+from uuid import UUID
+from .schemas import ProductSearchSchema
+from .search import PRICE_BUCKET_LABELS
+
+def get_product_search(
+    q: str | None = Query(None, description="Words in name or sku; the last one matches as a prefix"),
+    category: list[UUID] = Query([], description="Category ids (repeatable, OR)"),
+    price: list[str] = Query([], description=f"Price buckets (repeatable, OR): {', '.join(PRICE_BUCKET_LABELS)}"),
+    attr: list[str] = Query([], description="Attribute filters as name:value (repeatable; OR per name, AND across names)"),
+    in_stock: Optional[bool] = Query(None, description="Only products with (or without) stock"),
+    min_price: float | None = Query(None, ge=0, description="Minimum price"),
+    max_price: float | None = Query(None, ge=0, description="Maximum price"),
+    sort: Literal["newest", "price_asc", "price_desc", "name"] = Query("newest", description="Result order"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(20, ge=1, le=100, description="Page size"),
+    facet_limit: int = Query(20, ge=1, le=100, description="Maximum values per facet"),
+):
+    attributes: dict[str, list[str]] = {}
+    for item in attr:
+        name, separator, value = item.partition(":")
+        if not separator or not name:
+            raise HTTPException(status_code=400, detail=f'Invalid attribute filter: {item}')
+        attributes.setdefault(name, []).append(value)
+    return ProductSearchSchema(
+        q=q, category=category, price=price, attributes=attributes, in_stock=in_stock,
+        min_price=min_price, max_price=max_price, sort=sort, page=page, page_size=page_size,
+        facet_limit=facet_limit
+    )
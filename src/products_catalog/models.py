@@ -0,0 +1,70 @@
+import sqlmodel as sm
+import sqlalchemy as sa
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+from typing import Dict, Optional
+from common.models.api_base_model import ApiBaseModel
+from common.models.ids import uuid7
+from .enums import ReservationStatus
+
+
+class Category(ApiBaseModel, table=True):
+    __tablename__ = "categories"
+    __table_args__ = (
+        sa.UniqueConstraint("company_id", "name", name="uq_categories_company_name"),
+    )
+
+    id: UUID = sm.Field(default_factory=uuid7, primary_key=True)
+    company_id: UUID = sm.Field(foreign_key="companies.id", index=True)
+    name: str = sm.Field()
+    description: str = sm.Field(nullable=True, max_length=255)
+    parent_id: Optional[UUID] = sm.Field(default=None, foreign_key="categories.id")
+
+
+class Product(ApiBaseModel, table=True):
+    __tablename__ = "products"
+    __table_args__ = (
+        sa.UniqueConstraint("company_id", "sku", name="uq_products_company_sku"),
+        # Refresco incremental del índice de búsqueda (filas cambiadas desde la última pasada)
+        sa.Index("ix_products_updated_at_id", "updated_at", "id"),
+    )
+
+    id: UUID = sm.Field(default_factory=uuid7, primary_key=True)
+    company_id: UUID = sm.Field(foreign_key="companies.id", index=True)
+    category_id: Optional[UUID] = sm.Field(default=None, foreign_key="categories.id", index=True)
+    sku: str = sm.Field()
+    name: str = sm.Field()
+    description: str = sm.Field(nullable=True)
+    price: Decimal = sm.Field(default=0, max_digits=12, decimal_places=2)
+    stock: int = sm.Field(default=0)
+    # Atributos libres (color, talla...) usados como facetas
+    attributes: Dict[str, str] = sm.Field(default={}, sa_column=sa.Column(sa.JSON))
+    is_active: bool = sm.Field(default=True)
+    # Borrado lógico: el índice de búsqueda ve el borrado como un cambio más (updated_at)
+    deleted_at: Optional[datetime] = sm.Field(default=None)
+
+
+class Reservation(ApiBaseModel, table=True):
+    __tablename__ = "reservations"
+    __table_args__ = (
+        # Cola de caducidad: reservas retenidas por orden de expiración
+        sa.Index("ix_reservations_status_expires_at", "status", "expires_at"),
+    )
+
+    id: UUID = sm.Field(default_factory=uuid7, primary_key=True)
+    company_id: UUID = sm.Field(foreign_key="companies.id", index=True)
+    status: ReservationStatus = sm.Field(default=ReservationStatus.HELD)
+    expires_at: datetime = sm.Field()
+
+
+class ReservationItem(ApiBaseModel, table=True):
+    __tablename__ = "reservation_items"
+    __table_args__ = (
+        sa.UniqueConstraint("reservation_id", "product_id", name="uq_reservation_items_reservation_product"),
+    )
+
+    id: UUID = sm.Field(default_factory=uuid7, primary_key=True)
+    reservation_id: UUID = sm.Field(foreign_key="reservations.id")
+    product_id: UUID = sm.Field(foreign_key="products.id", index=True)
+    quantity: int = sm.Field()
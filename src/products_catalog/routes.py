@@ -0,0 +1,244 @@
+import fastapi as fa
+from uuid import UUID
+from common.exceptions import ConflictError, NotFoundError
+from common.serialization import json_response
+from core.database import get_read_session, get_write_session, read_session_factory
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .schemas import (CategoryResponse, CreateCategorySchema, CreateProductSchema, CreateReservationSchema,
+                      ProductResponse, ProductSearchResponse, ProductSearchSchema, ReservationResponse,
+                      StockAdjustmentSchema, StockResponse, UpdateProductSchema)
+from .filters import get_product_search
+from .services import CategoryService, InventoryService, ProductService
+
+router = fa.APIRouter(prefix='/catalog', tags=['Catalog'])
+
+@router.get(
+    '/companies/{company_id}/categories',
+    response_model=list[CategoryResponse],
+    status_code=fa.status.HTTP_200_OK)
+async def read_categories(
+    company_id: UUID,
+    db: AsyncSession = fa.Depends(get_read_session)
+):
+    try:
+        service = CategoryService(db)
+        return json_response(list[CategoryResponse], await service.get_categories(company_id))
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.post(
+    '/companies/{company_id}/categories',
+    response_model=CategoryResponse,
+    status_code=fa.status.HTTP_201_CREATED)
+async def add_category(
+    company_id: UUID,
+    data: CreateCategorySchema,
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = CategoryService(db)
+        category = await service.add_category(company_id, data)
+        return json_response(CategoryResponse, category, status_code=fa.status.HTTP_201_CREATED, response=response)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except ConflictError as e:
+        raise fa.HTTPException(status_code=409, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.get(
+    '/companies/{company_id}/products/search',
+    response_model=ProductSearchResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def search_products(
+    company_id: UUID,
+    request: fa.Request,
+    params: ProductSearchSchema = fa.Depends(get_product_search),
+    db: AsyncSession = fa.Depends(get_read_session)
+):
+    try:
+        # Se responde desde el índice en memoria; la sesión sólo se usa si toca refrescarlo
+        service = ProductService(db)
+        result = await service.search_products(company_id, params, read_session_factory(request))
+        return json_response(ProductSearchResponse, result)
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.get(
+    '/companies/{company_id}/products/{id}',
+    response_model=ProductResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def read_product(
+    company_id: UUID,
+    id: UUID,
+    db: AsyncSession = fa.Depends(get_read_session)
+):
+    try:
+        service = ProductService(db)
+        return json_response(ProductResponse, await service.get_product(company_id, id))
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.post(
+    '/companies/{company_id}/products',
+    response_model=ProductResponse,
+    status_code=fa.status.HTTP_201_CREATED)
+async def add_product(
+    company_id: UUID,
+    data: CreateProductSchema,
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = ProductService(db)
+        product = await service.add_product(company_id, data)
+        return json_response(ProductResponse, product, status_code=fa.status.HTTP_201_CREATED, response=response)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except ConflictError as e:
+        raise fa.HTTPException(status_code=409, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.patch(
+    '/companies/{company_id}/products/{id}',
+    response_model=ProductResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def edit_product(
+    company_id: UUID,
+    id: UUID,
+    data: UpdateProductSchema,
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = ProductService(db)
+        product = await service.edit_product(company_id, id, data)
+        return json_response(ProductResponse, product, response=response)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except ConflictError as e:
+        raise fa.HTTPException(status_code=409, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.delete(
+    '/companies/{company_id}/products/{id}',
+    response_model=None,
+    status_code=fa.status.HTTP_204_NO_CONTENT)
+async def delete_product(
+    company_id: UUID,
+    id: UUID,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = ProductService(db)
+        return await service.delete_product(company_id, id)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.post(
+    '/companies/{company_id}/products/{id}/stock',
+    response_model=StockResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def adjust_stock(
+    company_id: UUID,
+    id: UUID,
+    data: StockAdjustmentSchema,
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = InventoryService(db)
+        return json_response(StockResponse, await service.adjust_stock(company_id, id, data.delta),
+                             response=response)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except ConflictError as e:
+        raise fa.HTTPException(status_code=409, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.post(
+    '/companies/{company_id}/reservations',
+    response_model=ReservationResponse,
+    status_code=fa.status.HTTP_201_CREATED)
+async def add_reservation(
+    company_id: UUID,
+    data: CreateReservationSchema,
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = InventoryService(db)
+        reservation = await service.reserve(company_id, data)
+        return json_response(ReservationResponse, reservation, status_code=fa.status.HTTP_201_CREATED,
+                             response=response)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except ConflictError as e:
+        raise fa.HTTPException(status_code=409, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.get(
+    '/companies/{company_id}/reservations/{id}',
+    response_model=ReservationResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def read_reservation(
+    company_id: UUID,
+    id: UUID,
+    db: AsyncSession = fa.Depends(get_read_session)
+):
+    try:
+        service = InventoryService(db)
+        return json_response(ReservationResponse, await service.get_reservation(company_id, id))
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.post(
+    '/companies/{company_id}/reservations/{id}/confirm',
+    response_model=ReservationResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def confirm_reservation(
+    company_id: UUID,
+    id: UUID,
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = InventoryService(db)
+        return json_response(ReservationResponse, await service.confirm(company_id, id), response=response)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except ConflictError as e:
+        raise fa.HTTPException(status_code=409, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.post(
+    '/companies/{company_id}/reservations/{id}/release',
+    response_model=ReservationResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def release_reservation(
+    company_id: UUID,
+    id: UUID,
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = InventoryService(db)
+        return json_response(ReservationResponse, await service.release(company_id, id), response=response)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except ConflictError as e:
+        raise fa.HTTPException(status_code=409, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
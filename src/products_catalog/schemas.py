@@ -0,0 +1,139 @@
+from pydantic import BaseModel, Field
+from uuid import UUID
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Union
+from .enums import ReservationStatus
+
+# Category Schemas
+class CategoryResponse(BaseModel):
+    id: UUID
+    company_id: UUID
+    name: str
+    description: str | None
+    parent_id: UUID | None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CreateCategorySchema(BaseModel):
+    name: str = Field(min_length=1)
+    description: str | None = None
+    parent_id: UUID | None = None
+
+# Product Schemas
+class ProductResponse(BaseModel):
+    id: UUID
+    company_id: UUID
+    category_id: UUID | None
+    sku: str
+    name: str
+    description: str | None
+    price: Decimal
+    stock: int
+    attributes: Dict[str, str]
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CreateProductSchema(BaseModel):
+    sku: str = Field(min_length=1)
+    name: str = Field(min_length=1)
+    description: str | None = None
+    category_id: UUID | None = None
+    price: Decimal = Field(ge=0, max_digits=12, decimal_places=2)
+    stock: int = Field(default=0, ge=0)
+    attributes: Dict[str, str] = {}
+
+class UpdateProductSchema(BaseModel):
+    sku: str | None = Field(default=None, min_length=1)
+    name: str | None = Field(default=None, min_length=1)
+    description: str | None = None
+    category_id: UUID | None = None
+    price: Decimal | None = Field(default=None, ge=0, max_digits=12, decimal_places=2)
+    attributes: Dict[str, str] | None = None
+    is_active: bool | None = None
+
+    class Config:
+        # Sin stock: sólo cambia con deltas (POST .../stock) y reservas; un valor
+        # absoluto ignoraría lo retenido por reservas abiertas. Se rechaza, no se ignora
+        extra = "forbid"
+
+# Search Schemas
+class ProductSearchItem(BaseModel):
+    id: UUID
+    category_id: UUID | None
+    sku: str
+    name: str
+    price: Decimal
+    stock: int
+    attributes: Dict[str, str]
+    created_at: datetime | None
+    updated_at: datetime | None
+
+class FacetValue(BaseModel):
+    value: Union[UUID, bool, str, None]
+    count: int
+
+class ProductFacets(BaseModel):
+    category: List[FacetValue]
+    price: List[FacetValue]
+    in_stock: List[FacetValue]
+    attributes: Dict[str, List[FacetValue]]
+
+class ProductSearchResponse(BaseModel):
+    data: List[ProductSearchItem]
+    total: int
+    page: int
+    page_size: int
+    total_pages: int
+    has_next: bool
+    has_prev: bool
+    facets: ProductFacets
+
+class ProductSearchSchema(BaseModel):
+    q: Optional[str] = None
+    category: List[UUID] = []
+    price: List[str] = []
+    attributes: Dict[str, List[str]] = {}
+    in_stock: Optional[bool] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    sort: str = "newest"
+    page: int = 1
+    page_size: int = 20
+    facet_limit: int = 20
+
+# Inventory Schemas
+class StockAdjustmentSchema(BaseModel):
+    delta: int
+
+class StockResponse(BaseModel):
+    id: UUID
+    stock: int
+
+class ReservationItemSchema(BaseModel):
+    product_id: UUID
+    quantity: int = Field(ge=1)
+
+class CreateReservationSchema(BaseModel):
+    items: List[ReservationItemSchema] = Field(min_length=1, max_length=100)
+    ttl_seconds: float | None = Field(default=None, gt=0, le=86400)
+
+class ReservationItemResponse(BaseModel):
+    product_id: UUID
+    quantity: int
+
+class ReservationResponse(BaseModel):
+    id: UUID
+    company_id: UUID
+    status: ReservationStatus
+    expires_at: datetime
+    created_at: datetime
+    updated_at: datetime
+    items: List[ReservationItemResponse]
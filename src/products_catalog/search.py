@@ -0,0 +1,644 @@
+import array
+import asyncio
+import bisect
+import heapq
+import logging
+import re
+import time
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from itertools import repeat
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from core.config import get_settings
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de los tramos de precio; el último tramo queda abierto
+PRICE_BUCKETS = (10, 25, 50, 100, 250, 500, 1000)
+PRICE_BUCKET_LABELS = tuple(
+    f"{lower}-{upper}" for lower, upper in zip((0,) + PRICE_BUCKETS, PRICE_BUCKETS)
+) + (f"{PRICE_BUCKETS[-1]}+",)
+
+# Orden de resultados -> (orden precalculado, descendente)
+SORTS = {
+    "newest": ("created", True),
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+    "name": ("name", False),
+}
+
+# Bitmap con todos los productos indexados de la compañía
+ALL = ("all",)
+# Producto sin valor para un atributo (None es un valor válido: sin categoría)
+_MISSING = object()
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def price_bucket(price: float) -> str:
+    return PRICE_BUCKET_LABELS[bisect.bisect_right(PRICE_BUCKETS, price)]
+
+
+def bitmap_of(slots: Iterable[int]) -> int:
+    """Bitmap (int de Python) con esos bits a 1, en O(n + max/8).
+
+    Con muchos slots se escribe una cadena de '0'/'1' con map (el bucle corre en
+    C) y se convierte con int(..., 2), lineal en bases potencia de dos; con pocos
+    sale más barato marcar los bytes uno a uno.
+    """
+    slots = slots if isinstance(slots, (list, set, array.array)) else list(slots)
+    if not slots:
+        return 0
+    size = max(slots) + 1
+    if len(slots) * 64 < size:
+        buffer = bytearray((size >> 3) + 1)
+        for slot in slots:
+            buffer[slot >> 3] |= 1 << (slot & 7)
+        return int.from_bytes(buffer, "little")
+    digits = bytearray(b"0") * size
+    deque(map(digits.__setitem__, slots, repeat(49)), maxlen=0)
+    digits.reverse()
+    return int(digits, 2)
+
+
+def _bit_string(bitmap: int) -> str:
+    # bits[slot] == "1" si el slot está en el bitmap (comprobar un bit de un int grande es O(n))
+    return format(bitmap, "b")[::-1]
+
+
+def iter_slots(bitmap: int) -> Iterator[int]:
+    """Slots a 1 del bitmap, en orden; str.find salta los ceros en C"""
+    bits = _bit_string(bitmap)
+    find = bits.find
+    slot = find("1")
+    while slot != -1:
+        yield slot
+        slot = find("1", slot + 1)
+
+
+class IndexedProduct(NamedTuple):
+    """Lo que el índice guarda de cada producto (y devuelve en los resultados)"""
+    id: UUID
+    company_id: UUID
+    category_id: Optional[UUID]
+    sku: str
+    name: str
+    price: Decimal
+    stock: int
+    attributes: Dict[str, str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+class FacetedIndex:
+    """Índice en memoria de los productos de una compañía.
+
+    Cada producto ocupa un slot. Cada valor de faceta (categoría, tramo de precio,
+    atributo, en stock) es un bitmap con los slots que lo tienen y las palabras del
+    nombre tienen listas invertidas (sets de slots): filtrar es hacer AND/OR de ints
+    y contar una faceta es un bit_count(), sin consultar la base de datos. Los
+    órdenes (precio, nombre, novedad) se calculan al primer uso y se mantienen al
+    aplicar cambios sueltos.
+    """
+
+    # Con más cambios en un lote se descartan los órdenes (se recalculan al usarlos):
+    # insertar en un array de un millón de slots cuesta un memmove por cambio
+    max_incremental_changes = 256
+    # Palabras con al menos tantos productos guardan también su bitmap (AND en C
+    # en vez de intersecar sets de cientos de miles de slots)
+    dense_posting_size = 8192
+    # Tramos del orden por precio con bitmap acumulado (filtros min_price/max_price)
+    price_checkpoints = 64
+    # Consultas (filtros, sin orden ni página) cuyo resultado se guarda hasta el próximo cambio
+    result_cache_size = 128
+
+    def __init__(self):
+        self.docs: List[Optional[IndexedProduct]] = []
+        self.slots: Dict[UUID, int] = {}
+        self.skus: Dict[str, int] = {}
+        self.bitmaps: Dict[tuple, int] = {}
+        self.postings: Dict[str, set] = {}
+        self._fields: Dict[str, set] = defaultdict(set)
+        self._dense: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._vocabulary: Optional[List[str]] = None
+        self._sort_values = {"price": array.array("d"), "created": array.array("d"), "name": []}
+        self._orders: Dict[str, array.array] = {}
+        self._price_prefixes: Optional[List[int]] = None
+        self._key_counts: Dict[tuple, int] = {}
+        # Coincidencias y facetas de las últimas consultas (la paginación repite filtros)
+        self._results: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    @staticmethod
+    def _facet_keys(doc: IndexedProduct) -> List[tuple]:
+        keys = [ALL, ("category", doc.category_id), ("price", price_bucket(float(doc.price))),
+                ("in_stock", doc.stock > 0)]
+        keys.extend(("attr", name, str(value)) for name, value in doc.attributes.items())
+        return keys
+
+    @staticmethod
+    def _field(key: tuple) -> str:
+        return f"attr:{key[1]}" if key[0] == "attr" else key[0]
+
+    @staticmethod
+    def _facet_value(field: str, doc: IndexedProduct) -> Any:
+        if field == "category":
+            return doc.category_id
+        if field == "price":
+            return price_bucket(float(doc.price))
+        if field == "in_stock":
+            return doc.stock > 0
+        value = doc.attributes.get(field[5:], _MISSING)
+        return value if value is _MISSING else str(value)
+
+    def _sort_key(self, order: str):
+        values = self._sort_values[order]
+        # El slot desempata: las claves son únicas y bisect encuentra cada slot
+        return lambda slot: (values[slot], slot)
+
+    def _order(self, order: str) -> array.array:
+        if order not in self._orders:
+            # sorted es estable y los slots llegan en orden: mismo resultado que _sort_key
+            slots = sorted(iter_slots(self.bitmaps.get(ALL, 0)), key=self._sort_values[order].__getitem__)
+            self._orders[order] = array.array("I", slots)
+        return self._orders[order]
+
+    # Cambios
+    def apply(self, changes: Sequence[Tuple[UUID, Optional[IndexedProduct]]]) -> int:
+        """Aplica altas, cambios y bajas (doc None); devuelve cuántos cambiaron algo"""
+        if len(changes) > self.max_incremental_changes:
+            self._orders.clear()
+        adds: Dict[tuple, List[int]] = defaultdict(list)
+        removes: Dict[tuple, List[int]] = defaultdict(list)
+        applied = 0
+        for id, doc in changes:
+            slot = self.slots.get(id)
+            old = self.docs[slot] if slot is not None else None
+            if old is None and doc is None:
+                continue
+            if old is not None and doc is not None and old.updated_at == doc.updated_at:
+                # Ya indexado con esta versión (relectura por el solape del refresco)
+                continue
+            applied += 1
+            if old is not None:
+                self._unindex(slot, old, removes)
+            if doc is None:
+                del self.slots[id]
+                self.docs[slot] = None
+                self._free.append(slot)
+                continue
+            if slot is None:
+                slot = self._allocate(id)
+            self._index(slot, doc, adds)
+
+        if applied:
+            self._price_prefixes = None
+            self._results.clear()
+        # Un AND/OR por bitmap y lote, no uno por producto (cada operación copia el int)
+        for key in adds.keys() | removes.keys():
+            if key[0] == "token":
+                target, name = self._dense, key[1]
+            else:
+                target, name = self.bitmaps, key
+            bitmap = target.get(name, 0)
+            if key in removes:
+                bitmap &= ~bitmap_of(removes[key])
+            if key in adds:
+                bitmap |= bitmap_of(adds[key])
+            if bitmap:
+                target[name] = bitmap
+            else:
+                target.pop(name, None)
+            self._key_counts.pop(name, None)
+            if target is self.bitmaps and key != ALL:
+                if bitmap:
+                    self._fields[self._field(key)].add(key)
+                else:
+                    self._fields[self._field(key)].discard(key)
+        return applied
+
+    def _allocate(self, id: UUID) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self.docs)
+            self.docs.append(None)
+            self._sort_values["price"].append(0.0)
+            self._sort_values["created"].append(0.0)
+            self._sort_values["name"].append("")
+        self.slots[id] = slot
+        return slot
+
+    def _index(self, slot: int, doc: IndexedProduct, adds: Dict[tuple, List[int]]) -> None:
+        self.docs[slot] = doc
+        self.skus[doc.sku.lower()] = slot
+        self._sort_values["price"][slot] = float(doc.price)
+        self._sort_values["created"][slot] = doc.created_at.timestamp() if doc.created_at else 0.0
+        self._sort_values["name"][slot] = doc.name.lower()
+        for key in self._facet_keys(doc):
+            adds[key].append(slot)
+        for token in set(tokenize(doc.name)):
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = set()
+                self._vocabulary = None
+            posting.add(slot)
+            if token in self._dense:
+                adds[("token", token)].append(slot)
+        for name, order in self._orders.items():
+            bisect.insort(order, slot, key=self._sort_key(name))
+
+    def _unindex(self, slot: int, doc: IndexedProduct, removes: Dict[tuple, List[int]]) -> None:
+        # Antes de _index: los órdenes se recorren con los valores antiguos
+        for name, order in self._orders.items():
+            key = self._sort_key(name)
+            del order[bisect.bisect_left(order, key(slot), key=key)]
+        if self.skus.get(doc.sku.lower()) == slot:
+            del self.skus[doc.sku.lower()]
+        for key in self._facet_keys(doc):
+            removes[key].append(slot)
+        for token in set(tokenize(doc.name)):
+            posting = self.postings[token]
+            posting.discard(slot)
+            if token in self._dense:
+                removes[("token", token)].append(slot)
+            if not posting:
+                del self.postings[token]
+                self._vocabulary = None
+
+    # Consultas
+    def _token_bitmap(self, token: str) -> int:
+        bitmap = self._dense.get(token)
+        if bitmap is None:
+            posting = self.postings.get(token, ())
+            bitmap = bitmap_of(posting)
+            if len(posting) >= self.dense_posting_size:
+                self._dense[token] = bitmap
+        return bitmap
+
+    def _text_bitmap(self, text: str) -> int:
+        """Productos con todas las palabras del nombre (la última vale como prefijo) o con ese sku"""
+        slot = self.skus.get(text.strip().lower())
+        if slot is not None:
+            return 1 << slot
+        tokens = tokenize(text)
+        if not tokens:
+            return self.bitmaps.get(ALL, 0)
+
+        # Cada término: (productos, set de slots o None, palabras cuyo bitmap lo forma)
+        terms = []
+        for token in tokens[:-1]:
+            posting = self.postings.get(token)
+            if not posting:
+                return 0
+            terms.append((len(posting), posting, [token]))
+        last = tokens[-1]
+        if len(last) < 2:
+            expansion = [last] if last in self.postings else []
+        else:
+            if self._vocabulary is None:
+                self._vocabulary = sorted(self.postings)
+            start = bisect.bisect_left(self._vocabulary, last)
+            end = bisect.bisect_left(self._vocabulary, last + "\U0010ffff", start)
+            expansion = self._vocabulary[start:end]
+        if not expansion:
+            return 0
+        size = sum(len(self.postings[token]) for token in expansion)
+        terms.append((size, self.postings[last] if expansion == [last] else None, expansion))
+
+        terms.sort(key=lambda term: term[0])
+        if terms[0][0] < self.dense_posting_size:
+            # Término poco frecuente: se intersecan sets y sólo el resultado pasa a bitmap
+            _, posting, words = terms[0]
+            slots = posting if posting is not None else set().union(*(self.postings[word] for word in words))
+            for _, posting, words in terms[1:]:
+                if posting is None:
+                    slots = {slot for slot in slots if any(slot in self.postings[word] for word in words)}
+                else:
+                    slots = slots.intersection(posting)
+            return bitmap_of(slots)
+
+        bitmap = -1
+        for _, _, words in terms:
+            union = 0
+            for word in words:
+                union |= self._token_bitmap(word)
+            bitmap &= union
+        return bitmap
+
+    def _price_bitmap(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        """Slots con precio en [min_price, max_price]: bitmaps acumulados del orden por precio
+        más los bordes, así sólo los bordes se convierten slot a slot"""
+        order = self._order("price")
+        values = self._sort_values["price"]
+        start = 0 if min_price is None else bisect.bisect_left(order, min_price, key=values.__getitem__)
+        end = len(order) if max_price is None else bisect.bisect_right(order, max_price, key=values.__getitem__)
+        step = max(1, -(-len(order) // self.price_checkpoints))
+        first, last = -(-start // step), end // step
+        if first >= last:
+            return bitmap_of(order[start:end])
+
+        if self._price_prefixes is None:
+            prefixes, bitmap = [0], 0
+            for offset in range(0, len(order), step):
+                bitmap |= bitmap_of(order[offset:offset + step])
+                prefixes.append(bitmap)
+            self._price_prefixes = prefixes
+        prefixes = self._price_prefixes
+        return ((prefixes[last] & ~prefixes[first])
+                | bitmap_of(order[start:first * step]) | bitmap_of(order[last * step:end]))
+
+    def _union(self, keys: Iterable[tuple]) -> int:
+        bitmap = 0
+        for key in keys:
+            bitmap |= self.bitmaps.get(key, 0)
+        return bitmap
+
+    def search(self,
+               text: Optional[str] = None,
+               categories: Sequence[Optional[UUID]] = (),
+               price_buckets: Sequence[str] = (),
+               attributes: Optional[Mapping[str, Sequence[str]]] = None,
+               in_stock: Optional[bool] = None,
+               min_price: Optional[float] = None,
+               max_price: Optional[float] = None,
+               sort: str = "newest",
+               offset: int = 0,
+               limit: int = 20,
+               facet_limit: int = 20) -> Dict[str, Any]:
+        """Página de productos y recuento de facetas.
+
+        Dentro de una faceta los valores se combinan con OR y entre facetas con
+        AND. El recuento de cada faceta ignora su propio filtro (facetas
+        disyuntivas): al elegir una categoría se siguen viendo las demás.
+        """
+        if sort not in SORTS:
+            raise ValueError(f'Invalid sort: {sort}')
+        attributes = {name: tuple(values) for name, values in (attributes or {}).items() if values}
+        signature = (text, tuple(categories), tuple(price_buckets), tuple(sorted(attributes.items())),
+                     in_stock, min_price, max_price, facet_limit)
+        cached = self._results.get(signature) if self.result_cache_size else None
+        if cached is None:
+            cached = self._match(text, categories, price_buckets, attributes, in_stock, min_price, max_price,
+                                 facet_limit)
+            self._results[signature] = cached
+            if len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(signature)
+
+        match, total, facets = cached
+        return {
+            "total": total,
+            "data": self._page(match, total, sort, offset, limit),
+            "facets": facets,
+        }
+
+    def _match(self, text, categories, price_buckets, attributes, in_stock, min_price, max_price,
+               facet_limit) -> Tuple[int, int, Dict[str, Any]]:
+        base = self.bitmaps.get(ALL, 0)
+        if text:
+            base &= self._text_bitmap(text)
+        if base and (min_price is not None or max_price is not None):
+            base &= self._price_bitmap(min_price, max_price)
+
+        filters: Dict[str, int] = {}
+        if categories:
+            filters["category"] = self._union(("category", category) for category in categories)
+        if price_buckets:
+            filters["price"] = self._union(("price", bucket) for bucket in price_buckets)
+        if in_stock is not None:
+            filters["in_stock"] = self.bitmaps.get(("in_stock", in_stock), 0)
+        for name, values in attributes.items():
+            filters[f"attr:{name}"] = self._union(("attr", name, value) for value in values)
+
+        match = base
+        for bitmap in filters.values():
+            match &= bitmap
+        total = match.bit_count()
+        return match, total, self._facets(base, match, total, filters, facet_limit)
+
+    def _page(self, match: int, total: int, sort: str, offset: int, limit: int) -> List[IndexedProduct]:
+        wanted = offset + limit
+        if not total or offset >= total:
+            return []
+        order, descending = SORTS[sort]
+        # Recorrer el orden precalculado cuesta ~wanted * len / total pasos; ordenar
+        # las coincidencias, ~total. Con pocos resultados sale más barato lo segundo
+        if wanted * len(self) >= 4 * total * total:
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            slots = pick(wanted, iter_slots(match), key=self._sort_key(order))
+        else:
+            bits = _bit_string(match)
+            size = len(bits)
+            slots = []
+            sequence = self._order(order)
+            for slot in (reversed(sequence) if descending else sequence):
+                if slot < size and bits[slot] == "1":
+                    slots.append(slot)
+                    if len(slots) == wanted:
+                        break
+        return [self.docs[slot] for slot in slots[offset:]]
+
+    def _count(self, key: tuple) -> int:
+        count = self._key_counts.get(key)
+        if count is None:
+            count = self._key_counts[key] = self.bitmaps[key].bit_count()
+        return count
+
+    def _count_docs(self, mask: int, fields: List[str]) -> Dict[str, Dict[Any, int]]:
+        counts = {field: defaultdict(int) for field in fields}
+        for slot in iter_slots(mask):
+            doc = self.docs[slot]
+            for field in fields:
+                value = self._facet_value(field, doc)
+                if value is not _MISSING:
+                    counts[field][value] += 1
+        return counts
+
+    def _facets(self, base: int, match: int, total: int, filters: Dict[str, int], limit: int) -> Dict[str, Any]:
+        counts: Dict[str, Dict[Any, int]] = {}
+        # Campos sin filtro propio que se cuentan en una sola pasada por las coincidencias
+        sparse: List[str] = []
+        for field, keys in self._fields.items():
+            if not keys:
+                continue
+            if field in filters:
+                # Facetas disyuntivas: se cuenta con los demás filtros, no con el propio
+                mask = base
+                for name, selected in filters.items():
+                    if name != field:
+                        mask &= selected
+                size = mask.bit_count()
+            else:
+                mask, size = match, total
+            if not size:
+                continue
+
+            if size == len(self):
+                # Sin filtros: recuentos cacheados de cada bitmap
+                counts[field] = {key[-1]: self._count(key) for key in keys}
+            elif size * 20000 < len(keys) * mask.bit_length():
+                # Pocos productos: sale más barato recorrerlos (~1 µs por producto y
+                # campo) que cruzar cada bitmap (~50 µs por millón de slots)
+                if mask is match:
+                    sparse.append(field)
+                else:
+                    counts.update(self._count_docs(mask, [field]))
+            else:
+                counts[field] = {key[-1]: (self.bitmaps[key] & mask).bit_count() for key in keys}
+        if sparse:
+            counts.update(self._count_docs(match, sparse))
+
+        facets: Dict[str, Any] = {"category": [], "price": [], "in_stock": [], "attributes": {}}
+        for field, field_counts in counts.items():
+            values = [{"value": value, "count": count} for value, count in field_counts.items() if count]
+            if field == "price":
+                values.sort(key=lambda value: PRICE_BUCKET_LABELS.index(value["value"]))
+            else:
+                values.sort(key=lambda value: -value["count"])
+                values = values[:limit]
+            if field.startswith("attr:"):
+                facets["attributes"][field[5:]] = values
+            else:
+                facets[field] = values
+        return facets
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "products": len(self),
+            "slots": len(self.docs),
+            "bitmaps": len(self.bitmaps),
+            "tokens": len(self.postings),
+            "dense_tokens": len(self._dense),
+            "orders": sorted(self._orders),
+        }
+
+
+class CatalogIndex:
+    """Índices de todas las compañías, refrescados de forma incremental desde products.
+
+    Cada refresco lee sólo las filas con updated_at posterior a la última marca,
+    menos un margen (`overlap`) que cubre transacciones que confirmaron tarde y
+    relojes desfasados entre workers; las filas ya indexadas con esa versión se
+    ignoran. Los borrados son lógicos (deleted_at), así que llegan como un cambio.
+    """
+
+    columns = ("id", "company_id", "category_id", "sku", "name", "price", "stock", "attributes",
+               "is_active", "deleted_at", "created_at", "updated_at")
+
+    def __init__(self, refresh_interval: float = 5.0, overlap: float = 5.0, batch_size: int = 10000):
+        self.refresh_interval = refresh_interval
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.companies: Dict[UUID, FacetedIndex] = {}
+        self.watermark: Optional[datetime] = None
+        self.refreshed_at: Optional[float] = None
+        self.refreshes = 0
+        self.rows_read = 0
+        self._lock = asyncio.Lock()
+
+    def company(self, company_id: UUID) -> FacetedIndex:
+        # Las compañías sin productos comparten un índice vacío que no se guarda
+        return self.companies.get(company_id) or FacetedIndex()
+
+    @staticmethod
+    def _document(row: Mapping[str, Any]) -> Optional[IndexedProduct]:
+        if row["deleted_at"] is not None or not row["is_active"]:
+            return None
+        values = {field: row[field] for field in IndexedProduct._fields}
+        values["attributes"] = values["attributes"] or {}
+        return IndexedProduct(**values)
+
+    def apply(self, rows: Iterable[Mapping[str, Any]], advance_watermark: bool = True) -> int:
+        """Indexa filas de products (mappings); las borradas o inactivas salen del índice.
+
+        Las escrituras del propio proceso se aplican con advance_watermark=False:
+        no deben adelantar la marca por delante de filas de otros workers aún sin leer.
+        """
+        changes: Dict[UUID, List[Tuple[UUID, Optional[IndexedProduct]]]] = defaultdict(list)
+        for row in rows:
+            changes[row["company_id"]].append((row["id"], self._document(row)))
+            updated_at = row["updated_at"]
+            if advance_watermark and updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+
+        applied = 0
+        for company_id, company_changes in changes.items():
+            index = self.companies.get(company_id)
+            if index is None:
+                index = self.companies[company_id] = FacetedIndex()
+            applied += index.apply(company_changes)
+        return applied
+
+    def _changes_query(self):
+        table = Product.__table__
+        query = select(*(table.c[column] for column in self.columns))
+        if self.watermark is None:
+            query = query.where(table.c.deleted_at.is_(None), table.c.is_active.is_(True))
+        else:
+            query = query.where(table.c.updated_at >= self.watermark - timedelta(seconds=self.overlap))
+        return query.order_by(table.c.updated_at, table.c.id)
+
+    async def refresh(self, session: AsyncSession) -> int:
+        """Lee las filas cambiadas desde la última marca (todas la primera vez) y las aplica"""
+        query = self._changes_query().execution_options(stream_results=True, yield_per=self.batch_size)
+        result = await session.stream(query)
+        applied = 0
+        async for partition in result.mappings().partitions(self.batch_size):
+            self.rows_read += len(partition)
+            applied += self.apply(partition)
+        self.refreshes += 1
+        return applied
+
+    def is_fresh(self) -> bool:
+        return self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.refresh_interval
+
+    async def ensure_fresh(self, session_factory: async_sessionmaker) -> None:
+        """Refresca si han pasado refresh_interval segundos: como mucho una consulta por intervalo"""
+        if self.is_fresh():
+            return
+        async with self._lock:
+            if self.is_fresh():
+                return
+            try:
+                async with session_factory() as session:
+                    await self.refresh(session)
+            except Exception:
+                if self.refreshed_at is None:
+                    raise
+                # Mejor servir un índice algo antiguo que fallar la búsqueda
+                logger.exception("catalog index refresh failed")
+            self.refreshed_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "companies": len(self.companies),
+            "products": sum(len(index) for index in self.companies.values()),
+            "watermark": self.watermark,
+            "refreshes": self.refreshes,
+            "rows_read": self.rows_read,
+            "refreshed_seconds_ago": round(time.monotonic() - self.refreshed_at, 3) if self.refreshed_at else None,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_catalog_index() -> CatalogIndex:
+    """Índice del proceso (cada worker mantiene el suyo)"""
+    settings = get_settings()
+    return CatalogIndex(refresh_interval=settings.CATALOG_INDEX_REFRESH_SECONDS,
+                        overlap=settings.CATALOG_INDEX_REFRESH_OVERLAP_SECONDS)
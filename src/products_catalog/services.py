@@ -0,0 +1,330 @@
+import asyncio
+import logging
+import math
+import sqlmodel as sm
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+from common.exceptions import ConflictError, NotFoundError
+from common.services import AsyncBaseService
+from core.config import get_settings
+from .enums import ReservationStatus
+from .models import Category, Product, Reservation, ReservationItem
+from .schemas import *
+from .search import get_catalog_index
+
+logger = logging.getLogger(__name__)
+
+class CategoryService(AsyncBaseService):
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        super().__init__(db, Category)
+
+    async def get_categories(self, company_id: UUID) -> List[Category]:
+        query = sm.select(Category).where(Category.company_id == company_id).order_by(Category.name)
+        return (await self.db.exec(query)).all()
+
+    async def get_category(self, company_id: UUID, id: UUID) -> Category:
+        category = await self.get_by_id(id)
+        if category is None or category.company_id != company_id:
+            raise NotFoundError('Category not found')
+        return category
+
+    async def add_category(self, company_id: UUID, data: CreateCategorySchema) -> Category:
+        if data.parent_id is not None:
+            await self.get_category(company_id, data.parent_id)
+        try:
+            return await self.create({**data.model_dump(), "company_id": company_id})
+        except IntegrityError:
+            await self.db.rollback()
+            raise ConflictError('Already exists category with this name')
+
+
+class ProductService(AsyncBaseService):
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        super().__init__(db, Product)
+
+    @property
+    def index(self):
+        return get_catalog_index()
+
+    def _scope(self, company_id: UUID) -> list:
+        return [Product.company_id == company_id, Product.deleted_at.is_(None)]
+
+    async def search_products(self, company_id: UUID, params: ProductSearchSchema,
+                              session_factory: async_sessionmaker) -> Dict[str, Any]:
+        """Búsqueda con facetas sobre el índice en memoria (refrescado como mucho una vez por intervalo)"""
+        await self.index.ensure_fresh(session_factory)
+        result = self.index.company(company_id).search(
+            text=params.q,
+            categories=params.category,
+            price_buckets=params.price,
+            attributes=params.attributes,
+            in_stock=params.in_stock,
+            min_price=params.min_price,
+            max_price=params.max_price,
+            sort=params.sort,
+            offset=(params.page - 1) * params.page_size,
+            limit=params.page_size,
+            facet_limit=params.facet_limit,
+        )
+        total = result["total"]
+        total_pages = math.ceil(total / params.page_size) if total else 0
+        return {
+            "data": [doc._asdict() for doc in result["data"]],
+            "total": total,
+            "page": params.page,
+            "page_size": params.page_size,
+            "total_pages": total_pages,
+            "has_next": params.page < total_pages,
+            "has_prev": params.page > 1,
+            "facets": result["facets"],
+        }
+
+    async def get_product(self, company_id: UUID, id: UUID) -> Product:
+        product = await self.get_by_id(id)
+        if product is None or product.company_id != company_id or product.deleted_at is not None:
+            raise NotFoundError('Product not found')
+        return product
+
+    async def _check_category(self, company_id: UUID, category_id: UUID | None) -> None:
+        if category_id is not None:
+            await CategoryService(self.db).get_category(company_id, category_id)
+
+    async def add_product(self, company_id: UUID, data: CreateProductSchema) -> Product:
+        await self._check_category(company_id, data.category_id)
+        try:
+            product = await self.create({**data.model_dump(), "company_id": company_id})
+        except IntegrityError:
+            await self.db.rollback()
+            raise ConflictError('Already exists product with this sku')
+
+        # El propio worker ve la escritura sin esperar al siguiente refresco
+        self.index.apply([product.model_dump()], advance_watermark=False)
+        return product
+
+    async def edit_product(self, company_id: UUID, id: UUID, data: UpdateProductSchema) -> dict:
+        values = data.model_dump(exclude_unset=True)
+        if values.get("category_id") is not None:
+            await self._check_category(company_id, values["category_id"])
+        values["updated_at"] = datetime.now()
+        try:
+            product = await self.update_returning(id, values, conditions=self._scope(company_id))
+        except NotFoundError:
+            raise NotFoundError('Product not found')
+        except ConflictError:
+            raise ConflictError('Already exists product with this sku')
+
+        self.index.apply([product], advance_watermark=False)
+        return product
+
+    async def delete_product(self, company_id: UUID, id: UUID) -> None:
+        """Borrado lógico: los índices de los demás workers lo ven en su próximo refresco"""
+        now = datetime.now()
+        try:
+            product = await self.update_returning(
+                id, {"deleted_at": now, "updated_at": now}, conditions=self._scope(company_id)
+            )
+        except NotFoundError:
+            raise NotFoundError('Product not found')
+
+        self.index.apply([product], advance_watermark=False)
+
+
+class InventoryService(AsyncBaseService):
+    """Stock y reservas sin leer-modificar-escribir.
+
+    Cada descuento es un UPDATE condicional (`stock >= cantidad`) que la base de
+    datos aplica de forma atómica: dos compras simultáneas del último artículo no
+    pueden tener éxito las dos, y el bloqueo de la fila dura sólo hasta el commit
+    de esa transacción corta. Las reservas de varios productos bloquean las filas
+    siempre en el mismo orden (por id), así dos cestas cruzadas no se interbloquean.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        super().__init__(db, Reservation)
+
+    @staticmethod
+    def _stock_change(company_id: UUID, product_id: UUID, delta: int, now: datetime):
+        table = Product.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == product_id, table.c.company_id == company_id,
+                   table.c.deleted_at.is_(None), table.c.is_active.is_(True))
+            .values(stock=table.c.stock + delta, updated_at=now)
+            .returning(table.c.id, table.c.stock)
+        )
+        if delta < 0:
+            statement = statement.where(table.c.stock >= -delta)
+        return statement
+
+    async def adjust_stock(self, company_id: UUID, product_id: UUID, delta: int) -> dict:
+        """Suma `delta` al stock en una sentencia; con delta negativo sólo si alcanza"""
+        row = (await self.db.exec(self._stock_change(company_id, product_id, delta, datetime.now()))).first()
+        if row is None:
+            await self.db.rollback()
+            product = await ProductService(self.db).get_product(company_id, product_id)
+            # Sin fila: o el producto está inactivo o (sólo al restar) no alcanza el stock
+            if not product.is_active:
+                raise ConflictError('Product is not active')
+            raise ConflictError('Insufficient stock')
+        await self.db.commit()
+        return {"id": row.id, "stock": row.stock}
+
+    async def _take(self, company_id: UUID, quantities: List[Tuple[UUID, int]], now: datetime) -> Optional[UUID]:
+        """Descuenta cada producto (sin commit); devuelve el primero sin stock tras deshacer el resto"""
+        for product_id, quantity in quantities:
+            row = (await self.db.exec(self._stock_change(company_id, product_id, -quantity, now))).first()
+            if row is None:
+                await self.db.rollback()
+                return product_id
+        return None
+
+    async def reserve(self, company_id: UUID, data: CreateReservationSchema,
+                      ttl_seconds: Optional[float] = None) -> dict:
+        """Retiene stock de varios productos a la vez (todo o nada) durante un TTL"""
+        merged: Dict[UUID, int] = defaultdict(int)
+        for item in data.items:
+            merged[item.product_id] += item.quantity
+        quantities = sorted(merged.items())
+
+        now = datetime.now()
+        missing = await self._take(company_id, quantities, now)
+        if missing is not None and await self.release_expired(product_ids=[missing]):
+            # Había reservas caducadas sin barrer reteniendo ese producto
+            now = datetime.now()
+            missing = await self._take(company_id, quantities, now)
+        if missing is not None:
+            await ProductService(self.db).get_product(company_id, missing)
+            raise ConflictError(f'Insufficient stock for product {missing}')
+
+        ttl = ttl_seconds or data.ttl_seconds or get_settings().INVENTORY_RESERVATION_TTL_SECONDS
+        reservation = Reservation(company_id=company_id, expires_at=now + timedelta(seconds=ttl),
+                                  created_at=now, updated_at=now)
+        items = [ReservationItem(reservation_id=reservation.id, product_id=product_id, quantity=quantity,
+                                 created_at=now, updated_at=now)
+                 for product_id, quantity in quantities]
+        self.db.add(reservation)
+        self.db.add_all(items)
+        await self.db.commit()
+        return {**reservation.model_dump(), "items": [item.model_dump() for item in items]}
+
+    async def _items(self, reservation_id: UUID) -> List[dict]:
+        query = sm.select(ReservationItem.product_id, ReservationItem.quantity).where(
+            ReservationItem.reservation_id == reservation_id
+        ).order_by(ReservationItem.product_id)
+        return [dict(row._mapping) for row in (await self.db.exec(query)).all()]
+
+    async def get_reservation(self, company_id: UUID, id: UUID) -> dict:
+        reservation = await self.get_by_id(id)
+        if reservation is None or reservation.company_id != company_id:
+            raise NotFoundError('Reservation not found')
+        return {**reservation.model_dump(), "items": await self._items(id)}
+
+    async def _transition(self, company_id: UUID, id: UUID, status: ReservationStatus,
+                          now: datetime) -> Optional[dict]:
+        """Pasa una reserva retenida (y sin caducar) a `status`; None si no estaba así"""
+        table = Reservation.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == id, table.c.company_id == company_id,
+                   table.c.status == ReservationStatus.HELD, table.c.expires_at > now)
+            .values(status=status, updated_at=now)
+            .returning(*table.c)
+        )
+        row = (await self.db.exec(statement)).mappings().first()
+        return dict(row) if row is not None else None
+
+    async def _not_held(self, company_id: UUID, id: UUID) -> Exception:
+        await self.db.rollback()
+        reservation = await self.get_by_id(id)
+        if reservation is None or reservation.company_id != company_id:
+            return NotFoundError('Reservation not found')
+        if reservation.status == ReservationStatus.HELD:
+            return ConflictError('Reservation expired')
+        return ConflictError(f'Reservation is {reservation.status.value}')
+
+    async def confirm(self, company_id: UUID, id: UUID) -> dict:
+        """Completa la compra: el stock retenido ya estaba descontado"""
+        reservation = await self._transition(company_id, id, ReservationStatus.CONFIRMED, datetime.now())
+        if reservation is None:
+            raise await self._not_held(company_id, id)
+        await self.db.commit()
+        return {**reservation, "items": await self._items(id)}
+
+    async def release(self, company_id: UUID, id: UUID) -> dict:
+        """Cancela la reserva y devuelve su stock"""
+        now = datetime.now()
+        reservation = await self._transition(company_id, id, ReservationStatus.RELEASED, now)
+        if reservation is None:
+            raise await self._not_held(company_id, id)
+        await self._restock([id], now)
+        await self.db.commit()
+        return {**reservation, "items": await self._items(id)}
+
+    async def _restock(self, reservation_ids: List[UUID], now: datetime) -> None:
+        """Devuelve al stock lo retenido por esas reservas (sin commit), en orden de producto"""
+        query = (
+            sm.select(ReservationItem.product_id, func.sum(ReservationItem.quantity))
+            .where(ReservationItem.reservation_id.in_(reservation_ids))
+            .group_by(ReservationItem.product_id)
+            .order_by(ReservationItem.product_id)
+        )
+        table = Product.__table__
+        for product_id, quantity in (await self.db.exec(query)).all():
+            await self.db.exec(
+                update(table).where(table.c.id == product_id)
+                .values(stock=table.c.stock + quantity, updated_at=now)
+            )
+
+    async def release_expired(self, limit: int = 500, product_ids: Optional[List[UUID]] = None) -> int:
+        """Caduca hasta `limit` reservas vencidas y devuelve su stock; devuelve cuántas.
+
+        Las reservas se reclaman con FOR UPDATE SKIP LOCKED (en Postgres): varios
+        workers pueden barrer a la vez sin esperarse ni caducar dos veces la misma.
+        """
+        now = datetime.now()
+        table = Reservation.__table__
+        claim = (
+            sm.select(table.c.id)
+            .where(table.c.status == ReservationStatus.HELD, table.c.expires_at <= now)
+            .order_by(table.c.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        if product_ids:
+            claim = claim.where(table.c.id.in_(
+                sm.select(ReservationItem.reservation_id).where(ReservationItem.product_id.in_(product_ids))
+            ))
+        statement = (
+            update(table)
+            .where(table.c.id.in_(claim), table.c.status == ReservationStatus.HELD)
+            .values(status=ReservationStatus.EXPIRED, updated_at=now)
+            .returning(table.c.id)
+        )
+        ids = list((await self.db.exec(statement)).scalars().all())
+        if ids:
+            await self._restock(ids, now)
+        await self.db.commit()
+        return len(ids)
+
+
+async def expire_reservations(session_factory: async_sessionmaker, interval: float, batch_size: int) -> None:
+    """Barrido periódico de reservas caducadas (tarea del lifespan, una por worker)"""
+    while True:
+        try:
+            async with session_factory() as session:
+                released = await InventoryService(session).release_expired(batch_size)
+            if released >= batch_size:
+                # Quedan más: se sigue sin esperar
+                continue
+        except Exception:
+            logger.exception("reservation expiry failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,289 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+from uuid import UUID
+import fastapi as fa
+import sqlmodel as sm
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from common.cache import TTLCache
+from common.exceptions import AuthenticationError
+from common.models.ids import uuid7
+from core.admission import bearer_token
+from core.config import get_settings
+from core.database import get_async_session_factory
+from .enums import UserRole
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher:
+    """Hash de contraseñas con scrypt (hashlib) fuera del event loop.
+
+    scrypt cuesta decenas de milisegundos de CPU a propósito; dentro de un
+    `async def` bloquearía todas las peticiones del worker. hashlib libera el GIL
+    mientras calcula, así que un pool de pocos hilos basta y acota cuántos hashes
+    se calculan a la vez: una ráfaga de logins espera en la cola del pool en lugar
+    de quitarle CPU al resto de rutas. Con `workers=0` se calcula en el propio
+    loop (sólo para comparar en benchmarks).
+    """
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1, workers: int = 2):
+        self.n, self.r, self.p = n, r, p
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(16)
+        digest = self._derive(password, salt, self.n, self.r, self.p)
+        return "$".join([
+            "scrypt", str(self.n), str(self.r), str(self.p),
+            base64.b64encode(salt).decode(), base64.b64encode(digest).decode(),
+        ])
+
+    def verify(self, password: str, encoded: Optional[str]) -> bool:
+        if not encoded:
+            # Usuario inexistente: mismo coste que una verificación real (y en el mismo
+            # hilo del pool), así el tiempo de respuesta no delata qué emails existen
+            self._derive(password, secrets.token_bytes(16), self.n, self.r, self.p)
+            return False
+        try:
+            scheme, n, r, p, salt, digest = encoded.split("$")
+            if scheme != "scrypt":
+                return False
+            expected = base64.b64decode(digest)
+            derived = self._derive(password, base64.b64decode(salt), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived, expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """El hash se calculó con otros parámetros (se rehace en el próximo login)"""
+        return encoded.split("$")[1:4] != [str(self.n), str(self.r), str(self.p)]
+
+    async def _run(self, function, *args):
+        if self.workers <= 0:
+            return function(*args)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run(self.hash, password)
+
+    async def verify_async(self, password: str, encoded: Optional[str]) -> bool:
+        return await self._run(self.verify, password, encoded)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class Principal(NamedTuple):
+    """Usuario autenticado, tal como viene en el token (sin consultar la base de datos)"""
+    user_id: UUID
+    company_id: Optional[UUID]
+    role: UserRole
+    token_id: UUID
+    expires_at: datetime
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class TokenSigner:
+    """Tokens sin estado: `payload.firma`, con el payload en JSON y firma HMAC-SHA256"""
+
+    def __init__(self, secret: str, ttl: float = 3600):
+        self._key = secret.encode()
+        self.ttl = ttl
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, user_id: UUID, company_id: Optional[UUID], role: UserRole) -> Tuple[str, Principal]:
+        now = int(time.time())
+        claims = {"sub": str(user_id), "cid": str(company_id) if company_id else None, "role": role.value,
+                  "jti": str(uuid7()), "iat": now, "exp": now + int(self.ttl)}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        return f"{payload}.{self._sign(payload)}", self._principal(claims)
+
+    @staticmethod
+    def _principal(claims: dict) -> Principal:
+        return Principal(
+            user_id=UUID(claims["sub"]),
+            company_id=UUID(claims["cid"]) if claims["cid"] else None,
+            role=UserRole(claims["role"]),
+            token_id=UUID(claims["jti"]),
+            expires_at=datetime.fromtimestamp(claims["exp"]),
+        )
+
+    def decode(self, token: str) -> Tuple[Principal, float]:
+        """Comprueba firma y caducidad; devuelve el usuario y el `exp` (epoch)"""
+        payload, _, signature = token.partition(".")
+        if not signature or not hmac.compare_digest(signature.encode(), self._sign(payload).encode()):
+            raise AuthenticationError('Invalid token')
+        try:
+            claims = json.loads(_b64decode(payload))
+            principal = self._principal(claims)
+            expires = float(claims["exp"])
+        except (ValueError, KeyError, TypeError):
+            raise AuthenticationError('Invalid token')
+        if expires <= time.time():
+            raise AuthenticationError('Token expired')
+        return principal, expires
+
+
+class TokenVerifier:
+    """Verificación cacheada de tokens más la lista de tokens revocados (logout).
+
+    Un token ya verificado se sirve desde una caché con TTL corto (nunca más allá
+    de su `exp`), así que la comprobación habitual es un acceso a diccionario. La
+    revocación se consulta en cada petición contra un conjunto en memoria; los
+    logouts de otros workers llegan leyendo revoked_tokens como mucho una vez por
+    `sync_interval` (igual que el índice del catálogo con sus cambios).
+    """
+
+    def __init__(self, signer: TokenSigner, cache_ttl: float = 60, maxsize: int = 50000,
+                 sync_interval: float = 5, sync_overlap: float = 5):
+        self.signer = signer
+        self._cache = TTLCache(maxsize=maxsize, ttl=cache_ttl)
+        self._revoked: Dict[UUID, float] = {}
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self._watermark: Optional[datetime] = None
+        self._next_sync = 0.0
+        self._sync_lock: Optional[asyncio.Lock] = None
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str) -> Principal:
+        entry = self._cache.get(token)
+        if entry is None:
+            self.misses += 1
+            principal, expires = self.signer.decode(token)
+            self._cache.set(token, (principal, expires), ttl=min(self._cache.ttl, expires - time.time()))
+        else:
+            self.hits += 1
+            principal, expires = entry
+            if expires <= time.time():
+                raise AuthenticationError('Token expired')
+        if principal.token_id in self._revoked:
+            raise AuthenticationError('Token revoked')
+        return principal
+
+    def revoke(self, token_id: UUID, expires_at: datetime) -> None:
+        self._revoked[token_id] = expires_at.timestamp()
+
+    async def refresh(self, session) -> int:
+        """Trae las revocaciones nuevas (con margen de `sync_overlap` por commits tardíos)"""
+        now = datetime.now()
+        query = sm.select(RevokedToken.id, RevokedToken.expires_at, RevokedToken.created_at).where(
+            RevokedToken.expires_at > now
+        )
+        if self._watermark is not None:
+            query = query.where(RevokedToken.created_at >= self._watermark - timedelta(seconds=self.sync_overlap))
+        rows = (await session.exec(query)).all()
+        for token_id, expires_at, created_at in rows:
+            self.revoke(token_id, expires_at)
+            if self._watermark is None or created_at > self._watermark:
+                self._watermark = created_at
+        if self._watermark is None:
+            self._watermark = now
+        # Las revocaciones de tokens ya caducados sobran
+        epoch = time.time()
+        for token_id in [token_id for token_id, expires in self._revoked.items() if expires <= epoch]:
+            del self._revoked[token_id]
+        return len(rows)
+
+    async def ensure_fresh(self, session_factory: async_sessionmaker) -> None:
+        if time.monotonic() < self._next_sync:
+            return
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+        async with self._sync_lock:
+            if time.monotonic() < self._next_sync:
+                return
+            try:
+                async with session_factory() as session:
+                    await self.refresh(session)
+            except Exception:
+                # Los tokens se siguen validando con las revocaciones ya conocidas
+                logger.exception("token revocation sync failed")
+            self._next_sync = time.monotonic() + self.sync_interval
+
+    def stats(self) -> dict:
+        return {"cached": len(self._cache), "revoked": len(self._revoked), "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def get_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    return PasswordHasher(n=settings.AUTH_SCRYPT_N, workers=settings.AUTH_HASH_WORKERS)
+
+
+@lru_cache(maxsize=None)
+def get_token_verifier() -> TokenVerifier:
+    settings = get_settings()
+    secret = settings.AUTH_SECRET_KEY
+    if not secret:
+        # Sólo vale con un worker: los tokens no se validan en otros procesos ni tras reiniciar
+        logger.warning("AUTH_SECRET_KEY is not set; using a random per-process key")
+        secret = secrets.token_urlsafe(32)
+    return TokenVerifier(
+        TokenSigner(secret, ttl=settings.AUTH_TOKEN_TTL_SECONDS),
+        cache_ttl=settings.AUTH_VERIFY_CACHE_TTL,
+        maxsize=settings.AUTH_VERIFY_CACHE_MAX_ENTRIES,
+        sync_interval=settings.AUTH_REVOCATION_SYNC_SECONDS,
+    )
+
+
+def tenant_from_token(scope: dict) -> Optional[str]:
+    """Compañía (claim cid) del token de la petición, para la cuota por tenant del control de admisión.
+    
+    Corre antes del router: un token inválido o revocado no tiene tenant (la ruta lo rechazará).
+    """
+    token = bearer_token(scope)
+    if token is None:
+        return None
+    try:
+        principal = get_token_verifier().verify(token)
+    except AuthenticationError:
+        return None
+    return str(principal.company_id) if principal.company_id else None
+
+
+_bearer = fa.security.HTTPBearer(auto_error=False)
+
+async def get_current_user(
+    credentials: Optional[fa.security.HTTPAuthorizationCredentials] = fa.Depends(_bearer),
+) -> Principal:
+    """Dependencia de las rutas autenticadas (`Authorization: Bearer <token>`)"""
+    if credentials is None:
+        raise fa.HTTPException(status_code=401, detail='Not authenticated',
+                               headers={"WWW-Authenticate": "Bearer"})
+    verifier = get_token_verifier()
+    try:
+        # Las revocaciones siempre del primario: una réplica con retraso las perdería
+        await verifier.ensure_fresh(get_async_session_factory())
+        return verifier.verify(credentials.credentials)
+    except AuthenticationError as e:
+        raise fa.HTTPException(status_code=401, detail=f'{e}', headers={"WWW-Authenticate": "Bearer"})
@@ -0,0 +1,132 @@
+from functools import lru_cache
+from itertools import chain
+from typing import List
+from uuid import UUID
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from common.cache import TTLCache
+from core.config import get_settings
+from .enums import PERMISSION_BITS, Permission
+from .models import Role, UserRoleAssignment
+
+
+class PermissionResolver:
+    """Permisos efectivos de un usuario en una compañía como un único entero.
+    
+    El resultado (OR de las máscaras de sus roles) se cachea por (usuario, compañía).
+    Los cambios en roles invalidan la compañía entera (generación) y los cambios en
+    asignaciones sólo la entrada del usuario (versión). Generación y versión van en
+    la clave, que se calcula antes de consultar: una carga en curso al invalidar
+    guarda su resultado bajo la clave anterior, que ya nadie lee. La caché es por
+    proceso; el TTL acota cuánto tarda otro worker en ver un cambio.
+    """
+
+    def __init__(self, ttl: float = 30.0, maxsize: int = 50000):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: dict[UUID, int] = {}
+        self._user_versions: dict[tuple, int] = {}
+
+    def _key(self, user_id: UUID, company_id: UUID) -> tuple:
+        return (user_id, company_id, self._generations.get(company_id, 0),
+                self._user_versions.get((user_id, company_id), 0))
+
+    @staticmethod
+    def mask_query(user_id: UUID, company_id: UUID) -> sa.Select:
+        """Máscaras de los roles del usuario en la compañía (ix_user_role_assignments_user_id_company_id)"""
+        return (
+            sa.select(Role.permissions_mask)
+            .join(UserRoleAssignment, UserRoleAssignment.role_id == Role.id)
+            .where(UserRoleAssignment.user_id == user_id, UserRoleAssignment.company_id == company_id)
+        )
+
+    @staticmethod
+    def users_with_permission_query(company_id: UUID, permission: Permission) -> sa.Select:
+        """Usuarios con `permission` en la compañía.
+        
+        Usa ix_roles_company_id_permissions_mask para los roles e
+        ix_user_role_assignments_company_id_role_id para sus asignaciones.
+        """
+        bit = PERMISSION_BITS[permission]
+        return (
+            sa.select(UserRoleAssignment.user_id)
+            .join(Role, sa.and_(
+                Role.id == UserRoleAssignment.role_id,
+                Role.company_id == UserRoleAssignment.company_id,
+            ))
+            .where(Role.company_id == company_id, Role.permissions_mask.op("&")(bit) != 0)
+            .distinct()
+        )
+
+    async def get_mask(self, session: AsyncSession, user_id: UUID, company_id: UUID) -> int:
+        key = self._key(user_id, company_id)
+        mask = self._cache.get(key)
+        if mask is not None:
+            return mask
+        
+        mask = 0
+        for role_mask in (await session.exec(self.mask_query(user_id, company_id))).scalars():
+            mask |= role_mask
+        
+        self._cache.set(key, mask)
+        return mask
+
+    async def has_permission(self, session: AsyncSession, user_id: UUID,
+                             company_id: UUID, permission: Permission) -> bool:
+        bit = PERMISSION_BITS[permission]
+        return (await self.get_mask(session, user_id, company_id)) & bit == bit
+
+    async def users_with_permission(self, session: AsyncSession, company_id: UUID,
+                                    permission: Permission) -> List[UUID]:
+        """Usuarios con `permission` en la compañía"""
+        query = self.users_with_permission_query(company_id, permission)
+        return list((await session.exec(query)).scalars())
+
+    def invalidate_user(self, user_id: UUID, company_id: UUID) -> None:
+        self._cache.delete(self._key(user_id, company_id))
+        pair = (user_id, company_id)
+        self._user_versions[pair] = self._user_versions.get(pair, 0) + 1
+
+    def invalidate_company(self, company_id: UUID) -> None:
+        self._generations[company_id] = self._generations.get(company_id, 0) + 1
+
+
+@lru_cache(maxsize=None)
+def get_permission_resolver() -> PermissionResolver:
+    """Resolutor compartido del proceso (se crea en el primer uso)"""
+    settings = get_settings()
+    return PermissionResolver(ttl=settings.AUTHZ_CACHE_TTL, maxsize=settings.AUTHZ_CACHE_MAX_ENTRIES)
+
+
+# Invalidación: se recogen los cambios en cada flush y se aplican tras el commit,
+# para que otra petición no vuelva a cachear el estado anterior al commit
+_PENDING_KEY = "authz_invalidations"
+
+@sa.event.listens_for(Session, "after_flush")
+def _collect_authorization_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in chain(session.new, session.deleted):
+        if isinstance(obj, UserRoleAssignment):
+            pending.add(("user", obj.user_id, obj.company_id))
+        elif isinstance(obj, Role):
+            pending.add(("company", obj.company_id))
+    for obj in session.dirty:
+        # Una asignación modificada puede haber cambiado de usuario: se invalida la compañía
+        if isinstance(obj, (Role, UserRoleAssignment)):
+            pending.add(("company", obj.company_id))
+
+@sa.event.listens_for(Session, "after_commit")
+def _apply_authorization_changes(session):
+    changes = session.info.pop(_PENDING_KEY, ())
+    if not changes:
+        return
+    permission_resolver = get_permission_resolver()
+    for change in changes:
+        if change[0] == "user":
+            permission_resolver.invalidate_user(change[1], change[2])
+        else:
+            permission_resolver.invalidate_company(change[1])
+
+@sa.event.listens_for(Session, "after_soft_rollback")
+def _discard_authorization_changes(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
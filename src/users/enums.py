@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Dict, Iterable, List
 
 
 class UserRole(str, Enum):
@@ -34,3 +35,27 @@ class Permission(str, Enum):
     # Permisos financieros
     VIEW_FINANCES = "view_finances"
     EDIT_FINANCES = "edit_finances"
+
+
+# Bit de cada permiso en roles.permissions_mask. Depende del orden de declaración
+# de Permission: los permisos nuevos deben añadirse siempre al final.
+PERMISSION_BITS: Dict[Permission, int] = {
+    permission: 1 << index for index, permission in enumerate(Permission)
+}
+ALL_PERMISSIONS_MASK = (1 << len(PERMISSION_BITS)) - 1
+
+
+def permissions_to_mask(permissions: Iterable[Permission | str]) -> int:
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS[Permission(permission)]
+    return mask
+
+
+def mask_to_permissions(mask: int) -> List[Permission]:
+    return [permission for permission, bit in PERMISSION_BITS.items() if mask & bit]
+
+
+class ChangeOperation(str, Enum):
+    UPSERT = "upsert"  # Alta o modificación: el estado actual viene en el cambio
+    DELETE = "delete"  # Borrado (tombstone)
@@ -7,6 +7,8 @@ def get_company_filter(
     name: str | None = Query(None, description="Filter by name"),
     email: EmailStr | None = Query(None, description="Filter by email"),
     is_active: Optional[bool] = Query(None, description="Filter by is_active"),
+    name__contains: str | None = Query(None, description="Case-insensitive substring of name"),
+    email__contains: str | None = Query(None, description="Case-insensitive substring of email"),
     sort_by: str | None = Query(None, description="Field for order"),
     sort_order: str = Query("asc", pattern="^(asc|desc)$", description="Order direction")
 ):
@@ -1,12 +1,93 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 import fastapi as fa
-from .routes import router
+from core.admission import AdmissionController, AdmissionMiddleware
+from core.cache import get_query_cache
+from core.config import get_settings
+from core.database import dispose_engines, get_async_session_factory, pool_status, warm_up
+from core.metrics import MetricsMiddleware, metrics_registry
 
-app = fa.FastAPI()
 
+@asynccontextmanager
+async def lifespan(app: fa.FastAPI):
+    from products_catalog.services import expire_reservations
+    from .auth import get_password_hasher
 
-app.include_router(router)
+    settings = get_settings()
+    # Sin create_all: el esquema lo gestionan las migraciones de Alembic
+    await warm_up(settings.DB_POOL_WARMUP)
+    sweeper = None
+    if settings.INVENTORY_EXPIRY_INTERVAL_SECONDS > 0:
+        sweeper = asyncio.create_task(expire_reservations(
+            get_async_session_factory(), settings.INVENTORY_EXPIRY_INTERVAL_SECONDS,
+            settings.INVENTORY_EXPIRY_BATCH_SIZE,
+        ))
+    yield
+    if sweeper is not None:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
+    await dispose_engines()
+    # Sólo si algún login llegó a crear el pool de hash
+    if get_password_hasher.cache_info().currsize:
+        get_password_hasher().shutdown()
 
 
-@app.get('/health-check')
-def health_check():
-    return {"message": "Everything is ok"}
+def create_app() -> fa.FastAPI:
+    """Crea la aplicación (`uvicorn --factory users.main:create_app`)"""
+    from products_catalog.routes import router as catalog_router
+    from products_catalog.search import get_catalog_index
+    from .auth import get_token_verifier, tenant_from_token
+    from .routes import auth_router, router
+
+    settings = get_settings()
+    app = fa.FastAPI(lifespan=lifespan)
+    # El último middleware añadido es el más externo: métricas por fuera del control de admisión
+    app.state.admission = None
+    if settings.ADMISSION_ENABLED:
+        # Cuota por compañía según el token del cliente (no la compañía de la URL)
+        app.state.admission = AdmissionController.from_settings(settings, tenant=tenant_from_token)
+        app.add_middleware(AdmissionMiddleware, controller=app.state.admission, registry=metrics_registry)
+    app.add_middleware(MetricsMiddleware, registry=metrics_registry, server_timing=settings.SERVER_TIMING)
+
+    app.include_router(router)
+    app.include_router(catalog_router)
+    app.include_router(auth_router)
+
+    @app.get('/health-check')
+    def health_check():
+        return {"message": "Everything is ok"}
+
+    @app.get('/internal/pool-stats', include_in_schema=False)
+    def pool_stats():
+        return pool_status()
+
+    @app.get('/internal/cache-stats', include_in_schema=False)
+    def cache_stats():
+        return get_query_cache().stats()
+
+    @app.get('/internal/catalog-index-stats', include_in_schema=False)
+    def catalog_index_stats():
+        return get_catalog_index().stats()
+
+    @app.get('/internal/admission-stats', include_in_schema=False)
+    def admission_stats():
+        return app.state.admission.stats() if app.state.admission else {"enabled": False}
+
+    @app.get('/internal/auth-stats', include_in_schema=False)
+    def auth_stats():
+        return get_token_verifier().stats()
+
+    @app.get('/metrics', include_in_schema=False)
+    def metrics():
+        return fa.responses.PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+def __getattr__(name: str):
+    # `uvicorn users.main:app` sigue funcionando: la app se crea al pedirla, no al importar
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
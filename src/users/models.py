@@ -1,14 +1,23 @@
 import sqlmodel as sm
 import sqlalchemy as sa
-from uuid import uuid4, UUID
+from datetime import datetime
+from uuid import UUID
 from typing import List, Optional
 from common.models.api_base_model import ApiBaseModel
-from .enums import UserRole, Permission 
+from common.models.ids import uuid7
+from .enums import ChangeOperation, UserRole, Permission, permissions_to_mask
 
 class Company(ApiBaseModel, table=True):
     __tablename__ = "companies"
+    __table_args__ = (
+        # Índices trigram para búsquedas por subcadena (ILIKE '%x%'), sólo en Postgres
+        sa.Index("ix_companies_name_trgm", "name", postgresql_using="gin",
+                 postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        sa.Index("ix_companies_email_trgm", "email", postgresql_using="gin",
+                 postgresql_ops={"email": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
     
-    id: UUID = sm.Field(default_factory=uuid4, primary_key=True)
+    id: UUID = sm.Field(default_factory=uuid7, primary_key=True)
     name: str = sm.Field(index=True, unique=True)
     email: str = sm.Field(index=True, unique=True)
     description: str = sm.Field(nullable=True, max_length=255)
@@ -22,7 +31,7 @@ class Company(ApiBaseModel, table=True):
 class User(ApiBaseModel, table=True):
     __tablename__ = "users"
     
-    id: UUID = sm.Field(default_factory=uuid4, primary_key=True)
+    id: UUID = sm.Field(default_factory=uuid7, primary_key=True)
     email: str = sm.Field(index=True, unique=True)
     username: str = sm.Field(index=True)
     password: str = sm.Field()
@@ -30,7 +39,7 @@ class User(ApiBaseModel, table=True):
     global_role: UserRole = sm.Field(default=UserRole.CUSTOMER)
     
     # Relación con compañía
-    company_id: Optional[UUID] = sm.Field(default=None, foreign_key="companies.id")
+    company_id: Optional[UUID] = sm.Field(default=None, foreign_key="companies.id", index=True)
     company: Optional[Company] = sm.Relationship(back_populates="users")
     
     # Relación con roles específicos
@@ -39,11 +48,20 @@ class User(ApiBaseModel, table=True):
     
 class Role(ApiBaseModel, table=True):
     __tablename__ = "roles"
+    __table_args__ = (
+        # Consultas inversas: roles de una compañía que conceden un permiso
+        sa.Index("ix_roles_company_id_permissions_mask", "company_id", "permissions_mask"),
+    )
     
-    id: UUID = sm.Field(default_factory=uuid4, primary_key=True)
+    id: UUID = sm.Field(default_factory=uuid7, primary_key=True)
     name: str = sm.Field(index=True)
     description: str = sm.Field(nullable=True, max_length=255)
     permissions: List[Permission] = sm.Field(default=[], sa_column=sa.Column(sa.JSON))
+    # Bitmask de `permissions` (ver enums.PERMISSION_BITS), sincronizado al guardar
+    permissions_mask: int = sm.Field(
+        default=0,
+        sa_column=sa.Column(sa.BigInteger, nullable=False, server_default="0")
+    )
     is_system_role: bool = sm.Field(default=False)
     
     # Relación con compañía
@@ -54,14 +72,54 @@ class Role(ApiBaseModel, table=True):
     user_assignments: List["UserRoleAssignment"] = sm.Relationship(back_populates="role")
     
     
+@sa.event.listens_for(Role, "before_insert")
+@sa.event.listens_for(Role, "before_update")
+def _sync_permissions_mask(mapper, connection, target: Role):
+    target.permissions_mask = permissions_to_mask(target.permissions or [])
+    
+    
 class UserRoleAssignment(ApiBaseModel, table=True):
     __tablename__ = "user_role_assignments"
+    __table_args__ = (
+        sa.UniqueConstraint("user_id", "role_id", "company_id", name="uq_user_role_assignments_user_role_company"),
+        # Roles de un usuario en una compañía (PermissionResolver)
+        sa.Index("ix_user_role_assignments_user_id_company_id", "user_id", "company_id"),
+        # Asignaciones de una compañía / de un rol dentro de la compañía
+        sa.Index("ix_user_role_assignments_company_id_role_id", "company_id", "role_id"),
+    )
     
-    id: UUID = sm.Field(default_factory=uuid4, primary_key=True)
+    id: UUID = sm.Field(default_factory=uuid7, primary_key=True)
     user_id: UUID = sm.Field(foreign_key="users.id")
     role_id: UUID = sm.Field(foreign_key="roles.id")
     company_id: UUID = sm.Field(foreign_key="companies.id")
     
     # Relaciones
     user: User = sm.Relationship(back_populates="user_roles")
-    role: Role = sm.Relationship(back_populates="user_assignments")
\ No newline at end of file
+    role: Role = sm.Relationship(back_populates="user_assignments")
+    
+    
+class RevokedToken(ApiBaseModel, table=True):
+    __tablename__ = "revoked_tokens"
+    __table_args__ = (
+        # Sincronización incremental de revocaciones entre workers
+        sa.Index("ix_revoked_tokens_created_at", "created_at"),
+    )
+    
+    # jti del token revocado
+    id: UUID = sm.Field(primary_key=True)
+    user_id: UUID = sm.Field(foreign_key="users.id", index=True)
+    expires_at: datetime = sm.Field()
+
+    
+class CompanyChange(ApiBaseModel, table=True):
+    """Outbox de cambios de compañías, escrito en la misma transacción que el cambio.
+    
+    El id autoincremental es el cursor del feed (GET /users/companies/changes).
+    Sin foreign key a companies: los borrados deben sobrevivir a la fila.
+    """
+    __tablename__ = "company_changes"
+    
+    id: Optional[int] = sm.Field(default=None, sa_column=sa.Column(sa.BigInteger().with_variant(sa.Integer, "sqlite"),
+                                                                   primary_key=True, autoincrement=True))
+    company_id: UUID = sm.Field(index=True)
+    operation: ChangeOperation = sm.Field()
@@ -1,34 +1,120 @@
-import sqlmodel as sm
 import fastapi as fa
-from typing import Annotated, Optional
+from typing import Annotated, Literal, Optional
 from uuid import UUID
+from common.bulk import iter_records
+from common.etag import etag_matches, page_etag, row_etag
+from common.exceptions import AuthenticationError, ConflictError, NotFoundError, PreconditionFailedError
 from common.pagination import PaginatedResponse, PaginationParams
-from core.database import get_session
-from .schemas import CompanyResponse, CompanyFilterSchema, CreateCompanySchema, UpdateCompanySchema
+from common.serialization import json_response
+from core.database import get_read_session, get_write_session, read_session_factory, session_factory_of
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .auth import Principal, get_current_user
+from .schemas import (BulkImportReport, CompanyChangesResponse, CompanyResponse, CompanyFilterSchema,
+                      CreateCompanySchema, LoginSchema, PrincipalResponse, RegisterUserSchema, TokenResponse,
+                      UpdateCompanySchema, UserResponse)
 from .filters import get_company_filter
-from .services import CompanyService
+from .services import AuthService, CompanyService, company_loader
 
 router = fa.APIRouter(prefix='/users', tags=['Users'])
+auth_router = fa.APIRouter(prefix='/auth', tags=['Auth'])
 
 @router.get(
     '/companies', 
     response_model=PaginatedResponse[CompanyResponse], 
     status_code=fa.status.HTTP_200_OK)
 async def read_companies(
-    db: sm.Session = fa.Depends(get_session),
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_read_session),
     pagination: PaginationParams = fa.Depends(),
     filters: Annotated[Optional[CompanyFilterSchema], fa.Depends(get_company_filter)] = None,
+    if_none_match: Optional[str] = fa.Header(None),
 ):
     try:
         service = CompanyService(db)
         filter_params = CompanyFilterSchema(**filters.model_dump())
-        result = service.get_all_paginated(
+        result = await service.get_all_paginated(
             filter_params=filter_params,
             pagination=pagination,
             sort_by=filter_params.sort_by,
             sort_order=filter_params.sort_order
         )
-        return result
+        # La página suele salir de la caché: el 304 ahorra serialización y transferencia
+        envelope = ("total", "total_pages", "has_next", "has_prev", "next_cursor", "prev_cursor")
+        etag = page_etag(result["data"], *(result[field] for field in envelope))
+        if etag_matches(if_none_match, etag):
+            return fa.Response(status_code=fa.status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return json_response(PaginatedResponse[CompanyResponse], result, response=response)
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.get(
+    '/companies/search',
+    response_model=list[CompanyResponse],
+    status_code=fa.status.HTTP_200_OK)
+async def search_companies(
+    q: str = fa.Query(..., min_length=1, description="Case-insensitive text searched in name and email"),
+    limit: int = fa.Query(20, ge=1, le=100, description="Maximum number of results"),
+    db: AsyncSession = fa.Depends(get_read_session)
+):
+    try:
+        service = CompanyService(db)
+        return json_response(list[CompanyResponse], await service.search_companies(q, limit))
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.get(
+    '/companies/export',
+    response_class=fa.responses.StreamingResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def export_companies(
+    request: fa.Request,
+    format: Literal["ndjson", "csv"] = fa.Query("ndjson", description="Export format"),
+    batch_size: int = fa.Query(1000, ge=1, le=10000, description="Rows fetched per round trip"),
+    filters: Annotated[Optional[CompanyFilterSchema], fa.Depends(get_company_filter)] = None,
+):
+    # La sesión vive dentro del generador: debe seguir abierta mientras se envía la respuesta
+    session_factory = read_session_factory(request)
+    
+    async def content():
+        async with session_factory() as db:
+            service = CompanyService(db)
+            async for chunk in service.export_companies(filters, format=format, batch_size=batch_size):
+                yield chunk
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return fa.responses.StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="companies.{format}"'}
+    )
+
+@router.get(
+    '/companies/batch',
+    response_model=list[CompanyResponse],
+    status_code=fa.status.HTTP_200_OK)
+async def read_companies_by_ids(
+    ids: list[UUID] = fa.Query(..., description="Company ids (repeat the parameter, at most 100)"),
+    db: AsyncSession = fa.Depends(get_read_session)
+):
+    try:
+        service = CompanyService(db)
+        return json_response(list[CompanyResponse], await service.get_companies_by_ids(ids))
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@router.get(
+    '/companies/changes',
+    response_model=CompanyChangesResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def read_company_changes(
+    since: int = fa.Query(0, ge=0, description="Cursor returned by the previous call (0 = from the beginning)"),
+    limit: int = fa.Query(500, ge=1, le=5000, description="Maximum number of changes per batch"),
+    db: AsyncSession = fa.Depends(get_read_session)
+):
+    try:
+        service = CompanyService(db)
+        return json_response(CompanyChangesResponse, await service.get_changes(since, limit))
     except Exception as e:
         raise fa.HTTPException(status_code=400, detail=f'{e}')
 
@@ -38,11 +124,26 @@ async def read_companies(
     status_code=fa.status.HTTP_200_OK)
 async def read_company_by_id(
      id: UUID,
-     db: sm.Session = fa.Depends(get_session)
+     response: fa.Response,
+     db: AsyncSession = fa.Depends(get_read_session),
+     if_none_match: Optional[str] = fa.Header(None),
  ):
     try:
-        service = CompanyService(db)
-        return service.get_company_by_id(id)
+        # Los misses de caché de peticiones concurrentes se cargan juntos (un IN por lote),
+        # con el loader de la misma base (primario o réplica) que la sesión de la petición
+        service = CompanyService(db, loader=company_loader(session_factory_of(db)))
+        if if_none_match:
+            # Sólo se consulta updated_at; la fila completa se carga si ha cambiado
+            version = await service.get_company_version(id)
+            etag = row_etag(id, version)
+            if version is not None and etag_matches(if_none_match, etag):
+                return fa.Response(status_code=fa.status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            # La conexión vuelve al pool: la fila completa la carga el loader con la suya
+            await db.close()
+        
+        company = await service.get_company_by_id(id)
+        response.headers["ETag"] = row_etag(company["id"], company["updated_at"])
+        return json_response(CompanyResponse, company, response=response)
     except Exception as e:
         raise fa.HTTPException(status_code=400, detail=f'{e}')
     
@@ -52,11 +153,37 @@ async def read_company_by_id(
     status_code=fa.status.HTTP_201_CREATED)
 async def add_company(
     data: CreateCompanySchema,
-    db: sm.Session = fa.Depends(get_session)
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
 ):
     try:
         service = CompanyService(db)
-        return service.add_company(data)
+        company = await service.add_company(data)
+        response.headers["ETag"] = row_etag(company.id, company.updated_at)
+        return json_response(CompanyResponse, company, status_code=fa.status.HTTP_201_CREATED, response=response)
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+    
+@router.post(
+    '/companies/bulk',
+    response_model=BulkImportReport,
+    status_code=fa.status.HTTP_200_OK)
+async def bulk_import_companies(
+    request: fa.Request,
+    format: Literal["ndjson", "csv"] = fa.Query("ndjson", description="Body format"),
+    conflict_key: Literal["name", "email"] = fa.Query("name", description="Unique field used for upserts"),
+    on_conflict: Literal["update", "skip"] = fa.Query("update", description="Update or skip existing companies"),
+    batch_size: int = fa.Query(1000, ge=1, le=10000, description="Rows per INSERT and commit"),
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = CompanyService(db)
+        return await service.bulk_import(
+            iter_records(request.stream(), format),
+            conflict_key=conflict_key,
+            on_conflict=on_conflict,
+            batch_size=batch_size
+        )
     except Exception as e:
         raise fa.HTTPException(status_code=400, detail=f'{e}')
     
@@ -71,11 +198,21 @@ async def add_company(
 async def edit_company(
     id: UUID,
     data: UpdateCompanySchema,
-    db: sm.Session = fa.Depends(get_session)
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session),
+    if_match: Optional[str] = fa.Header(None),
 ):
     try:
         service = CompanyService(db)
-        return service.edit_company(id, data)
+        company = await service.edit_company(id, data, if_match=if_match)
+        response.headers["ETag"] = row_etag(company["id"], company["updated_at"])
+        return json_response(CompanyResponse, company, response=response)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except ConflictError as e:
+        raise fa.HTTPException(status_code=409, detail=f'{e}')
+    except PreconditionFailedError as e:
+        raise fa.HTTPException(status_code=412, detail=f'{e}')
     except Exception as e:
         raise fa.HTTPException(status_code=400, detail=f'{e}')
     
@@ -85,10 +222,88 @@ async def edit_company(
     status_code=fa.status.HTTP_204_NO_CONTENT)
 async def delete_user(
     id: UUID, 
-    db: sm.Session = fa.Depends(get_session)
+    db: AsyncSession = fa.Depends(get_write_session)
 ):
     try:
         service = CompanyService(db)
-        return service.delete_company(id)
+        return await service.delete_company(id)
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@auth_router.post(
+    '/register',
+    response_model=UserResponse,
+    status_code=fa.status.HTTP_201_CREATED)
+async def register(
+    data: RegisterUserSchema,
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = AuthService(db)
+        user = await service.register(data)
+        return json_response(UserResponse, user, status_code=fa.status.HTTP_201_CREATED, response=response)
+    except ConflictError as e:
+        raise fa.HTTPException(status_code=409, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@auth_router.post(
+    '/login',
+    response_model=TokenResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def login(
+    data: LoginSchema,
+    response: fa.Response,
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    # Primario: el login puede reescribir el hash (needs_rehash) y debe ver altas recientes
+    try:
+        service = AuthService(db)
+        return json_response(TokenResponse, await service.login(data), response=response)
+    except AuthenticationError as e:
+        raise fa.HTTPException(status_code=401, detail=f'{e}', headers={"WWW-Authenticate": "Bearer"})
     except Exception as e:
-        raise fa.HTTPException(status_code=400, detail=f'{e}')
\ No newline at end of file
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@auth_router.post(
+    '/logout',
+    response_model=None,
+    status_code=fa.status.HTTP_204_NO_CONTENT)
+async def logout(
+    principal: Principal = fa.Depends(get_current_user),
+    db: AsyncSession = fa.Depends(get_write_session)
+):
+    try:
+        service = AuthService(db)
+        return await service.logout(principal)
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
+
+@auth_router.get(
+    '/me',
+    response_model=PrincipalResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def read_me(
+    principal: Principal = fa.Depends(get_current_user)
+):
+    # Sale del token ya verificado: sin consulta a la base de datos
+    return json_response(PrincipalResponse, principal._asdict())
+
+@auth_router.get(
+    '/me/user',
+    response_model=UserResponse,
+    status_code=fa.status.HTTP_200_OK)
+async def read_my_user(
+    principal: Principal = fa.Depends(get_current_user),
+    db: AsyncSession = fa.Depends(get_read_session)
+):
+    try:
+        service = AuthService(db)
+        return json_response(UserResponse, await service.get_user(principal.user_id))
+    except NotFoundError as e:
+        raise fa.HTTPException(status_code=404, detail=f'{e}')
+    except Exception as e:
+        raise fa.HTTPException(status_code=400, detail=f'{e}')
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from uuid import UUID
 from datetime import datetime
 from common.filters import BaseFilter
+from .enums import ChangeOperation, UserRole
 
 # Company Schemas
 class CompanyResponse(BaseModel):
@@ -23,7 +24,7 @@ class CompanyFilterSchema(BaseFilter):
     is_active: bool | None = None
     name__contains: str | None = None
     email__contains: str | None = None
-    sort_by: str | None = NotImplemented
+    sort_by: str | None = None
     sort_order: str | None = None
 
 class CreateCompanySchema(BaseModel):
@@ -31,8 +32,69 @@ class CreateCompanySchema(BaseModel):
     email: EmailStr
     description: str | None 
     
+class BulkImportError(BaseModel):
+    line: int
+    error: str
+
+class BulkImportReport(BaseModel):
+    processed: int
+    upserted: int
+    skipped: int
+    failed: int
+    errors: list[BulkImportError]
+    errors_truncated: bool
+    
+class CompanyChangeResponse(BaseModel):
+    cursor: int
+    company_id: UUID
+    operation: ChangeOperation
+    changed_at: datetime
+    # Estado actual de la compañía (None si se ha borrado)
+    company: CompanyResponse | None
+
+class CompanyChangesResponse(BaseModel):
+    data: list[CompanyChangeResponse]
+    next_cursor: int
+    has_more: bool
+    
 class UpdateCompanySchema(BaseModel):
     name: str | None = None
     email: EmailStr | None = None
     description: str | None = None
-    is_active: bool | None = None
\ No newline at end of file
+    is_active: bool | None = None
+    
+# Auth Schemas
+class RegisterUserSchema(BaseModel):
+    email: EmailStr
+    username: str = Field(min_length=1)
+    password: str = Field(min_length=8, max_length=256)
+    # Sin company_id: el alta anónima no puede unirse a una compañía (eso requiere autorización)
+
+class LoginSchema(BaseModel):
+    email: EmailStr
+    password: str = Field(max_length=256)
+
+class UserResponse(BaseModel):
+    id: UUID
+    email: str
+    username: str
+    is_active: bool
+    global_role: UserRole
+    company_id: UUID | None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str
+    expires_at: datetime
+
+class PrincipalResponse(BaseModel):
+    user_id: UUID
+    company_id: UUID | None
+    role: UserRole
+    token_id: UUID
+    expires_at: datetime
@@ -1,21 +1,57 @@
 import sqlmodel as sm
+import sqlalchemy as sa
 from datetime import datetime
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
 from uuid import UUID
+from pydantic import ValidationError
 from sqlalchemy.exc import DataError, IntegrityError, NoResultFound
+from common.bulk import Record, encode_csv, encode_ndjson
+from common.cache import QueryCache
+from common.etag import etag_matches, row_etag
+from common.exceptions import AuthenticationError, ConflictError, NotFoundError, PreconditionFailedError
+from common.loader import BatchLoader, by_id_loader
 from common.pagination import PaginationParams
-from common.services import BaseService
-from .models import Company, User
+from common.services import AsyncBaseService
+from core.cache import get_query_cache
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .auth import Principal, get_password_hasher, get_token_verifier
+from .enums import ChangeOperation
+from .models import Company, CompanyChange, RevokedToken, User
 from .schemas import *
 
 
-class CompanyService(BaseService):
+# Un loader por sessionmaker (primario o cada réplica): un lote nunca mezcla orígenes
+_company_loaders: Dict[async_sessionmaker, BatchLoader] = {}
+
+
+def company_loader(session_factory: async_sessionmaker) -> BatchLoader:
+    """Loader compartido que agrupa en un IN las cargas concurrentes de compañías por id"""
+    loader = _company_loaders.get(session_factory)
+    if loader is None:
+        loader = _company_loaders[session_factory] = by_id_loader(Company, session_factory)
+    return loader
+
+
+class CompanyService(AsyncBaseService):
+    search_fields = ("name", "email")
+    # Máximo de errores por fila devueltos en el informe de importación
+    max_import_errors = 1000
+    # Máximo de ids por consulta en get_companies_by_ids
+    max_batch_ids = 100
+    # Clave del advisory lock que ordena las escrituras del outbox (Postgres)
+    changes_lock_key = 0x636F6D70
     
-    def __init__(self, db: sm.Session):
+    def __init__(self, db: AsyncSession, loader: Optional[BatchLoader] = None):
         self.db = db
+        self.loader = loader
         super().__init__(db, Company)
     
-    def get_companies_with_advanced_filters(
+    @property
+    def cache(self) -> QueryCache:
+        return get_query_cache()
+    
+    async def get_companies_with_advanced_filters(
         self,
         name: str | None = None,
         email: str | None = None,
@@ -48,34 +84,60 @@ class CompanyService(BaseService):
         if pagination:
             query = query.offset(pagination.skip).limit(pagination.limit)
         
-        total = self.db.exec(count_query).one()
-        items = self.db.exec(query).all()
+        total = (await self.db.exec(count_query)).one()
+        items = (await self.db.exec(query)).all()
         
         return items, total
     
-    def get_company_by_id(self, id: UUID) -> CompanyResponse:
+    async def get_company_by_id(self, id: UUID) -> dict:
         try:
-            company = self.db.get(self.model_class, id)
+            company = await self._cached(("id", id), lambda: self._load_company(id))
             
             if not company:
                 raise NoResultFound
             
-            return CompanyResponse(**company.model_dump())    
+            return company
             
         except NoResultFound:
             raise ValueError('Company not found')
         except Exception as e:
             raise ValueError(f'Internal Server Error: {e}')
         
-    def add_company(self, data: CreateCompanySchema) -> CompanyResponse:
+    async def get_company_version(self, id: UUID) -> Optional[datetime]:
+        """updated_at actual de la compañía (para If-None-Match, sin cargar la fila)"""
+        return await self.get_version(id)
+        
+    async def search_companies(self, term: str, limit: int = 20) -> list[dict]:
+        async def load():
+            return [company.model_dump() for company in await self.search(term, limit)]
+        
+        return await self._cached(("search", term.strip().lower(), limit), load)
+    
+    async def _load_company(self, id: UUID) -> dict | None:
+        if self.loader is not None:
+            return await self.loader.load(id)
+        company = await self.get_by_id(id)
+        return company.model_dump() if company else None
+    
+    async def get_companies_by_ids(self, ids: list[UUID]) -> list[Company]:
+        """Compañías con esos ids en una sola consulta, en el orden pedido (sin las inexistentes)"""
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > self.max_batch_ids:
+            raise ValueError(f'At most {self.max_batch_ids} ids per request')
+        
+        found = {company.id: company for company in await self.get_many(ids)}
+        return [found[id] for id in ids if id in found]
+        
+    async def add_company(self, data: CreateCompanySchema) -> Company:
         try:
             comp_data = data.model_dump()
-            company = self.model_class(**comp_data)
-            self.db.add(company)
-            self.db.commit()
-            self.db.refresh(company)
+            company = await self.create(comp_data, commit=False)
+            await self._record_changes([company.id], ChangeOperation.UPSERT)
+            await self.db.commit()
+            await self.db.refresh(company)
+            await self.invalidate_cache()
             
-            return CompanyResponse(**company.model_dump())
+            return company
         
         except IntegrityError:
             raise ValueError(f'Already exists company with this name or email')
@@ -83,45 +145,238 @@ class CompanyService(BaseService):
         except Exception as e:
             raise ValueError(f'Internal Server Error: {e}')
         
-    def edit_company(self, id: UUID, data: UpdateCompanySchema) -> CompanyResponse:
+    async def edit_company(self, id: UUID, data: UpdateCompanySchema,
+                           if_match: Optional[str] = None) -> dict:
         try:
-            comp = self.db.get(self.model_class, id)
+            expected_version = None
+            if if_match is not None:
+                # Concurrencia optimista: el UPDATE sólo aplica si updated_at no ha cambiado
+                expected_version = await self.get_version(id)
+                if expected_version is None:
+                    raise NotFoundError('Company not found')
+                if not etag_matches(if_match, row_etag(id, expected_version), weak=False):
+                    raise PreconditionFailedError('Company was modified by another request')
             
-            if not comp:
-                raise NoResultFound
+            values = data.model_dump(exclude_unset=True)
+            values["updated_at"] = datetime.now()
+            company = await self.update_returning(
+                id, values, columns=list(CompanyResponse.model_fields), expected_version=expected_version,
+                commit=False
+            )
+            await self._record_changes([id], ChangeOperation.UPSERT)
+            await self.db.commit()
+            await self.invalidate_cache()
             
-            for key, value in data.model_dump(exclude_unset=True).items():
-                setattr(comp, key, value)
-            
-            comp.updated_at = datetime.now()
-            self.db.commit()
-            self.db.refresh(comp)
-            
-            return CompanyResponse(**comp.model_dump())
+            return company
         
-        except NoResultFound:
-            raise ValueError(f'Company not found')
-            
-        except IntegrityError:
-            raise ValueError(f'Already exists company with this name or email')
+        except (NotFoundError, PreconditionFailedError):
+            raise
+        
+        except ConflictError:
+            raise ConflictError('Already exists company with this name or email')
         
         except Exception as e:
             raise ValueError(f'Internal Server Error: {e}')
         
     
-    def delete_company(self, id: UUID) -> None:
+    async def delete_company(self, id: UUID) -> None:
         try:
-            comp = self.db.get(self.model_class, id)
+            await self.delete_returning(id, commit=False)
+            await self._record_changes([id], ChangeOperation.DELETE)
+            await self.db.commit()
+            await self.invalidate_cache()
             
-            if not comp:
-                raise NoResultFound
-            
-            self.db.delete(comp)
-            self.db.commit()
+        except NotFoundError:
+            raise
+        
+        except Exception as e:
+            raise ValueError(f'Internal Server Error: {e}')
+        
+    async def _record_changes(self, ids: Iterable[UUID], operation: ChangeOperation) -> None:
+        """Escribe los cambios en el outbox, en la transacción en curso (sin commit).
+        
+        En Postgres un id de secuencia se asigna antes del commit: con escrituras
+        concurrentes un cursor menor podría hacerse visible después de uno mayor y
+        el consumidor se lo saltaría. El advisory lock de transacción serializa
+        hasta el commit a quienes escriben en el outbox, así el orden de los
+        cursores es el de los commits.
+        """
+        ids = list(ids)
+        if not ids:
+            return
+        if self.db.get_bind().dialect.name == "postgresql":
+            await self.db.exec(sa.select(sa.func.pg_advisory_xact_lock(self.changes_lock_key)))
+        now = datetime.now()
+        await self.db.exec(sa.insert(CompanyChange), params=[
+            {"company_id": id, "operation": operation, "created_at": now, "updated_at": now} for id in ids
+        ])
+    
+    async def get_changes(self, since: int = 0, limit: int = 500) -> dict:
+        """Cambios con cursor mayor que `since`, en orden, para sincronizar sin releer la tabla.
+        
+        De cada compañía sólo se devuelve su último cambio del lote, con el estado
+        actual (None si ya no existe, y entonces la operación es DELETE). El
+        consumidor guarda `next_cursor` y repite mientras `has_more`.
+        """
+        query = (
+            sm.select(CompanyChange.id, CompanyChange.company_id, CompanyChange.operation, CompanyChange.created_at)
+            .where(CompanyChange.id > since)
+            .order_by(CompanyChange.id)
+            .limit(limit + 1)
+        )
+        changes = (await self.db.exec(query)).all()
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        
+        latest = {company_id: (cursor, changed_at) for cursor, company_id, _, changed_at in changes}
+        columns = [getattr(Company, field) for field in CompanyResponse.model_fields]
+        found = {}
+        if latest:
+            rows = await self.db.exec(sm.select(*columns).where(Company.id.in_(list(latest))))
+            found = {row["id"]: dict(row) for row in rows.mappings()}
+        
+        data = [
+            {"cursor": cursor, "company_id": company_id,
+             "operation": ChangeOperation.UPSERT if company_id in found else ChangeOperation.DELETE,
+             "changed_at": changed_at, "company": found.get(company_id)}
+            for company_id, (cursor, changed_at) in sorted(latest.items(), key=lambda item: item[1][0])
+        ]
+        return {"data": data, "next_cursor": changes[-1][0] if changes else since, "has_more": has_more}
+    
+    def _import_error(self, report: Dict[str, Any], line: int, error: str) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < self.max_import_errors:
+            report["errors"].append({"line": line, "error": error})
+        else:
+            report["errors_truncated"] = True
+    
+    async def _flush_import_batch(self, report: Dict[str, Any], batch: Dict[str, tuple],
+                                  conflict_key: str, update_fields: list | None) -> None:
+        rows = [values for _, values in batch.values()]
+        try:
+            ids = await self.upsert_many_ids(rows, conflict_key, update_fields)
+            await self._record_changes(ids, ChangeOperation.UPSERT)
+            await self.db.commit()
+        except IntegrityError:
+            # Algún registro choca con otra restricción única: se repite fila a fila
+            # con savepoints para identificar las que fallan
+            await self.db.rollback()
+            ids = []
+            for line, values in batch.values():
+                try:
+                    async with self.db.begin_nested():
+                        ids += await self.upsert_many_ids([values], conflict_key, update_fields)
+                except IntegrityError:
+                    self._import_error(report, line, 'Already exists company with this name or email')
+                    rows.remove(values)
+            await self._record_changes(ids, ChangeOperation.UPSERT)
+            await self.db.commit()
+        
+        upserted = len(ids)
+        report["upserted"] += upserted
+        report["skipped"] += len(rows) - upserted
+    
+    async def bulk_import(self, records: AsyncIterator[Record], conflict_key: str = "name",
+                          on_conflict: str = "update", batch_size: int = 1000) -> BulkImportReport:
+        """Importa compañías por lotes con INSERT ... ON CONFLICT y commit por lote.
+        
+        La memoria usada sólo depende de batch_size (y del tope de errores), no
+        del tamaño de la entrada.
+        """
+        report = {"processed": 0, "upserted": 0, "skipped": 0, "failed": 0,
+                  "errors": [], "errors_truncated": False}
+        update_fields = None
+        if on_conflict == "update":
+            update_fields = [field for field in CreateCompanySchema.model_fields if field != conflict_key]
+        
+        # Un mismo lote no puede tocar dos veces la misma fila: gana el último registro
+        batch: Dict[str, tuple] = {}
+        async for line, record, error in records:
+            report["processed"] += 1
+            if error is None:
+                try:
+                    values = CreateCompanySchema.model_validate(record).model_dump()
+                except ValidationError as e:
+                    error = "; ".join(
+                        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+                    )
+            if error is not None:
+                self._import_error(report, line, error)
+                continue
             
+            previous = batch.pop(values[conflict_key], None)
+            if previous is not None:
+                report["skipped"] += 1
+            batch[values[conflict_key]] = (line, values)
             
-        except NoResultFound:
-            raise ValueError('Company not found')
+            if len(batch) >= batch_size:
+                await self._flush_import_batch(report, batch, conflict_key, update_fields)
+                batch.clear()
         
-        except Exception as e:
-            raise ValueError(f'Internal Server Error: {e}')
\ No newline at end of file
+        if batch:
+            await self._flush_import_batch(report, batch, conflict_key, update_fields)
+        if report["upserted"]:
+            await self.invalidate_cache()
+        
+        return BulkImportReport(**report)
+
+    
+    async def export_companies(self, filter_params: Optional[CompanyFilterSchema] = None,
+                               format: str = "ndjson", batch_size: int = 1000) -> AsyncIterator[bytes]:
+        """Exporta las compañías filtradas como NDJSON o CSV, lote a lote"""
+        columns = list(CompanyResponse.model_fields)
+        sort_by = filter_params.sort_by if filter_params else None
+        sort_order = (filter_params.sort_order if filter_params else None) or "asc"
+        
+        if format == "csv":
+            yield encode_csv([], columns, header=True)
+        async for rows in self.stream_rows(filter_params, sort_by, sort_order, columns, batch_size):
+            yield encode_csv(rows, columns) if format == "csv" else encode_ndjson(rows)
+
+
+
+class AuthService(AsyncBaseService):
+    """Alta, login y logout. El hash de contraseñas nunca corre en el event loop"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        super().__init__(db, User)
+
+    async def register(self, data: RegisterUserSchema) -> User:
+        """Alta de un usuario sin compañía (rol CUSTOMER)"""
+        password = await get_password_hasher().hash_async(data.password)
+        try:
+            return await self.create({**data.model_dump(exclude={"password"}), "password": password})
+        except IntegrityError:
+            await self.db.rollback()
+            raise ConflictError('Already exists user with this email')
+
+    async def login(self, data: LoginSchema) -> dict:
+        hasher = get_password_hasher()
+        user = (await self.db.exec(sm.select(User).where(User.email == data.email))).first()
+        # Sin usuario también se calcula un hash: el tiempo de respuesta no delata qué emails existen
+        valid = await hasher.verify_async(data.password, user.password if user else None)
+        if not valid or not user.is_active:
+            raise AuthenticationError('Invalid email or password')
+        if hasher.needs_rehash(user.password):
+            await self.update(user, {"password": await hasher.hash_async(data.password)})
+
+        token, principal = get_token_verifier().signer.issue(user.id, user.company_id, user.global_role)
+        return {"access_token": token, "token_type": "bearer", "expires_at": principal.expires_at}
+
+    async def logout(self, principal: Principal) -> None:
+        """Revoca el token: en este worker al momento y en los demás en su próxima sincronización"""
+        self.db.add(RevokedToken(id=principal.token_id, user_id=principal.user_id,
+                                 expires_at=principal.expires_at))
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # Ya estaba revocado
+            await self.db.rollback()
+        get_token_verifier().revoke(principal.token_id, principal.expires_at)
+
+    async def get_user(self, id: UUID) -> User:
+        user = await self.get_by_id(id)
+        if user is None:
+            raise NotFoundError('User not found')
+        return user